@@ -0,0 +1,87 @@
+"""Benchmark of the L0 packet accessors on a synthetic CCSDS packet file.
+
+Usage::
+
+    python benchmarks/bench_memmap_accessors.py --size 4 --output-dir /tmp
+
+The file is written in output-dir (default: a temporary folder) and removed at the end
+unless --keep is given.
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+from eopf.product.store.memmap_accessors import MemMapAccessor
+
+PRIMARY_HEADER = 6
+SYNC_VALUE = 12
+
+
+def write_packet_file(path: str, size: int, min_length: int, max_length: int, seed: int = 0) -> int:
+    """Write random packets with valid primary headers until size bytes are written, return the packet count."""
+    rng = np.random.default_rng(seed)
+    written = 0
+    n_packets = 0
+    with open(path, "wb") as packet_file:
+        while written < size:
+            lengths = rng.integers(min_length, max_length + 1, size=(64 * 1024 * 1024) // max_length + 1)
+            lengths = lengths[np.cumsum(lengths) <= size - written]
+            if lengths.size == 0:
+                break
+            offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            block = rng.integers(0, 256, size=int(lengths.sum()), dtype="uint8")
+            block[offsets] = SYNC_VALUE
+            block[offsets + 4] = (lengths - PRIMARY_HEADER - 1) >> 8
+            block[offsets + 5] = (lengths - PRIMARY_HEADER - 1) & 0xFF
+            block.tofile(packet_file)
+            written += block.size
+            n_packets += lengths.size
+    return n_packets
+
+
+def max_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=float, default=2.0, help="size of the synthetic file in GiB")
+    parser.add_argument("--min-length", type=int, default=2000, help="minimal packet length in bytes")
+    parser.add_argument("--max-length", type=int, default=20000, help="maximal packet length in bytes")
+    parser.add_argument("--output-dir", default=None, help="folder where the synthetic file is written")
+    parser.add_argument("--keep", action="store_true", help="do not remove the synthetic file")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or tempfile.mkdtemp()
+    path = os.path.join(output_dir, "s1a-bench-synthetic.dat")
+    start = time.perf_counter()
+    n_packets = write_packet_file(path, int(args.size * 1024**3), args.min_length, args.max_length)
+    elapsed = time.perf_counter() - start
+    print(f"wrote {n_packets} packets ({os.path.getsize(path) / 1024**2:.0f} MiB) in {elapsed:.2f}s")
+
+    try:
+        rss_before = max_rss_mib()
+        accessor = MemMapAccessor(path)
+        start = time.perf_counter()
+        accessor.open(target_type="uint16")
+        print(f"open (packet indexing): {time.perf_counter() - start:.2f}s")
+        if accessor._poolmemmap._n_packets != n_packets:
+            raise RuntimeError(f"indexed {accessor._poolmemmap._n_packets} packets instead of {n_packets}")
+
+        start = time.perf_counter()
+        # the accessor returns a lazy variable, its packets are decoded when computed
+        accessor[slice(32, 48, 16)].compute()
+        print(f"decode one 16 bits field: {time.perf_counter() - start:.2f}s")
+        print(f"max rss: {max_rss_mib():.0f} MiB (before open: {rss_before:.0f} MiB)")
+        accessor.close()
+    finally:
+        if not args.keep:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
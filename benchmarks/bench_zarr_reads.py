@@ -0,0 +1,141 @@
+"""Benchmark of the variable reads of EOZarrStore on a synthetic product with many variables.
+
+Usage::
+
+    python benchmarks/bench_zarr_reads.py --variables 2000 --latency 0.005
+
+The product is written on the local filesystem (in output-dir, default: a temporary folder)
+and on an in-process memory filesystem adding a latency to each request, like an object storage.
+Each variable is read once by a store building its dask arrays from the url (the previous behaviour),
+and once by EOZarrStore, which builds them from the group opened with the consolidated metadata.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable
+
+import fsspec
+import numpy as np
+import zarr
+from dask import array as da
+from fsspec.implementations.memory import MemoryFileSystem
+
+from eopf.product.core import EOVariable
+from eopf.product.store import EOZarrStore
+
+
+class SlowMemoryFileSystem(MemoryFileSystem):
+    """Memory filesystem counting the read requests, each delayed by latency seconds."""
+
+    protocol = "slowmem"
+    latency = 0.0
+    requests = 0
+    _count_lock = threading.Lock()
+
+    @classmethod
+    def _request(cls) -> None:
+        with cls._count_lock:
+            cls.requests += 1
+        time.sleep(cls.latency)
+
+    def cat_file(self, path: str, start: Any = None, end: Any = None, **kwargs: Any) -> bytes:
+        self._request()
+        return super().cat_file(path, start=start, end=end, **kwargs)
+
+    def _open(self, path: str, mode: str = "rb", **kwargs: Any) -> Any:
+        if "r" in mode:
+            self._request()
+        return super()._open(path, mode=mode, **kwargs)
+
+
+class UrlZarrStore(EOZarrStore):
+    """EOZarrStore opening the zarr again (and reading the array metadata) for each variable."""
+
+    def __getitem__(self, key: str) -> Any:
+        obj = self._root[key]
+        if isinstance(obj, zarr.Group):
+            return super().__getitem__(key)
+        var_data = da.from_zarr(self.url, component=key, storage_options=self._dask_kwargs["storage_options"])
+        if "scale_factor" in obj.attrs:
+            var_data *= obj.attrs["scale_factor"]
+        if "add_offset" in obj.attrs:
+            var_data += obj.attrs["add_offset"]
+        return EOVariable(data=var_data, attrs=obj.attrs)
+
+
+def write_product(url: str, n_variables: int, shape: tuple[int, ...]) -> None:
+    root = zarr.open_group(url, mode="w")
+    data = np.arange(np.prod(shape), dtype="float32").reshape(shape)
+    for index in range(n_variables):
+        group = root.require_group(f"group_{index % 10}")
+        array = group.create_dataset(f"variable_{index}", data=data, chunks=shape)
+        array.attrs["_ARRAY_DIMENSIONS"] = [f"dim_{dim}" for dim in range(len(shape))]
+        array.attrs["scale_factor"] = 2.0
+    zarr.consolidate_metadata(url)
+
+
+def variable_paths(url: str) -> list[str]:
+    paths: list[str] = []
+    zarr.open_consolidated(url, mode="r").visitvalues(
+        lambda obj: paths.append(obj.path) if isinstance(obj, zarr.Array) else None,
+    )
+    return paths
+
+
+def timed(label: str, function: Callable[[], Any]) -> None:
+    requests = SlowMemoryFileSystem.requests
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f"    {label}: {elapsed:.2f}s, {SlowMemoryFileSystem.requests - requests} requests")
+
+
+def bench(url: str, paths: list[str]) -> None:
+    for label, store_class in (("from the url", UrlZarrStore), ("from the open group", EOZarrStore)):
+
+        def read() -> None:
+            store = store_class(url)
+            store.open()
+            for path in paths:
+                store[path].data.sum().compute()
+            store.close()
+
+        timed(label, read)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variables", type=int, default=1000, help="number of variables of the product")
+    parser.add_argument("--shape", type=int, nargs="+", default=[16, 16], help="shape of each variable")
+    parser.add_argument("--latency", type=float, default=0.002, help="latency of a memory filesystem request (s)")
+    parser.add_argument("--output-dir", default=None, help="folder where the local product is written")
+    parser.add_argument("--keep", action="store_true", help="do not remove the local product")
+    args = parser.parse_args()
+
+    fsspec.register_implementation(SlowMemoryFileSystem.protocol, SlowMemoryFileSystem, clobber=True)
+    output_dir = args.output_dir or tempfile.mkdtemp()
+    local_url = os.path.join(output_dir, "bench-synthetic.zarr")
+    remote_url = "slowmem://bench-synthetic.zarr"
+    for url in (local_url, remote_url):
+        start = time.perf_counter()
+        write_product(url, args.variables, tuple(args.shape))
+        print(f"wrote {args.variables} variables on {url} in {time.perf_counter() - start:.2f}s")
+
+    try:
+        paths = variable_paths(local_url)
+        print("local filesystem:")
+        bench(local_url, paths)
+        SlowMemoryFileSystem.latency = args.latency
+        print(f"memory filesystem ({args.latency * 1000:g}ms by request):")
+        bench(remote_url, paths)
+    finally:
+        SlowMemoryFileSystem().rm(remote_url, recursive=True)
+        if not args.keep:
+            shutil.rmtree(local_url)
+
+
+if __name__ == "__main__":
+    main()
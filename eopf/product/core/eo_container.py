@@ -1,6 +1,6 @@
 import warnings
 from collections.abc import MutableMapping
-from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional
 
 from eopf.exceptions import EOObjectExistError, StoreNotDefinedError
 from eopf.product.core.eo_abstract import EOAbstract
@@ -195,6 +195,29 @@ class EOContainer(EOAbstract, MutableMapping[str, "EOObject"]):
             name = join_path(self.name, key, sep=self.store.sep)
         return join_path(*self.relative_path, name, sep=self.store.sep)
 
+    def _read_store_items(self, keys: Iterable[str]) -> None:
+        """Read at once from the store the sub objects not loaded yet, and add them to this container.
+
+        Parameters
+        ----------
+        keys: Iterable[str]
+            names of the sub objects
+        """
+        from .eo_group import EOGroup
+
+        if self.store is None or self.store.status != StorageStatus.OPEN:
+            return
+        store_keys = {
+            self._store_key(key): key for key in keys if key not in self._groups and key not in self._variables
+        }
+        if not store_keys:
+            return
+        for store_key, item in self.store.get_many(store_keys).items():
+            if isinstance(item, EOGroup):
+                self._add_local_group(store_keys[store_key], item)
+            else:
+                self._add_local_variable(store_keys[store_key], item, new_eo=False)
+
     def _recursive_add(self, path: str, add_local_method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
         """Recursively got through the path , adding group as needed,
         then add it to the local container using add_local_method
@@ -433,7 +456,9 @@ class EOContainer(EOAbstract, MutableMapping[str, "EOObject"]):
 
         if self.store is None:  # pragma: no cover
             raise StoreNotDefinedError("Store must be defined")
-        for key in self:
+        keys = list(self)
+        self._read_store_items(keys)
+        for key in keys:
             eo_object = self[key]
             if isinstance(eo_object, EOGroup):
                 eo_object.load()
@@ -488,7 +513,10 @@ class EOContainer(EOAbstract, MutableMapping[str, "EOObject"]):
         """
         from .eo_group import EOGroup
 
-        for value in self.values():
+        keys = list(self)
+        self._read_store_items(keys)
+        for key in keys:
+            value = self[key]
             yield value
             if isinstance(value, EOGroup):
                 yield from value.walk()
@@ -75,7 +75,9 @@ class EOVariable(EOObject, EOVariableOperatorsMixin["EOVariable"]):
                 input_dtype = data.dtype
                 data = xarray.DataArray(data=lazy_data, name=name, attrs=attrs, **kwargs).astype(input_dtype)
         elif isinstance(data, EOVariable):
+            encoding = dict(data.encoding)
             data = xarray.DataArray(data=data._data, attrs=data.attrs | attrs, dims=data.dims)
+            data.encoding = encoding
         elif isinstance(data, xarray.DataArray):
             data = data.copy()
             data.attrs.update(attrs)
@@ -111,6 +113,14 @@ class EOVariable(EOObject, EOVariableOperatorsMixin["EOVariable"]):
     def attrs(self) -> dict[str, Any]:
         return self._data.attrs
 
+    @property
+    def encoding(self) -> dict[Hashable, Any]:
+        """How the data is encoded in its store (ex: packed dtype, scale_factor, add_offset and _FillValue),
+        filled by the stores decoding the data they read.
+        Operations creating new data return variables without encoding.
+        """
+        return self._data.encoding
+
     # docstr-coverage: inherited
     @property
     def coords(self) -> ValuesView[Any]:
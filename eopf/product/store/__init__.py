@@ -3,6 +3,7 @@
 All stores and accessors are based on the main abstract EOProductStore class.
 """
 from .abstract import EOProductStore, StorageStatus
+from .chunking import EOChunkPlanner
 from .cog import EOCogStore
 from .conveniences import convert
 from .netcdf import EONetCDFStore
@@ -11,6 +12,7 @@ from .zarr import EOZarrStore
 
 __all__ = [
     "convert",
+    "EOChunkPlanner",
     "EOZarrStore",
     "EOProductStore",
     "StorageStatus",
@@ -2,7 +2,7 @@ import enum
 import warnings
 from abc import abstractmethod
 from collections.abc import MutableMapping
-from typing import TYPE_CHECKING, Any, Iterator
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
 
 from eopf.exceptions import StoreNotOpenError
 from eopf.exceptions.warnings import AlreadyOpen
@@ -33,9 +33,12 @@ class EOProductStore(MutableMapping[str, "EOObject"]):
     ----------
     url: str
         url to the target store
+    single_file: bool
+        True if the store only reads the file of its url, so only this file is extracted from a zipped product
     """
 
     sep: str = "/"
+    single_file: bool = False
 
     def __init__(self, url: str) -> None:
         self.url = url
@@ -62,6 +65,31 @@ class EOProductStore(MutableMapping[str, "EOObject"]):
             raise StoreNotOpenError("Store must be open before close it")
         self._status = StorageStatus.CLOSE
 
+    def get_many(self, paths: Iterable[str]) -> dict[str, "EOObject"]:
+        """Read several objects of the store at once
+
+        Stores able to share work between reads (resolution, file accesses, ...) override it,
+        by default the objects are read one by one.
+
+        Parameters
+        ----------
+        paths: Iterable[str]
+            paths of the objects to read
+
+        Returns
+        -------
+        dict[str, EOObject]
+            read objects by path
+
+        Raises
+        ------
+        StoreNotOpenError
+            If the store is closed
+        KeyError
+            If a path is not in the store
+        """
+        return {path: self[path] for path in paths}
+
     @property
     def is_erasable(self) -> bool:
         """bool: this store can be erase or not"""
@@ -0,0 +1,98 @@
+from typing import Any, Mapping, Optional, Union
+
+import numpy as np
+from dask import array as da
+from dask.array.core import normalize_chunks
+from dask.utils import parse_bytes
+
+ChunkSize = Union[int, str]
+
+
+class EOChunkPlanner:
+    """Chunk shapes of the variables written by a store, chosen from a target chunk size in bytes.
+
+    The access pattern chooses how the chunks of the other dimensions are shaped:
+
+        * "tiles": balanced chunks on all the dimensions, for spatial tiles accesses
+        * "rows": the last dimension is never split, the chunks are made of full rows
+
+    Parameters
+    ----------
+    target_bytes: int or str, optional
+        target size of the uncompressed chunks, ex: 32 * 2**20 or "32MiB"
+    access: str, optional
+        access pattern of the written data, "tiles" or "rows"
+    dims: Mapping[str, int or str], optional
+        chunk size by dimension name, overriding the access pattern (-1 for the full dimension)
+    product_types: Mapping[str, Mapping[str, Any]], optional
+        target_bytes, access and dims by product type, overriding the ones of the planner
+
+    Examples
+    --------
+    >>> planner = EOChunkPlanner("16MiB", product_types={"S3OLCEFR": dict(access="rows", dims=dict(bands=1))})
+    >>> with open_store(EOZarrStore("product.zarr"), mode="w", chunk_planner=planner) as store:
+    ...     product.write()
+    """
+
+    DEFAULT_TARGET_BYTES = 32 * 2**20
+    ACCESS_PATTERNS = ("tiles", "rows")
+
+    def __init__(
+        self,
+        target_bytes: ChunkSize = DEFAULT_TARGET_BYTES,
+        access: str = "tiles",
+        dims: Optional[Mapping[str, ChunkSize]] = None,
+        product_types: Optional[Mapping[str, Mapping[str, Any]]] = None,
+    ) -> None:
+        if access not in self.ACCESS_PATTERNS:
+            raise ValueError(f"Unknown access pattern {access}, must be one of {self.ACCESS_PATTERNS}")
+        self.target_bytes = parse_bytes(target_bytes) if isinstance(target_bytes, str) else int(target_bytes)
+        self.access = access
+        self.dims = dict(dims or {})
+        self.product_types = {name: dict(config) for name, config in (product_types or {}).items()}
+
+    def for_product_type(self, product_type: str) -> "EOChunkPlanner":
+        """Planner of the given product type (this planner if the type has no specific configuration)"""
+        config = self.product_types.get(product_type)
+        if not config:
+            return self
+        return EOChunkPlanner(
+            config.get("target_bytes", self.target_bytes),
+            config.get("access", self.access),
+            self.dims | dict(config.get("dims", {})),
+        )
+
+    def plan(self, shape: tuple[int, ...], dtype: Any, dims: tuple[str, ...] = tuple()) -> Optional[tuple[int, ...]]:
+        """Regular chunk shape of a variable, None if it can not be planned (object or empty variables)
+
+        Parameters
+        ----------
+        shape: tuple[int, ...]
+            shape of the variable
+        dtype: Any
+            dtype of the variable
+        dims: tuple[str, ...], optional
+            dimensions names of the variable
+        """
+        dtype = np.dtype(dtype)
+        if dtype == object or not shape or 0 in shape:
+            return None
+        chunks: list[ChunkSize] = ["auto"] * len(shape)
+        if self.access == "rows":
+            chunks[-1] = -1
+        for index, dim in enumerate(dims[: len(shape)]):
+            if dim in self.dims:
+                chunks[index] = self.dims[dim]
+        normalized = normalize_chunks(tuple(chunks), shape, limit=self.target_bytes, dtype=dtype)
+        return tuple(dim_chunks[0] for dim_chunks in normalized)
+
+    def rechunk(self, data: da.Array, dims: tuple[str, ...] = tuple()) -> da.Array:
+        """Data lazily rechunked to its planned chunk shape"""
+        chunks = self.plan(data.shape, data.dtype, dims)
+        if chunks is None or data.chunks == normalize_chunks(chunks, data.shape):
+            return data
+        return data.rechunk(chunks)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Configuration of this planner, to be recorded in the attributes of a product"""
+        return dict(target_bytes=self.target_bytes, access=self.access, dims=dict(self.dims))
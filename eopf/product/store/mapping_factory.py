@@ -1,33 +1,90 @@
+import copy
+import hashlib
 import json
+import os
 import re
+import tempfile
+import threading
+import time
+import warnings
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple, Optional
 
 import pkg_resources
 
 from eopf.conf import conf_loader
 
 
+class _CompiledMapping(NamedTuple):
+    """Parsed mapping file, with the stat of the file when it was parsed."""
+
+    path: str
+    mtime_ns: int
+    size: int
+    recognition: dict[str, Any]
+    # parsed mapping, used as a template: mappings are modified by their users, each get_mapping returns a copy
+    data: dict[str, Any]
+
+    def load(self) -> dict[str, Any]:
+        return copy.deepcopy(self.data)
+
+
 class EOMappingFactory:
+    """Registry of the json mappings, selected by filename or product type.
+
+    Mapping files are parsed once by process (the parsed mappings are shared by all the factories),
+    and parsed again only if their modification time or size changed. The files are checked for changes
+    at most every REFRESH_INTERVAL seconds, or when refresh is called.
+    The recognition patterns of all the mappings are compiled in a single regular expression by recognition key,
+    and the matched mapping is memoized by filename / product type.
+
+    Parameters
+    ----------
+    default_mappings: bool, optional
+        register the mappings of the configuration folder and of the eopf.store.mapping_folder entry points
+    cache_file: str, optional
+        json file to persist the parsed mappings between processes, for a faster cold start
+        (the recognition patterns are compiled again when they are first matched)
+    """
+
     FILENAME_RECO = "filename_pattern"
     TYPE_RECO = "product_type"
     RECO = "recognition"
 
-    def __init__(self, default_mappings: bool = True) -> None:
+    # parsed mappings by path, shared by all the factories
+    _compiled: dict[str, _CompiledMapping] = dict()
+    _compiled_lock = threading.RLock()
+    # bound of the memoized matches of a factory
+    MAX_MATCHES = 4096
+    # seconds between two checks of the registered files for changes
+    REFRESH_INTERVAL = 5.0
+
+    def __init__(self, default_mappings: bool = True, cache_file: Optional[str] = None) -> None:
         self.mapping_set: set[str] = set()
+        self.cache_file = cache_file
+        self._lock = threading.RLock()
+        # registration order is the matching priority
+        self._registered: dict[str, None] = dict()
+        self._signature: tuple[Any, ...] = tuple()
+        # monotonic time of the last check of the registered files, None to check them on the next access
+        self._refreshed: Optional[float] = None
+        self._dispatch: dict[str, tuple[Optional[re.Pattern[str]], list[str]]] = dict()
+        self._matches: dict[tuple[str, str], Optional[str]] = dict()
+        if cache_file:
+            self._load_cache(cache_file)
         if default_mappings:
             self.load_default_mapping()
 
     def load_default_mapping(self) -> None:
         conf = conf_loader()
         path_directory = Path(conf.mapping)
-        for mapping_path in path_directory.glob("*.json"):
+        for mapping_path in sorted(path_directory.glob("*.json")):
             self.register_mapping(str(mapping_path))
 
         for resource in pkg_resources.iter_entry_points("eopf.store.mapping_folder"):
             module, _, folder = resource.module_name.rpartition(".")
             path_directory = Path(pkg_resources.resource_filename(module, folder))
-            for mapping_path in path_directory.glob("*.json"):
+            for mapping_path in sorted(path_directory.glob("*.json")):
                 self.register_mapping(str(mapping_path))
 
     def get_mapping(self, file_path: str = "", product_type: str = "") -> dict[str, Any]:
@@ -40,12 +97,16 @@ class EOMappingFactory:
         else:
             raise ValueError("Must provide either file_path or product_type.")
 
-        for json_mapping_path in self.mapping_set:
-            with open(json_mapping_path) as json_mapping_file:
-                json_mapping_data = json.load(json_mapping_file)
-                if self.guess_can_read(json_mapping_data, recognised, reco):
-                    return json_mapping_data
-        raise KeyError(f"No registered mapping compatible with : {recognised}")
+        with self._lock:
+            self._refresh()
+            if (reco, recognised) not in self._matches:
+                if len(self._matches) >= self.MAX_MATCHES:
+                    self._matches.clear()
+                self._matches[(reco, recognised)] = self._match(recognised, reco)
+            mapping_path = self._matches[(reco, recognised)]
+            if mapping_path is None:
+                raise KeyError(f"No registered mapping compatible with : {recognised}")
+            return self._compiled[mapping_path].load()
 
     def guess_can_read(self, json_mapping_data: dict[str, Any], recognised: str, recogniton_key: str) -> bool:
         pattern = json_mapping_data.get("recognition", {}).get(recogniton_key)
@@ -53,5 +114,115 @@ class EOMappingFactory:
             return re.match(pattern, recognised) is not None
         return False
 
+    @property
+    def signature(self) -> str:
+        """Digest of the registered mapping files, changing when one is registered or modified"""
+        with self._lock:
+            self._refresh()
+            return hashlib.sha256(repr(self._signature).encode()).hexdigest()
+
     def register_mapping(self, store_class: str) -> None:
-        self.mapping_set.add(store_class)
+        with self._lock:
+            self.mapping_set.add(store_class)
+            self._registered.setdefault(store_class)
+            self._refreshed = None
+            self._invalidate()
+
+    def refresh(self) -> None:
+        """Parse again the registered mapping files changed since they were parsed, without waiting for
+        REFRESH_INTERVAL."""
+        with self._lock:
+            self._refreshed = None
+            self._refresh()
+
+    def save_cache(self, cache_file: Optional[str] = None) -> None:
+        """Persist the parsed mappings, to be reused by factories created with this cache file.
+
+        Parameters
+        ----------
+        cache_file: str, optional
+            path of the cache, cache_file of the factory by default
+        """
+        cache_file = cache_file or self.cache_file
+        if not cache_file:
+            raise ValueError("No cache file to save the mappings.")
+        with self._lock:
+            self._refresh()
+            cache_dir = os.path.dirname(os.path.abspath(cache_file))
+            os.makedirs(cache_dir, exist_ok=True)
+            entries = {path: self._compiled[path]._asdict() for path in self._registered}
+            with tempfile.NamedTemporaryFile("w", dir=cache_dir, suffix=".tmp", delete=False) as cache:
+                json.dump(entries, cache)
+            os.replace(cache.name, cache_file)
+
+    def _load_cache(self, cache_file: str) -> None:
+        try:
+            with open(cache_file) as cache:
+                entries = json.load(cache)
+            with self._compiled_lock:
+                for path, entry in entries.items():
+                    self._compiled.setdefault(path, _CompiledMapping(**entry))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            warnings.warn(f"Ignoring invalid mapping cache {cache_file}: {e}")
+
+    def _invalidate(self) -> None:
+        self._dispatch.clear()
+        self._matches.clear()
+
+    def _refresh(self) -> None:
+        """Parse the registered files not parsed yet or changed since they were parsed,
+        if they were not checked in the last REFRESH_INTERVAL seconds."""
+        now = time.monotonic()
+        if self._refreshed is not None and now - self._refreshed < self.REFRESH_INTERVAL:
+            return
+        self._refreshed = now
+        signature = list()
+        for mapping_path in self._registered:
+            stat = os.stat(mapping_path)
+            signature.append((mapping_path, stat.st_mtime_ns, stat.st_size))
+            compiled = self._compiled.get(mapping_path)
+            if compiled is None or (compiled.mtime_ns, compiled.size) != (stat.st_mtime_ns, stat.st_size):
+                with open(mapping_path) as json_mapping_file:
+                    json_mapping_data = json.load(json_mapping_file)
+                with self._compiled_lock:
+                    self._compiled[mapping_path] = _CompiledMapping(
+                        mapping_path,
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                        json_mapping_data.get(self.RECO, {}),
+                        json_mapping_data,
+                    )
+        if tuple(signature) != self._signature:
+            self._signature = tuple(signature)
+            self._invalidate()
+
+    def _match(self, recognised: str, reco: str) -> Optional[str]:
+        """Path of the first registered mapping whose recognition pattern match."""
+        if reco not in self._dispatch:
+            self._dispatch[reco] = self._compile_dispatch(reco)
+        combined, mapping_paths = self._dispatch[reco]
+        if combined is not None:
+            match = combined.match(recognised)
+            return mapping_paths[int(match.lastgroup[1:])] if match and match.lastgroup else None
+        for mapping_path in mapping_paths:
+            if self.guess_can_read({self.RECO: self._compiled[mapping_path].recognition}, recognised, reco):
+                return mapping_path
+        return None
+
+    def _compile_dispatch(self, reco: str) -> tuple[Optional[re.Pattern[str]], list[str]]:
+        """Alternation of the patterns of all the mappings, each in its own named group.
+
+        re.match try the alternatives in order, so the first matching group is the first matching mapping.
+        Patterns with their own groups (which could be back referenced) are matched one by one instead.
+        """
+        mapping_paths = [path for path in self._registered if self._compiled[path].recognition.get(reco)]
+        patterns = [self._compiled[path].recognition[reco] for path in mapping_paths]
+        try:
+            if any(re.compile(pattern).groups for pattern in patterns):
+                return None, mapping_paths
+            combined = "|".join(f"(?P<m{index}>{pattern})" for index, pattern in enumerate(patterns))
+            return re.compile(combined), mapping_paths
+        except re.error:
+            return None, mapping_paths
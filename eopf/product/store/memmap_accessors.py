@@ -1,33 +1,625 @@
 import errno
 import glob
+import hashlib
 import os
-from typing import TYPE_CHECKING, Any, Iterator, MutableMapping
-
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+import dask
 import numpy as np
+from dask import array as da
+from dask.utils import parse_bytes
 
+from eopf.exceptions import StoreNotOpenError
 from eopf.product.store.abstract import EOProductStore, StorageStatus
 
 if TYPE_CHECKING:  # pragma: no cover
     from eopf.product.core.eo_object import EOObject
 
 
+def map_file(url: str) -> np.ndarray[Any, np.dtype[np.uint8]]:
+    """Memory map the given file as a read only byte buffer.
+
+    Parameters
+    ----------
+    url: str
+        path to the file to map
+
+    Returns
+    -------
+    numpy.ndarray
+        byte buffer backed by the file (an empty array for an empty file)
+    """
+    try:
+        if os.path.getsize(url) == 0:
+            return np.zeros(0, dtype="uint8")
+        return np.memmap(url, dtype="uint8", mode="r")
+    except (IOError, ValueError):
+        raise IOError(f"Error While Opening {url}!")
+
+
+def index_packets(
+    buffer: np.ndarray[Any, np.dtype[np.uint8]],
+    primary_header: int = 6,
+    sync_value: int = 12,
+    scan_step: int = 1 << 26,
+) -> tuple[np.ndarray[Any, np.dtype[np.int64]], np.ndarray[Any, np.dtype[np.int64]]]:
+    """Build the offset and length index of the CCSDS packets contained in buffer.
+
+    Every byte equal to sync_value is a potential packet start. The length of each candidate is decoded
+    from its primary header, which links it to the candidate starting right after it.
+    The packet chain starting at the first byte is then enumerated by pointer doubling,
+    so the whole index is built with a logarithmic number of vectorized passes.
+
+    Parameters
+    ----------
+    buffer: numpy.ndarray
+        uint8 buffer of the packet file (usually memory mapped)
+    primary_header: int, optional
+        size in bytes of the packet primary header
+    sync_value: int, optional
+        expected value of the first byte of each packet
+    scan_step: int, optional
+        number of bytes scanned at once when looking for candidates
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray]
+        offsets and lengths of each packet
+
+    Raises
+    ------
+    ValueError
+        If a packet doesn't start with sync_value or if a packet header is truncated
+    """
+    size = buffer.size
+    if size == 0:
+        return np.zeros(0, dtype="int64"), np.zeros(0, dtype="int64")
+    if buffer[0] != sync_value:
+        raise ValueError(f"Buffered value {buffer[0]} != {sync_value}.")
+
+    candidates = np.concatenate(
+        [
+            np.flatnonzero(buffer[start : start + scan_step] == sync_value) + start  # noqa
+            for start in range(0, size, scan_step)
+        ],
+    ).astype("int64")
+    n_candidates = candidates.size
+    end_node, bad_node = n_candidates, n_candidates + 1
+
+    complete = candidates + primary_header <= size
+    headers = candidates[complete]
+    lengths = np.zeros(n_candidates, dtype="int64")
+    lengths[complete] = ((buffer[headers + 4].astype("int64") << 8) | buffer[headers + 5]) + primary_header + 1
+    next_offsets = candidates + lengths
+    next_nodes = np.searchsorted(candidates, next_offsets)
+    linked = candidates[np.minimum(next_nodes, n_candidates - 1)] == next_offsets
+
+    # successor[node] is the candidate following node, or one of the two absorbing end/bad nodes.
+    successor = np.empty(n_candidates + 2, dtype="int64")
+    successor[:n_candidates] = np.where(linked, next_nodes, np.where(next_offsets >= size, end_node, bad_node))
+    successor[:n_candidates][~complete] = bad_node
+    successor[end_node] = end_node
+    successor[bad_node] = bad_node
+
+    # chain holds the 2**k first packets, jump the 2**k-th successor of each candidate.
+    chain = np.zeros(1, dtype="int64")
+    jump = successor
+    while True:
+        extension = jump[chain]
+        stop = np.flatnonzero(extension >= n_candidates)
+        if stop.size:
+            chain = np.concatenate([chain, extension[: stop[0]]])
+            last_node = extension[stop[0]]
+            break
+        chain = np.concatenate([chain, extension])
+        jump = jump[jump]
+
+    if last_node == bad_node:
+        last_packet = chain[-1]
+        next_offset = int(candidates[last_packet] + lengths[last_packet])
+        if not complete[last_packet]:
+            raise ValueError(f"Truncated packet header at offset {candidates[last_packet]}.")
+        raise ValueError(f"Buffered value {buffer[next_offset]} != {sync_value}.")
+    return candidates[chain], lengths[chain]
+
+
+def packet_index_path(url: str, index_cache: Union[bool, str, None]) -> Optional[str]:
+    """Path of the persisted packet index of the given packet file.
+
+    Parameters
+    ----------
+    url: str
+        path to the packet file
+    index_cache: Union[bool, str, None]
+        True to use a sidecar file next to the packet file, a directory path to use a shared cache directory,
+        False or None to disable the persisted index
+
+    Returns
+    -------
+    Optional[str]
+        None if the persisted index is disabled
+    """
+    if not index_cache:
+        return None
+    if index_cache is True:
+        return f"{url}.index.npz"
+    key = hashlib.sha256(os.path.abspath(url).encode()).hexdigest()
+    return os.path.join(str(index_cache), f"{os.path.basename(url)}.{key}.index.npz")
+
+
+def _file_signature(url: str) -> np.ndarray[Any, np.dtype[np.int64]]:
+    stat = os.stat(url)
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype="int64")
+
+
+def load_packet_index(
+    index_path: str,
+    url: str,
+    primary_header: int,
+) -> Optional[tuple[np.ndarray[Any, np.dtype[np.int64]], np.ndarray[Any, np.dtype[np.int64]]]]:
+    """Read a packet index saved by save_packet_index.
+
+    Returns
+    -------
+    Optional[tuple[numpy.ndarray, numpy.ndarray]]
+        packet offsets and lengths, or None if there is no index or if it is out of date
+    """
+    try:
+        with np.load(index_path) as index:
+            if index["primary_header"] != primary_header or not np.array_equal(
+                index["signature"], _file_signature(url)
+            ):
+                return None
+            return index["offsets"], index["lengths"]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_packet_index(
+    index_path: str,
+    url: str,
+    primary_header: int,
+    offsets: np.ndarray[Any, np.dtype[np.int64]],
+    lengths: np.ndarray[Any, np.dtype[np.int64]],
+) -> None:
+    """Persist a packet index, with the size and modification time of the packet file to detect changes.
+
+    The index is written in a temporary file then renamed, so concurrent readers never see a partial index.
+    Failing to write the index only emits a warning.
+    """
+    index_dir = os.path.dirname(os.path.abspath(index_path))
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=index_dir, suffix=".tmp", delete=False) as index_file:
+            np.savez(
+                index_file,
+                offsets=offsets,
+                lengths=lengths,
+                signature=_file_signature(url),
+                primary_header=primary_header,
+            )
+        os.replace(index_file.name, index_path)
+    except OSError as e:
+        warnings.warn(f"Can not save the packet index of {url} in {index_path}: {e}")
+
+
+def extract_bits(
+    buffer: np.ndarray[Any, np.dtype[np.uint8]],
+    offsets: np.ndarray[Any, np.dtype[np.int64]],
+    offset_in_bits: int,
+    length_in_bits: int,
+    output_type: Any,
+) -> np.ndarray[Any, Any]:
+    """Extract a big endian bit field from every packet at once.
+
+    Parameters
+    ----------
+    buffer: numpy.ndarray
+        uint8 buffer of the packet file
+    offsets: numpy.ndarray
+        byte offset of each packet in buffer
+    offset_in_bits: int
+        position of the field from the start of the packet
+    length_in_bits: int
+        size of the field
+    output_type: Any
+        numpy dtype of the result
+
+    Returns
+    -------
+    numpy.ndarray
+        one value per packet
+    """
+    start_byte = offset_in_bits // 8
+    end_byte = (offset_in_bits + length_in_bits - 1) // 8 + 1
+    shift = end_byte * 8 - (offset_in_bits + length_in_bits)
+    mask = np.uint64((1 << min(length_in_bits, 64)) - 1)
+
+    word = np.zeros(offsets.shape, dtype="uint64")
+    # Bytes before the 8 last ones only hold bits removed by the mask.
+    for byte_index in range(max(start_byte, end_byte - 8), end_byte):
+        # The shift is applied on each byte before assembling the word, as the legacy per packet decoding did.
+        word = (word << np.uint64(8)) | (buffer[offsets + byte_index] >> shift)
+    return (word & mask).astype(output_type)
+
+
+def extract_bytes(
+    buffer: np.ndarray[Any, np.dtype[np.uint8]],
+    offsets: np.ndarray[Any, np.dtype[np.int64]],
+    start_byte: int,
+    end_byte: int,
+) -> np.ndarray[Any, np.dtype[np.uint8]]:
+    """Extract the same byte range of every packet as a (packets, bytes) matrix."""
+    return buffer[offsets[:, np.newaxis] + np.arange(start_byte, end_byte)]
+
+
+def extract_var_bytes(
+    buffer: np.ndarray[Any, np.dtype[np.uint8]],
+    starts: np.ndarray[Any, np.dtype[np.int64]],
+    lengths: np.ndarray[Any, np.dtype[np.int64]],
+) -> np.ndarray[Any, np.dtype[np.uint8]]:
+    """Extract variable length byte ranges as rows of a zero padded (ranges, max length) matrix."""
+    lengths = np.maximum(lengths, 0)
+    parameter = np.zeros((starts.size, np.max(lengths, initial=0)), dtype="uint8")
+    parameter[np.arange(parameter.shape[1]) < lengths[:, np.newaxis]] = buffer[ragged_index(starts, lengths)]
+    return parameter
+
+
+def ragged_index(
+    starts: np.ndarray[Any, np.dtype[np.int64]],
+    lengths: np.ndarray[Any, np.dtype[np.int64]],
+) -> np.ndarray[Any, np.dtype[np.int64]]:
+    """Concatenation of the ranges [start, start + length) without a Python loop."""
+    non_empty = lengths > 0
+    starts, lengths = starts[non_empty], lengths[non_empty]
+    if starts.size == 0:
+        return np.zeros(0, dtype="int64")
+    steps = np.ones(lengths.sum(), dtype="int64")
+    steps[0] = starts[0]
+    steps[np.cumsum(lengths[:-1])] = starts[1:] - (starts[:-1] + lengths[:-1] - 1)
+    return np.cumsum(steps)
+
+
+class RaggedBytes:
+    """Variable length byte ranges of a flat uint8 buffer, without padding.
+
+    Range i is buffer[starts[i]:starts[i] + lengths[i]]. The buffer is typically the memory mapped packet file,
+    so items are views on it and nothing is copied until the data are written.
+
+    It behaves like a 1D numpy object array of uint8 arrays, so it can be given to :obj:`EOVariable` as data,
+    and it is written in Zarr with a variable length array codec.
+
+    Parameters
+    ----------
+    buffer: numpy.ndarray
+        flat uint8 buffer holding the ranges
+    starts: numpy.ndarray
+        start offset of each range in buffer
+    lengths: numpy.ndarray
+        byte length of each range
+
+    Examples
+    --------
+    >>> ragged = RaggedBytes(np.arange(10, dtype="uint8"), np.array([0, 6]), np.array([2, 4]))
+    >>> ragged[1]
+    array([6, 7, 8, 9], dtype=uint8)
+    >>> ragged.to_padded()
+    array([[0, 1, 0, 0],
+           [6, 7, 8, 9]], dtype=uint8)
+    """
+
+    dtype = np.dtype(object)
+    ndim = 1
+
+    def __init__(
+        self,
+        buffer: np.ndarray[Any, np.dtype[np.uint8]],
+        starts: np.ndarray[Any, np.dtype[np.int64]],
+        lengths: np.ndarray[Any, np.dtype[np.int64]],
+    ) -> None:
+        self.buffer = buffer
+        self.starts = np.asarray(starts, dtype="int64")
+        self.lengths = np.maximum(np.asarray(lengths, dtype="int64"), 0)
+
+    @classmethod
+    def from_arrays(cls, arrays: Iterable[Any]) -> "RaggedBytes":
+        """Concatenate byte arrays in a new flat buffer."""
+        arrays = [np.asarray(array, dtype="uint8").ravel() for array in arrays]
+        lengths = np.array([array.size for array in arrays], dtype="int64")
+        starts = np.cumsum(lengths) - lengths
+        return cls(np.concatenate(arrays) if arrays else np.zeros(0, dtype="uint8"), starts, lengths)
+
+    @property
+    def shape(self) -> tuple[int]:
+        return (self.starts.size,)
+
+    @property
+    def size(self) -> int:
+        return self.starts.size
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes of the ranges, without padding nor offsets"""
+        return int(self.lengths.sum())
+
+    @property
+    def offsets(self) -> np.ndarray[Any, np.dtype[np.int64]]:
+        """Range boundaries in the flat array given by compact, as in the Arrow list layout"""
+        return np.concatenate([[0], np.cumsum(self.lengths)])
+
+    def __len__(self) -> int:
+        return self.starts.size
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, tuple):
+            if len(key) != 1:
+                raise IndexError(f"too many indices for {type(self).__name__}: {key}")
+            key = key[0]
+        if isinstance(key, (int, np.integer)):
+            start = self.starts[key]
+            return self.buffer[start : start + self.lengths[key]]  # noqa
+        return RaggedBytes(self.buffer, self.starts[key], self.lengths[key])
+
+    def __array__(self, dtype: Any = None) -> np.ndarray[Any, Any]:
+        array = np.empty(len(self), dtype=object)
+        for index, (start, length) in enumerate(zip(self.starts, self.lengths)):
+            array[index] = self.buffer[start : start + length]  # noqa
+        return array if dtype is None else array.astype(dtype)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(ranges={len(self)}, nbytes={self.nbytes})"
+
+    def compact(self) -> "RaggedBytes":
+        """Copy the ranges in a new contiguous buffer, releasing the original buffer"""
+        lengths = self.lengths
+        return RaggedBytes(self.buffer[ragged_index(self.starts, lengths)], self.offsets[:-1], lengths)
+
+    def to_padded(self) -> np.ndarray[Any, np.dtype[np.uint8]]:
+        """Zero padded (ranges, max length) matrix, the previous var_bytearray representation"""
+        return extract_var_bytes(self.buffer, self.starts, self.lengths)
+
+
+def extract_fields(
+    buffer: np.ndarray[Any, np.dtype[np.uint8]],
+    offsets: np.ndarray[Any, np.dtype[np.int64]],
+    lengths: np.ndarray[Any, np.dtype[np.int64]],
+    fields: Sequence[tuple[int, int, Any]],
+    chunk_size: int = 1 << 16,
+) -> dict[tuple[int, int, Any], Union[np.ndarray[Any, Any], RaggedBytes]]:
+    """Decode several fields of every packet in a single pass over the packets.
+
+    Packets are processed by chunks: the byte window covering all the fixed position fields is gathered once
+    per chunk, and each field is then decoded from this window.
+
+    Parameters
+    ----------
+    buffer: numpy.ndarray
+        uint8 buffer of the packet file
+    offsets: numpy.ndarray
+        byte offset of each packet in buffer
+    lengths: numpy.ndarray
+        byte length of each packet
+    fields: Sequence[tuple[int, int, Any]]
+        (offset_in_bits, length_in_bits, output_type) of each field, as given to parsekey
+    chunk_size: int, optional
+        number of packets decoded at once
+
+    Returns
+    -------
+    dict[tuple[int, int, Any], numpy.ndarray or RaggedBytes]
+        decoded arrays by field (RaggedBytes for var_bytearray fields)
+    """
+    results: dict[tuple[int, int, Any], Union[np.ndarray[Any, Any], RaggedBytes]] = dict()
+    # fields decoded from the byte window of each chunk of packets
+    window_arrays: dict[tuple[int, int, Any], np.ndarray[Any, Any]] = dict()
+    window_fields: dict[tuple[int, int, Any], tuple[int, int]] = dict()
+    for field in dict.fromkeys(fields):
+        offset_in_bits, length_in_bits, output_type = field
+        start_byte = offset_in_bits // 8
+        if output_type == "var_bytearray":
+            results[field] = RaggedBytes(buffer, offsets + start_byte, lengths - start_byte)
+        elif output_type[:2] == "s_":
+            results[field] = extract_bits(buffer, offsets[:1], offset_in_bits, length_in_bits, output_type[2:])
+        elif output_type == "bytearray":
+            window_fields[field] = (start_byte, start_byte + length_in_bits // 8)
+            results[field] = window_arrays[field] = np.empty((offsets.size, length_in_bits // 8), dtype="uint8")
+        else:
+            window_fields[field] = (start_byte, (offset_in_bits + length_in_bits - 1) // 8 + 1)
+            results[field] = window_arrays[field] = np.empty(offsets.size, dtype=output_type)
+    if not window_fields or offsets.size == 0:
+        return results
+
+    # Fields past the end of the file raise IndexError, as parsekey does, instead of being read out of the buffer.
+    last_offset = int(offsets.max())
+    for field, (_, end_byte) in window_fields.items():
+        if last_offset + end_byte > buffer.size:
+            raise IndexError(
+                f"field {field} of the packet at byte {last_offset} is out of a {buffer.size} bytes buffer"
+            )
+
+    window_start = min(start for start, _ in window_fields.values())
+    window_end = max(end for _, end in window_fields.values())
+    window_width = window_end - window_start
+    for chunk_start in range(0, offsets.size, chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+        window_index = offsets[chunk, np.newaxis] + np.arange(window_start, window_end)
+        window = buffer[window_index].ravel()
+        window_offsets = np.arange(window_index.shape[0], dtype="int64") * window_width - window_start
+        for field, (start_byte, end_byte) in window_fields.items():
+            offset_in_bits, length_in_bits, output_type = field
+            if output_type == "bytearray":
+                window_arrays[field][chunk] = extract_bytes(window, window_offsets, start_byte, end_byte)
+            else:
+                window_arrays[field][chunk] = extract_bits(
+                    window, window_offsets, offset_in_bits, length_in_bits, output_type
+                )
+    return results
+
+
+def packet_mask(values: np.ndarray[Any, Any], condition: Any) -> np.ndarray[Any, np.dtype[np.bool_]]:
+    """Evaluate a packet selection condition on the decoded values of a header field.
+
+    Parameters
+    ----------
+    values: numpy.ndarray
+        one value per packet
+    condition: Any
+        one of:
+
+            * slice(start, stop): start <= value < stop, start or stop can be None
+            * callable: vectorized predicate, called with values
+            * iterable: value in the iterable
+            * scalar: value equal to it
+
+    Returns
+    -------
+    numpy.ndarray
+        boolean mask of the selected packets
+    """
+    if isinstance(condition, slice):
+        mask = np.ones(values.shape, dtype=bool)
+        if condition.start is not None:
+            mask &= values >= condition.start
+        if condition.stop is not None:
+            mask &= values < condition.stop
+        return mask
+    if callable(condition):
+        return np.asarray(condition(values), dtype=bool)
+    if isinstance(condition, Iterable) and not isinstance(condition, (str, bytes)):
+        return np.isin(values, list(condition))
+    return np.asarray(values == condition, dtype=bool)
+
+
+def lazy_extract_field(
+    url: str,
+    offsets: np.ndarray[Any, np.dtype[np.int64]],
+    lengths: np.ndarray[Any, np.dtype[np.int64]],
+    field: tuple[int, int, Any],
+) -> da.Array:
+    """Dask array of a packet field, decoded on demand by chunks of packets.
+
+    Each chunk maps the file again and only reads its own packets, so chunks can be computed
+    in parallel by any dask worker having access to url. The chunk size follows the dask array.chunk-size config.
+
+    Parameters
+    ----------
+    url: str
+        path to the packet file
+    offsets: numpy.ndarray
+        byte offset of each packet in the file
+    lengths: numpy.ndarray
+        byte length of each packet
+    field: tuple[int, int, Any]
+        (offset_in_bits, length_in_bits, output_type) of the field, as given to parsekey
+
+    Returns
+    -------
+    dask.array.Array
+    """
+    offset_in_bits, length_in_bits, output_type = field
+    dtype: np.dtype[Any]
+    row_shape: tuple[int, ...]
+    if output_type == "var_bytearray":
+        # Object array of the RaggedBytes items, chunks are sized on the mean payload length.
+        dtype, row_shape = np.dtype(object), ()
+        row_bytes = max(1, int(np.mean(lengths - offset_in_bits // 8))) if lengths.size else 1
+    elif output_type == "bytearray":
+        dtype, row_shape = np.dtype("uint8"), (length_in_bits // 8,)
+        row_bytes = max(1, length_in_bits // 8)
+    else:
+        dtype, row_shape = np.dtype(output_type), ()
+        row_bytes = dtype.itemsize
+
+    packets_per_chunk = max(1, parse_bytes(dask.config.get("array.chunk-size")) // row_bytes)
+    lazy_offsets = da.from_array(offsets, chunks=packets_per_chunk)
+    lazy_lengths = da.from_array(lengths, chunks=packets_per_chunk)
+    chunks: tuple[tuple[int, ...], ...] = (lazy_offsets.chunks[0], *((size,) for size in row_shape))
+    lazy_field: da.Array = da.map_blocks(
+        _decode_packet_block,
+        lazy_offsets,
+        lazy_lengths,
+        url=url,
+        field=field,
+        dtype=dtype,
+        chunks=chunks,
+        new_axis=list(range(1, 1 + len(row_shape))) or None,
+        meta=np.empty((0,) * (1 + len(row_shape)), dtype=dtype),
+    )
+    return lazy_field
+
+
+def _decode_packet_block(
+    offsets: np.ndarray[Any, np.dtype[np.int64]],
+    lengths: np.ndarray[Any, np.dtype[np.int64]],
+    url: str,
+    field: tuple[int, int, Any],
+) -> np.ndarray[Any, Any]:
+    """Decode one field of a chunk of packets of the file."""
+    return np.asarray(extract_fields(map_file(url), offsets, lengths, [field])[field])
+
+
+class PacketSelection(NamedTuple):
+    """Offset and length of the selected packets of a file, with the fields decoded on these packets"""
+
+    offsets: np.ndarray[Any, np.dtype[np.int64]]
+    lengths: np.ndarray[Any, np.dtype[np.int64]]
+    fields: dict[tuple[int, int, Any], Any]
+
+
 class PoolMemMap:
+    """Buffer and packet index of a packet file, shared by all the accessors opened on this file.
+
+    There is one pool by url. Accessors acquire the pool when they are opened and release it when they are closed:
+    the file is mapped and indexed by the first acquire only. A pool no longer acquired by any accessor stays
+    resident, to be reused if the file is opened again, while the total size of these idle pools fits in
+    residency_budget. Beyond it, the least recently used idle pools are closed and forgotten.
+    With the default budget of 0 bytes, the pool is released as soon as its last accessor is closed.
+
+    Pools can be acquired and released from several threads.
+    """
 
     _buffer: Any
+    _fields: dict[tuple[int, int, Any], Any]
+    _index: tuple[Any, Any]
+    _lock: threading.RLock
     _n_packets: int
-    _packet_length: Any
-    _packet_offset: Any
-    _items: Any
+    _refcount: int
+    _items: "OrderedDict[str, PoolMemMap]"
 
     _n_packets = 0
     _loaded = False
-    _items = {}
+    _items = OrderedDict()
+    _items_lock = threading.RLock()
+    # maximum size in bytes of the pools no longer used by any accessor
+    residency_budget = 0
 
     def __new__(cls: type["PoolMemMap"], url: str) -> "PoolMemMap":
 
-        if url not in cls._items:
-            cls._items[url] = super().__new__(cls)
-        return cls._items[url]
+        with cls._items_lock:
+            if url not in cls._items:
+                pool = super().__new__(cls)
+                pool._fields = dict()
+                pool._lock = threading.RLock()
+                pool._refcount = 0
+                cls._items[url] = pool
+            cls._items.move_to_end(url)
+            return cls._items[url]
 
     def open(self, url: str) -> None:
 
@@ -37,23 +629,116 @@ class PoolMemMap:
         if not self._loaded:
             self._loaded = True
 
+    @classmethod
+    def acquire(cls, url: str, loader: Callable[["PoolMemMap"], None]) -> "PoolMemMap":
+        """Register a new user of the pool of a url, loading it with the given function if it is not resident.
+
+        The pool is looked up (or created) and registered at once, so it can not be evicted before it is loaded.
+
+        Parameters
+        ----------
+        url: str
+            url of the packet file
+        loader: Callable[[PoolMemMap], None]
+            function setting the buffer (and the packet index) of the pool
+
+        Returns
+        -------
+        PoolMemMap
+            the acquired pool
+        """
+        with cls._items_lock:
+            pool = cls(url)
+            with pool._lock:
+                idle = pool._refcount == 0
+                pool._refcount += 1
+        try:
+            with pool._lock:
+                if not pool._loaded:
+                    loader(pool)
+                    pool._loaded = True
+                elif idle:
+                    # decoded fields only live while the file is open
+                    pool.reset()
+        except BaseException:
+            pool.release()
+            raise
+        return pool
+
+    def release(self) -> None:
+        """Unregister a user of the pool, then evict idle pools beyond the residency budget"""
+        with self._lock:
+            self._refcount = max(0, self._refcount - 1)
+        type(self).evict()
+
+    def reset(self) -> None:
+        """Forget the decoded fields"""
+        with self._lock:
+            self._fields.clear()
+            if hasattr(self, "_index"):
+                self._n_packets = self._index[0].size
+
+    @property
+    def packets(self) -> PacketSelection:
+        """All the packets of the file, with the fields decoded on them"""
+        return PacketSelection(self._index[0], self._index[1], self._fields)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the mapped buffer, of the packet index and of the decoded fields"""
+        arrays = [getattr(self, "_buffer", None), *getattr(self, "_index", ())]
+        arrays.extend(self._fields.values())
+        return sum(array.nbytes for array in arrays if isinstance(array, np.ndarray))
+
+    @classmethod
+    def evict(cls) -> None:
+        """Close the least recently used idle pools while their size exceeds the residency budget"""
+        with cls._items_lock:
+            idle = [(url, pool) for url, pool in cls._items.items() if pool._refcount == 0]
+            idle_bytes = sum(pool.nbytes for _, pool in idle)
+            for url, pool in idle:
+                with pool._lock:
+                    if pool._refcount > 0:
+                        continue
+                    if pool._loaded:
+                        if idle_bytes <= cls.residency_budget:
+                            continue
+                        idle_bytes -= pool.nbytes
+                        pool.close()
+                    del cls._items[url]
+
     def close(self) -> None:
 
-        self._loaded = False
-        self._n_packets = 0
+        with self._lock:
+            self._loaded = False
+            self._n_packets = 0
+            self._fields.clear()
 
-        if hasattr(self, "_buffer"):
-            del self._buffer
-        if hasattr(self, "_packet_length"):
-            del self._packet_length
-        if hasattr(self, "_packet_offset"):
-            del self._packet_offset
+            for name in ("_buffer", "_index"):
+                if hasattr(self, name):
+                    delattr(self, name)
 
 
 class MemMapAccessor(EOProductStore):
+    """Accessor to the fields of the variable length packets of a L0 packet file.
+
+    The packet index (offset and length of each packet) is built when the file is opened.
+    It can be persisted to skip the scan when the same file is opened again,
+    with the index_cache open parameter (or class attribute):
+
+        * True: sidecar file next to the packet file
+        * path to a directory: cache directory shared by the packet files
+        * False or None: the index is always rebuilt
+
+    A persisted index is rebuilt when the size or the modification time of the packet file changed.
+
+    A packet selection (see select_packets) only applies to the accessor making it, and to the accessors
+    given it with the packet_selection open parameter: other accessors on the same file still see all its packets.
+    """
 
-    incr_step = 10000
     primary_header = 6
+    index_cache: Union[bool, str, None] = None
+    single_file = True
 
     def __init__(self, url: str, **kwargs: Any) -> None:
         if hasattr(self, "url"):
@@ -63,6 +748,7 @@ class MemMapAccessor(EOProductStore):
         self._poolmemmap = PoolMemMap(url)
         self.url = url
         self._target_type = None
+        self._selection: Optional[PacketSelection] = None
         super().__init__(url)
 
     def open(self, mode: str = "r", **kwargs: Any) -> None:
@@ -71,6 +757,9 @@ class MemMapAccessor(EOProductStore):
             self._target_type = kwargs["target_type"]
         except KeyError as e:
             raise TypeError(f"Missing configuration parameter: {e}")
+        self.index_cache = kwargs.get("index_cache", type(self).index_cache)
+        if kwargs.get("packet_selection") is not None:
+            self._selection = kwargs["packet_selection"]
 
         if self._status == StorageStatus.OPEN:
             return
@@ -80,9 +769,8 @@ class MemMapAccessor(EOProductStore):
 
         super().open(mode=mode)
 
-        if not self._poolmemmap._loaded:
-            self.loadbuffer(self._poolmemmap)
-            self._poolmemmap._loaded = True
+        # the previous pool may have been evicted since the last open
+        self._poolmemmap = PoolMemMap.acquire(self.url, self.loadbuffer)
 
     def close(self) -> None:
 
@@ -90,92 +778,141 @@ class MemMapAccessor(EOProductStore):
             return
 
         super().close()
+        self._selection = None
 
         if hasattr(self, "_poolmemmap"):
-            self._poolmemmap.close()
+            self._poolmemmap.release()
 
-    def loadbuffer(self, pool: PoolMemMap) -> None:
+    @property
+    def packet_selection(self) -> Optional[PacketSelection]:
+        """Packets selected by select_packets, None if the accessor reads all the packets of the file"""
+        return self._selection
 
-        try:
-            with open(self.url, "rb") as f:
-                pool._buffer = np.fromfile(f, np.dtype("B"))
-        except IOError:
-            raise IOError(f"Error While Opening {self.url}!")
-
-        pool._packet_length = np.zeros((self.incr_step), dtype="uint")
-        pool._packet_offset = np.zeros((self.incr_step), dtype="uint")
-
-        k = 0
-        while k < len(pool._buffer):
-            if pool._buffer[k] != 12:
-                raise ValueError(f"Buffered value {pool._buffer[k]} != 12.")
-
-            if pool._n_packets == pool._packet_length.shape[0]:
-                (pool._packet_length).resize(pool._n_packets + self.incr_step, refcheck=False)
-                (pool._packet_offset).resize(pool._n_packets + self.incr_step, refcheck=False)
-
-            pool._packet_offset[pool._n_packets] = k
-            pool._packet_length[pool._n_packets] = (
-                int.from_bytes(pool._buffer[k + 4 : k + self.primary_header], "big") + self.primary_header + 1  # noqa
-            )
+    @packet_selection.setter
+    def packet_selection(self, selection: Optional[PacketSelection]) -> None:
+        self._selection = selection
+
+    def _packets(self) -> PacketSelection:
+        """Packets read by this accessor: its selection, or all the packets of the file"""
+        return self._selection if self._selection is not None else self._poolmemmap.packets
 
-            k += int(pool._packet_length[pool._n_packets])
-            pool._n_packets += 1
+    def loadbuffer(self, pool: PoolMemMap) -> None:
+
+        pool._buffer = map_file(self.url)
+        index_path = packet_index_path(self.url, self.index_cache)
+        index = load_packet_index(index_path, self.url, self.primary_header) if index_path else None
+        if index is None:
+            index = index_packets(pool._buffer, self.primary_header)
+            if index_path:
+                save_packet_index(index_path, self.url, self.primary_header, *index)
+        pool._index = index
+        pool.reset()
 
     def parsekey(self, offset_in_bits: int, length_in_bits: int, output_type: Any) -> Any:
 
-        if output_type == "var_bytearray":
-            start_byte = offset_in_bits // 8
-            parameter = np.zeros(
-                (self._poolmemmap._n_packets, np.max(self._poolmemmap._packet_length) - start_byte),
-                dtype="uint8",
-            )
-            for k in range(self._poolmemmap._n_packets):
-                end_byte = self._poolmemmap._packet_length[k]
-                parameter[k, 0 : end_byte - start_byte] = self._poolmemmap._buffer[  # noqa
-                    self._poolmemmap._packet_offset[k]
-                    + start_byte : self._poolmemmap._packet_offset[k]  # noqa
-                    + end_byte  # noqa
-                ]
+        buffer = self._poolmemmap._buffer
+        offsets, lengths, _ = self._packets()
+        start_byte = offset_in_bits // 8
 
-            return parameter
+        if output_type == "var_bytearray":
+            return RaggedBytes(buffer, offsets + start_byte, lengths - start_byte)
 
         elif output_type == "bytearray":
-            start_byte = offset_in_bits // 8
-            parameter = np.zeros((self._poolmemmap._n_packets, length_in_bits // 8), dtype="uint8")
-            for k in range(self._poolmemmap._n_packets):
-                end_byte = length_in_bits // 8 + start_byte
-                parameter[k,] = self._poolmemmap._buffer[  # noqa
-                    self._poolmemmap._packet_offset[k]
-                    + start_byte : self._poolmemmap._packet_offset[k]  # noqa
-                    + end_byte  # noqa
-                ]
-
-            return parameter
+            return extract_bytes(buffer, offsets, start_byte, start_byte + length_in_bits // 8)
 
         else:
-            output_packets = self._poolmemmap._n_packets
             if output_type[:2] == "s_":
-                output_packets = 1
+                offsets = offsets[:1]
                 output_type = output_type[2:]
-            parameter = np.zeros(output_packets, dtype=output_type)
-            start_byte = offset_in_bits // 8
-            end_byte = (offset_in_bits + length_in_bits - 1) // 8 + 1
-            shift = end_byte * 8 - (offset_in_bits + length_in_bits)
-            mask = np.sum(2 ** np.arange(length_in_bits))
-
-            for k in range(output_packets):
-                data = (
-                    self._poolmemmap._buffer[
-                        int(self._poolmemmap._packet_offset[k] + start_byte) : int(  # noqa
-                            self._poolmemmap._packet_offset[k] + end_byte,
-                        )  # noqa
-                    ]
-                    >> shift
-                )
-                parameter[k] = (int.from_bytes(data, "big")) & mask
+            return extract_bits(buffer, offsets, offset_in_bits, length_in_bits, output_type)
+
+    def lazy_parsekey(self, offset_in_bits: int, length_in_bits: int, output_type: Any) -> Any:
+        """Same as parsekey, but the result is a dask array decoding the packets by chunks when computed.
+
+        Scalar types (prefixed by s_) only decode the first packet and stay eager.
+        """
+        if output_type[:2] == "s_":
+            return self.parsekey(offset_in_bits, length_in_bits, output_type)
+        offsets, lengths, _ = self._packets()
+        return lazy_extract_field(self.url, offsets, lengths, (offset_in_bits, length_in_bits, output_type))
+
+    def parsekeys(self, fields: Sequence[tuple[int, int, Any]]) -> dict[tuple[int, int, Any], Any]:
+        """Decode several fields in a single pass over the packet index.
+
+        Parameters
+        ----------
+        fields: Sequence[tuple[int, int, Any]]
+            (offset_in_bits, length_in_bits, output_type) of each field
+
+        Returns
+        -------
+        dict[tuple[int, int, Any], numpy.ndarray]
+            decoded arrays by field
+        """
+        offsets, lengths, _ = self._packets()
+        return extract_fields(self._poolmemmap._buffer, offsets, lengths, fields)
+
+    def select_packets(self, conditions: Iterable[tuple[Any, Mapping[str, Any], Any]]) -> int:
+        """Only keep the packets matching all the given conditions until the accessor is closed.
 
-            return parameter
+        The condition fields are decoded once for all the packets, then the packet index of the accessor is reduced
+        to the selected packets: the following field extractions, lazy or not, only touch these packets.
+        Successive selections are combined. The packet index of the file, shared with the other accessors
+        opened on it, is left unchanged (see packet_selection to share the selection).
+
+        Parameters
+        ----------
+        conditions: Iterable[tuple[Any, Mapping[str, Any], Any]]
+            key and accessor configuration of a header field mapping, and the condition on its value
+            (see packet_mask)
+
+        Returns
+        -------
+        int
+            number of selected packets
+
+        Raises
+        ------
+        StoreNotOpenError
+            If the accessor is closed
+        ValueError
+            If a field is not a numeric field
+        """
+        if self._status == StorageStatus.CLOSE:
+            raise StoreNotOpenError("Store must be open before access to it")
+        pool = self._poolmemmap
+        field_conditions = list()
+        for key, config, condition in conditions:
+            output_type = config["target_type"]
+            # scalar fields are only decoded on the first packet, the selection needs every packet
+            output_type = output_type[2:] if output_type[:2] == "s_" else output_type
+            if output_type in ("bytearray", "var_bytearray"):
+                raise ValueError(f"Can not select packets on a {output_type} field")
+            field_conditions.append(((key.start, key.step, output_type), condition))
+
+        offsets, lengths, _ = self._packets()
+        values = extract_fields(pool._buffer, offsets, lengths, [field for field, _ in field_conditions])
+        mask = np.ones(offsets.shape, dtype=bool)
+        for field, condition in field_conditions:
+            mask &= packet_mask(np.asarray(values[field]), condition)
+
+        # decoded fields cover the previous selection
+        self._selection = PacketSelection(offsets[mask], lengths[mask], dict())
+        return int(mask.sum())
+
+    def prefetch(self, keys: Iterable[tuple[Any, Mapping[str, Any]]]) -> None:
+        """Decode together the given keys and keep them until the file is closed.
+
+        Accessors reading the same packets of the file share the decoded fields, whatever their target type.
+
+        Parameters
+        ----------
+        keys: Iterable[tuple[Any, Mapping[str, Any]]]
+            key and accessor configuration of each mapping to decode
+        """
+        fields = [(key.start, key.step, config["target_type"]) for key, config in keys if isinstance(key, slice)]
+        with self._poolmemmap._lock:
+            self._packets().fields.update(self.parsekeys(fields))
 
     def __getitem__(self, key: slice) -> "EOObject":  # type: ignore
         """
@@ -199,7 +936,10 @@ class MemMapAccessor(EOProductStore):
         offset_in_bits = key.start
         length_in_bits = key.step
 
-        ndarray = self.parsekey(offset_in_bits, length_in_bits, self._target_type)
+        field = (offset_in_bits, length_in_bits, self._target_type)
+        ndarray = self._packets().fields.get(field)
+        if ndarray is None:
+            ndarray = self.lazy_parsekey(offset_in_bits, length_in_bits, self._target_type)
         if len(ndarray.shape) == 0:
             raise KeyError
         return EOVariable(data=ndarray)
@@ -231,6 +971,8 @@ class MemMapAccessor(EOProductStore):
 
 
 class FixedMemMapAccessor(EOProductStore):
+    single_file = True
+
     def __init__(self, url: str, **kwargs: Any) -> None:
 
         if hasattr(self, "url"):
@@ -257,9 +999,8 @@ class FixedMemMapAccessor(EOProductStore):
 
         super().open(mode=mode)
 
-        if not self._poolmemmap._loaded:
-            self.loadbuffer(self._poolmemmap)
-            self._poolmemmap._loaded = True
+        # the previous pool may have been evicted since the last open
+        self._poolmemmap = PoolMemMap.acquire(self.url, self.loadbuffer)
 
     def close(self) -> None:
         if self._status == StorageStatus.CLOSE:
@@ -268,47 +1009,37 @@ class FixedMemMapAccessor(EOProductStore):
         super().close()
 
         if hasattr(self, "_poolmemmap"):
-            self._poolmemmap.close()
+            self._poolmemmap.release()
 
     def loadbuffer(self, pool: PoolMemMap) -> None:
 
-        try:
-            with open(self.url, "rb") as f:
-                pool._buffer = np.fromfile(f, np.dtype("B"))
-        except IOError:
-            raise IOError(f"Error While Opening {self.url}")
+        pool._buffer = map_file(self.url)
 
     def parsekey(self, offset_in_bits: int, length_in_bits: int, packet_len: int, output_type: Any) -> Any:
 
-        if output_type == "bytearray":
-            start_byte = offset_in_bits // 8
-            parameter = np.zeros((self._poolmemmap._n_packets, length_in_bits // 8), dtype="uint8")
-            for k in range(self._poolmemmap._n_packets):
-                end_byte = length_in_bits // 8 + start_byte
-                parameter[k,] = self._poolmemmap._buffer[  # noqa
-                    packet_len * k + start_byte : packet_len * k + end_byte  # noqa
-                ]
+        buffer = self._poolmemmap._buffer
+        offsets = np.arange(self._poolmemmap._n_packets, dtype="int64") * packet_len
+        start_byte = offset_in_bits // 8
 
-            return parameter
+        if output_type == "bytearray":
+            return extract_bytes(buffer, offsets, start_byte, start_byte + length_in_bits // 8)
 
         else:
-            output_packets = self._poolmemmap._n_packets
             if output_type[:2] == "s_":
-                output_packets = 1
+                offsets = offsets[:1]
                 output_type = output_type[2:]
-            parameter = np.zeros(output_packets, dtype=output_type)
-            start_byte = offset_in_bits // 8
-            end_byte = (offset_in_bits + length_in_bits - 1) // 8 + 1
-            shift = end_byte * 8 - (offset_in_bits + length_in_bits)
-            mask = np.sum(2 ** np.arange(length_in_bits))
+            return extract_bits(buffer, offsets, offset_in_bits, length_in_bits, output_type)
 
-            for k in range(output_packets):
-                data = (
-                    self._poolmemmap._buffer[packet_len * k + start_byte : packet_len * k + end_byte] >> shift  # noqa
-                )  # noqa
-                parameter[k] = (int.from_bytes(data, "big")) & mask
+    def lazy_parsekey(self, offset_in_bits: int, length_in_bits: int, packet_len: int, output_type: Any) -> Any:
+        """Same as parsekey, but the result is a dask array decoding the packets by chunks when computed.
 
-            return parameter
+        Scalar types (prefixed by s_) only decode the first packet and stay eager.
+        """
+        if output_type[:2] == "s_":
+            return self.parsekey(offset_in_bits, length_in_bits, packet_len, output_type)
+        offsets = np.arange(self._poolmemmap._n_packets, dtype="int64") * packet_len
+        lengths = np.full(offsets.shape, packet_len, dtype="int64")
+        return lazy_extract_field(self.url, offsets, lengths, (offset_in_bits, length_in_bits, output_type))
 
     def __getitem__(self, key: slice) -> "EOObject":  # type: ignore
         """
@@ -334,7 +1065,7 @@ class FixedMemMapAccessor(EOProductStore):
         packet_length = key.step
         self._poolmemmap._n_packets = self._poolmemmap._buffer.size // packet_length
 
-        ndarray = self.parsekey(offset_in_bits, length_in_bits, packet_length, self._target_type)
+        ndarray = self.lazy_parsekey(offset_in_bits, length_in_bits, packet_length, self._target_type)
         if len(ndarray.shape) == 0:
             raise KeyError
         return EOVariable(data=ndarray)
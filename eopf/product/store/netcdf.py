@@ -1,19 +1,32 @@
+import hashlib
 import itertools as it
 import json
 import os
 import pathlib
+import re
+import tempfile
+import threading
+import uuid
+import warnings
+from collections import OrderedDict
 from collections.abc import Mapping, MutableMapping
 from numbers import Number
 from typing import TYPE_CHECKING, Any, Iterator, Optional, Union
 
+import dask
 import fsspec
 import kerchunk.hdf
+import numpy as np
+from dask import array as da
+from dask.base import tokenize
+from dask.utils import parse_bytes
 from netCDF4 import Dataset, Group, Variable
 
 from eopf.exceptions import StoreNotOpenError
 from eopf.formatting import formatable_method
 from eopf.formatting.factory import unformatable_method
-from eopf.product.store import EOProductStore
+from eopf.product.store import EOProductStore, StorageStatus
+from eopf.product.store.abstract import EOReadOnlyStore
 from eopf.product.store.zarr import EOZarrStore
 from eopf.product.utils import conv, decode_attrs, reverse_conv
 
@@ -21,14 +34,282 @@ if TYPE_CHECKING:  # pragma: no cover
     from eopf.product.core.eo_object import EOObject
 
 
+# netCDF4 and HDF5 are not thread safe, all the accesses to netCDF4 objects share this lock.
+NETCDF4_LOCK = threading.RLock()
+
+# templates used in the urls of kerchunk references, ex: "{{u}}"
+_TEMPLATE_PATTERN = re.compile(r"{{\s*(\w+)\s*}}")
+
+
 def decode_netcdf_attrs(ncattrs: Mapping[str, Any]) -> dict[str, Any]:
     return {key: decode_attrs(value) for key, value in ncattrs.items()}
 
 
+class KerchunkReferenceCache:
+    """Cache of the kerchunk references of netCDF files, to translate their metadata only once.
+
+    References are kept in memory (least recently used first evicted), and optionally on disk.
+    They are keyed by the url, size and modification time of the file: files without modification time
+    are not cached.
+
+    Parameters
+    ----------
+    max_entries: int, optional
+        maximum number of references kept in memory
+    directory: str, optional
+        folder where the references are persisted as json, reused by the following processes
+
+    Attributes
+    ----------
+    hits: int
+        number of references found in memory
+    disk_hits: int
+        number of references read from the directory
+    misses: int
+        number of translated files
+    """
+
+    # files kerchunk can't translate are recorded, to open them directly with netCDF4
+    UNTRANSLATABLE = "untranslatable"
+
+    def __init__(self, max_entries: int = 256, directory: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._items: OrderedDict[tuple[Any, ...], Optional[dict[str, Any]]] = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Cache counters, for diagnostics"""
+        return dict(hits=self.hits, disk_hits=self.disk_hits, misses=self.misses, entries=len(self._items))
+
+    def clear(self) -> None:
+        """Drop the references kept in memory and reset the counters (the directory is left untouched)."""
+        with self._lock:
+            self._items.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def get(self, url: str, storage_options: dict[str, Any] = {}) -> Optional[dict[str, Any]]:
+        """Kerchunk references of the netCDF file at url, translated only if they are not cached.
+
+        Parameters
+        ----------
+        url: str
+            url of the netCDF file
+        storage_options: dict[str, Any], optional
+            fsspec options to access the file
+
+        Returns
+        -------
+        dict[str, Any] or None
+            references of the file, None if kerchunk can't translate it
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file does not exist
+        """
+        key = self._key(url, storage_options)
+        if key is not None:
+            with self._lock:
+                if key in self._items:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return self._copy(self._items[key])
+            found, references = self._load(key)
+            if found:
+                with self._lock:
+                    self.disk_hits += 1
+                self._add(key, references)
+                return self._copy(references)
+        with self._lock:
+            self.misses += 1
+        references = self._translate(url, storage_options)
+        if key is not None:
+            self._add(key, references)
+            self._save(key, references)
+        return self._copy(references)
+
+    @staticmethod
+    def _key(url: str, storage_options: dict[str, Any]) -> Optional[tuple[Any, ...]]:
+        fs, path = fsspec.core.url_to_fs(url, **storage_options)
+        info = fs.info(path)
+        modified = next(
+            (info[key] for key in ("mtime", "LastModified", "last_modified", "updated", "modified") if key in info),
+            None,
+        )
+        if modified is None:
+            return None
+        return (url, info.get("size"), str(modified))
+
+    @staticmethod
+    def _copy(references: Optional[dict[str, Any]]) -> Optional[dict[str, Any]]:
+        """Copy of the reference mappings, given to the reference filesystems."""
+        if references is None:
+            return None
+        if "refs" in references:
+            return {**references, "refs": dict(references["refs"])}
+        return dict(references)
+
+    @staticmethod
+    def _translate(url: str, storage_options: dict[str, Any]) -> Optional[dict[str, Any]]:
+        with fsspec.open(url, "rb", **storage_options) as open_file:
+            # kerchunk convert the netcdf metadata into a zarr compatible mapping.
+            try:
+                return kerchunk.hdf.SingleHdf5ToZarr(open_file, url).translate()
+            except (OSError, TypeError):
+                # Kerchunk fail on small netcdf files (< 2Kio) with OSError
+                # Seems to be caused by it always requesting the first 2kio to parse the matadata.
+                # Kerchunk fail on file containing variable length strings with TypeError
+                # cf : https://github.com/fsspec/kerchunk/issues/167
+                return None
+
+    def _add(self, key: tuple[Any, ...], references: Optional[dict[str, Any]]) -> None:
+        with self._lock:
+            self._items[key] = references
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def _path(self, key: tuple[Any, ...]) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, hashlib.sha256(key[0].encode()).hexdigest() + ".json")
+
+    def _load(self, key: tuple[Any, ...]) -> tuple[bool, Optional[dict[str, Any]]]:
+        path = self._path(key)
+        if path is None:
+            return False, None
+        try:
+            with open(path) as reference_file:
+                content = json.load(reference_file)
+        except FileNotFoundError:
+            return False, None
+        except Exception as e:
+            warnings.warn(f"Ignoring invalid kerchunk references {path}: {e}")
+            return False, None
+        if content.get("key") != list(key):
+            return False, None
+        references = content.get("refs")
+        return True, None if references == self.UNTRANSLATABLE else references
+
+    def _save(self, key: tuple[Any, ...], references: Optional[dict[str, Any]]) -> None:
+        path = self._path(key)
+        if path is None:
+            return
+        content = {"key": list(key), "refs": self.UNTRANSLATABLE if references is None else references}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(path), suffix=".tmp", delete=False) as tmp:
+                json.dump(content, tmp)
+            os.replace(tmp.name, path)
+        except Exception as e:
+            warnings.warn(f"Can not write kerchunk references {path}: {e}")
+
+
+def combine_references(references: Mapping[str, dict[str, Any]]) -> dict[str, Any]:
+    """Combine the kerchunk references of several files in the references of a single zarr,
+    holding each file in its own group.
+
+    Parameters
+    ----------
+    references: Mapping[str, dict[str, Any]]
+        references (as translated by kerchunk) by group path, ex: {"measurement/Oa01_radiance.nc": {...}}
+
+    Returns
+    -------
+    dict[str, Any]
+        version 1 kerchunk references of the combined zarr
+    """
+    zgroup = json.dumps({"zarr_format": 2})
+    combined_refs: dict[str, Any] = {".zgroup": zgroup}
+    templates: dict[str, Any] = dict()
+    for index, (group, file_references) in enumerate(references.items()):
+        group = group.strip("/")
+        if not group:
+            raise ValueError("Combined references must be in a sub group")
+        parts = group.split("/")
+        for depth in range(1, len(parts)):
+            combined_refs.setdefault("/".join([*parts[:depth], ".zgroup"]), zgroup)
+        if file_references.get("version") == 1:
+            file_refs = file_references["refs"]
+            # kerchunk gives the same template names to all the files (ex: {"u": url}),
+            # so the templates of each file are renamed before being merged
+            file_templates = file_references.get("templates", {})
+            if file_templates:
+                templates.update({f"{name}_{index}": url for name, url in file_templates.items()})
+                file_refs = {key: _rename_templates(value, file_templates, index) for key, value in file_refs.items()}
+        else:
+            file_refs = file_references
+        for key, value in file_refs.items():
+            combined_refs[f"{group}/{key}"] = value
+    combined: dict[str, Any] = {"version": 1, "refs": combined_refs}
+    if templates:
+        combined["templates"] = templates
+    return combined
+
+
+def _rename_templates(reference: Any, templates: Mapping[str, Any], index: int) -> Any:
+    """Suffix with index the names of the templates used by the url of a kerchunk reference"""
+    if isinstance(reference, list) and reference and isinstance(reference[0], str) and "{{" in reference[0]:
+        url = _TEMPLATE_PATTERN.sub(
+            lambda match: f"{{{{{match[1]}_{index}}}}}" if match[1] in templates else match[0],
+            reference[0],
+        )
+        return [url, *reference[1:]]
+    return reference
+
+
+class _StoreGroupView(EOReadOnlyStore):
+    """Read only view on a group of a store shared with other views, which must be closed by its owner."""
+
+    def __init__(self, store: EOProductStore, group: str) -> None:
+        super().__init__(f"{store.url}#{group}")
+        self._store = store
+        self._group = group.strip("/")
+
+    def _path(self, path: str) -> str:
+        path = path.strip("/")
+        return f"{self._group}/{path}" if path else self._group
+
+    def __getitem__(self, key: str) -> "EOObject":
+        return self._store[self._path(key)]
+
+    def __len__(self) -> int:
+        return len(list(self._store.iter(self._group)))
+
+    # docstr-coverage: inherited
+    @property
+    def status(self) -> StorageStatus:
+        return self._store.status if self._status == StorageStatus.OPEN else StorageStatus.CLOSE
+
+    # docstr-coverage: inherited
+    def is_group(self, path: str) -> bool:
+        return self._store.is_group(self._path(path))
+
+    # docstr-coverage: inherited
+    def is_variable(self, path: str) -> bool:
+        return self._store.is_variable(self._path(path))
+
+    # docstr-coverage: inherited
+    def iter(self, path: str) -> Iterator[str]:
+        return self._store.iter(self._path(path))
+
+    # docstr-coverage: inherited
+    def write_attrs(self, group_path: str, attrs: MutableMapping[str, Any] = {}) -> None:
+        raise NotImplementedError()
+
+
 class EONetCDFStore(EOProductStore):
     """
     Store representation to access NetCDF format of the given URL.
 
+    In read mode the netCDF is read as a zarr through its kerchunk references,
+    translated once by file thanks to the reference cache.
+
     Parameters
     ----------
     url: str
@@ -38,6 +319,9 @@ class EONetCDFStore(EOProductStore):
     ----------
     url: str
         path url or the target store
+    reference_cache: KerchunkReferenceCache
+        cache of the kerchunk references, shared by all the stores by default.
+        Can also be given to open as a kwarg.
     zlib: bool
         enable/disable compression
     complevel: int [1-9]
@@ -46,6 +330,9 @@ class EONetCDFStore(EOProductStore):
         enable/disable hdf5 shuffle
     """
 
+    reference_cache = KerchunkReferenceCache()
+    single_file = True
+
     # docstr-coverage: inherited
     def __init__(self, url: str) -> None:
         self._sub_store: Optional[EOProductStore] = None
@@ -81,7 +368,26 @@ class EONetCDFStore(EOProductStore):
 
     # docstr-coverage: inherited
     def open(self, mode: str = "r", **kwargs: Any) -> None:
-        if mode == "r":
+        """Open the store in the given mode
+
+        library specifics parameters :
+            - reference_cache : KerchunkReferenceCache used instead of the shared one
+            - combined_store, combined_group : open store and group in it holding the file,
+              read from there instead of the file itself. ex : a zarr of the combined references of several files
+
+        Parameters
+        ----------
+        mode: str, optional
+            mode to open the store
+        **kwargs: Any
+            extra kwargs of open on librairy used
+        """
+        combined_store = kwargs.pop("combined_store", None)
+        combined_group = kwargs.pop("combined_group", None)
+        if combined_store is not None and mode == "r":
+            self._sub_store = _StoreGroupView(combined_store, combined_group)
+            self._sub_store.open(mode)
+        elif mode == "r":
             self._sub_store = self._open_with_zarr(mode, **kwargs)
         else:
             self._sub_store = self._open_with_netcdf4py(mode, **kwargs)
@@ -137,26 +443,113 @@ class EONetCDFStore(EOProductStore):
 
         """
         storage_options = kwargs.pop("storage_options", dict())
-        # kerchunk
-        with fsspec.open(self.url, "rb", **storage_options) as open_file:
-            # kerchunk convert the netcdf metadata into a zarr compatible mapping.
-            # It's obviously read only.
-            try:
-                zarr_compatible_data = kerchunk.hdf.SingleHdf5ToZarr(open_file, self.url).translate()
-            except (OSError, TypeError):
-                # Kerchunk fail on small netcdf files (< 2Kio) with OSError
-                # Seems to be caused by it always requesting the first 2kio to parse the matadata.
-                # We fall back to netcdf4py store.
+        reference_cache = kwargs.pop("reference_cache", self.reference_cache)
+        # kerchunk convert the netcdf metadata into a zarr compatible mapping.
+        # It's obviously read only.
+        zarr_compatible_data = reference_cache.get(self.url, storage_options)
+        if zarr_compatible_data is None:
+            # We fall back to netcdf4py store.
+            return self._open_with_netcdf4py(mode, storage_options=storage_options, **kwargs)
+        zarr_store_r = EOZarrStore("reference://")
+        storage_options_zopen = storage_options.copy()  # fsspec async problems without.
+        storage_options_zopen["fo"] = zarr_compatible_data
+        zarr_store_r.open(mode, consolidated=False, storage_options=storage_options_zopen, **kwargs)
+        return zarr_store_r
 
-                # Kerchunk fail on file containing variable length strings with TypeError
-                # cf : https://github.com/fsspec/kerchunk/issues/167
 
-                return self._open_with_netcdf4py(mode, storage_options=storage_options, **kwargs)
-            zarr_store_r = EOZarrStore("reference://")
-            storage_options_zopen = storage_options.copy()  # fsspec async problems without.
-            storage_options_zopen["fo"] = zarr_compatible_data
-            zarr_store_r.open(mode, consolidated=False, storage_options=storage_options_zopen, **kwargs)
-        return zarr_store_r
+class NetCDF4LazyArray:
+    """Array like reading on demand the slices of a netCDF4 variable, to be wrapped in a dask array.
+
+    Values are masked and scaled by netCDF4 as when reading the variable directly: masked values of
+    variables declaring a fill value or a valid range are replaced by NaN (in a float dtype),
+    others are read as stored.
+    If the dataset of the variable is closed the file is opened again, so the array can outlive its store
+    (and be pickled to other processes).
+    The dask name of the array changes with the size and modification time of the file,
+    so a file rewritten at the same url is not read from the results of the previous one.
+
+    Parameters
+    ----------
+    variable: netCDF4.Variable
+        variable to read
+    url: str
+        path of the netCDF file
+    path: str
+        path of the variable in the file
+    """
+
+    MASK_ATTRS = ("_FillValue", "missing_value", "valid_min", "valid_max", "valid_range")
+
+    def __init__(self, variable: Variable, url: str, path: str) -> None:
+        self.url = url
+        self.path = path
+        self._variable: Optional[Variable] = variable
+        self._dataset: Optional[Dataset] = None
+        try:
+            stat = os.stat(url)
+            self.file_token: Any = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            # not a local file (ex: OPeNDAP url), each array is a new version
+            self.file_token = uuid.uuid4().hex
+        with NETCDF4_LOCK:
+            self.shape: tuple[int, ...] = tuple(variable.shape)
+            chunking = variable.chunking()
+            self.native_chunks = None if chunking == "contiguous" or chunking is None else tuple(chunking)
+            sample = variable[tuple(slice(0, 1) for _ in self.shape)] if all(self.shape) else None
+            dtype = np.dtype(variable.dtype if sample is None else np.asarray(sample).dtype)
+            masked = variable.mask and any(attr in variable.ncattrs() for attr in self.MASK_ATTRS)
+        self.fill_value: Any = None
+        if masked and dtype.kind in "iuf":
+            # same promotion as xarray
+            dtype = np.result_type(dtype, np.float32) if dtype.itemsize <= 2 else np.result_type(dtype, np.float64)
+            self.fill_value = np.nan
+        self.dtype = dtype
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def chunks(self) -> tuple[tuple[int, ...], ...]:
+        """Dask chunks of the array, multiples of the native HDF5 chunks of the variable."""
+        if self.dtype == object:
+            # the size of variable length values can't be estimated
+            return da.core.normalize_chunks(self.native_chunks or self.shape, self.shape)
+        return da.core.normalize_chunks("auto", self.shape, dtype=self.dtype, previous_chunks=self.native_chunks)
+
+    def to_dask(self) -> da.Array:
+        """Lazy dask array of the variable."""
+        return da.from_array(
+            self,
+            chunks=self.chunks(),
+            name=f"netcdf4-{self.path.strip('/')}-{tokenize(self.url, self.path, self.file_token)}",
+            asarray=False,
+            meta=np.empty((0,) * self.ndim, dtype=self.dtype),
+        )
+
+    def __getitem__(self, key: Any) -> np.ndarray[Any, Any]:
+        with NETCDF4_LOCK:
+            data = self._get_variable()[key]
+        if isinstance(data, np.ma.MaskedArray):
+            if self.fill_value is not None:
+                return np.ma.filled(data.astype(self.dtype), self.fill_value)
+            data = np.ma.getdata(data)
+        return np.asarray(data, dtype=self.dtype)
+
+    def __getstate__(self) -> dict[str, Any]:
+        return dict(self.__dict__, _variable=None, _dataset=None)
+
+    def _get_variable(self) -> Variable:
+        if self._variable is not None and self._variable.group().isopen():
+            return self._variable
+        if self._dataset is None or not self._dataset.isopen():
+            self._dataset = Dataset(self.url, "r")
+        self._variable = self._dataset[self.path]
+        return self._variable
+
+    def __del__(self) -> None:
+        if self._dataset is not None and self._dataset.isopen():
+            with NETCDF4_LOCK:
+                self._dataset.close()
 
 
 class EONetCDFStoreNCpy(EOProductStore):
@@ -178,9 +571,13 @@ class EONetCDFStoreNCpy(EOProductStore):
         level of the compression
     shuffle: bool
         enable/disable hdf5 shuffle
+    write_batch_bytes: int
+        size in bytes of the batches of dask blocks computed together when writing a variable
     """
 
     RESTRICTED_ATTR_KEY = ("_FillValue",)
+    single_file = True
+    DEFAULT_WRITE_BATCH_BYTES = 2**28
 
     # docstr-coverage: inherited
     def __init__(self, url: str) -> None:
@@ -190,6 +587,7 @@ class EONetCDFStoreNCpy(EOProductStore):
         self.zlib: bool = True
         self.complevel: int = 4
         self.shuffle: bool = True
+        self.write_batch_bytes: int = self.DEFAULT_WRITE_BATCH_BYTES
 
     @formatable_method()
     def __getitem__(self, key: str) -> "EOObject":
@@ -199,14 +597,17 @@ class EONetCDFStoreNCpy(EOProductStore):
 
         from eopf.product.core import EOGroup, EOVariable
 
-        try:
-            obj = self._select_node(key)
-        except IndexError as e:  # if key is invalid, netcdf4 raise IndexError ...
-            raise KeyError(e)
-        attrs = decode_netcdf_attrs(obj.__dict__)
-        if self.is_group(key):
-            return EOGroup(attrs=attrs)
-        return EOVariable(data=obj[:], attrs=attrs, dims=obj.dimensions)
+        with NETCDF4_LOCK:
+            try:
+                obj = self._select_node(key)
+            except IndexError as e:  # if key is invalid, netcdf4 raise IndexError ...
+                raise KeyError(e)
+            attrs = decode_netcdf_attrs(obj.__dict__)
+            if self.is_group(key):
+                return EOGroup(attrs=attrs)
+            # Only the slices used are read, by chunks aligned on the HDF5 ones.
+            data = NetCDF4LazyArray(obj, self.url, key).to_dask()
+            return EOVariable(data=data, attrs=attrs, dims=obj.dimensions)
 
     def __iter__(self) -> Iterator[str]:
         if self._root is None:
@@ -225,37 +626,78 @@ class EONetCDFStoreNCpy(EOProductStore):
         if self._root is None:
             raise StoreNotOpenError("Store must be open before access to it")
         if isinstance(value, EOGroup):
-            self._root.createGroup(key)
-            self.write_attrs(key, value.attrs)
+            with NETCDF4_LOCK:
+                self._root.createGroup(key)
+                self.write_attrs(key, value.attrs)
         elif isinstance(value, EOVariable):
-            # Recover / create dimensions from target product
-            for idx, dim in enumerate(value.dims):
-                if dim not in self._root.dimensions:
-                    self._root.createDimension(dim, size=value._data.shape[idx])
-                if len(self._root.dimensions[dim]) != value._data.shape[idx]:
-                    raise ValueError(
-                        "Netdf4 format does not support mutiples dimensions with the same name and different size.",
-                    )
-            # Create and write EOVariable
-            variable = self._root.createVariable(
-                key,
-                value.data.dtype,
-                dimensions=value.dims,
-                zlib=self.zlib,
-                complevel=self.complevel,
-                shuffle=self.shuffle,
-            )
-            self.write_attrs(key, value.attrs, value.data.dtype)
-            variable[:] = value.data
+            data = value.data
+            if isinstance(data, da.Array) and not data.ndim:
+                data = data.compute()
+            # HDF5 chunks match the dask ones, so each dask block is written in its own chunks
+            chunksizes = None
+            if isinstance(data, da.Array) and data.ndim and all(data.shape):
+                chunksizes = tuple(max(dim_chunks) for dim_chunks in data.chunks)
+            with NETCDF4_LOCK:
+                # Recover / create dimensions from target product
+                for idx, dim in enumerate(value.dims):
+                    if dim not in self._root.dimensions:
+                        self._root.createDimension(dim, size=value._data.shape[idx])
+                    if len(self._root.dimensions[dim]) != value._data.shape[idx]:
+                        raise ValueError(
+                            "Netdf4 format does not support mutiples dimensions with the same name and different size.",
+                        )
+                # Create and write EOVariable
+                variable = self._root.createVariable(
+                    key,
+                    data.dtype,
+                    dimensions=value.dims,
+                    zlib=self.zlib,
+                    complevel=self.complevel,
+                    shuffle=self.shuffle,
+                    chunksizes=chunksizes,
+                )
+                self.write_attrs(key, value.attrs, data.dtype)
+                if not isinstance(data, da.Array):
+                    variable[:] = data
+            if isinstance(data, da.Array):
+                self._write_blocks(variable, data)
         else:
             raise TypeError("Only EOGroup and EOVariable can be set")
 
+    def _write_blocks(self, variable: Variable, data: da.Array) -> None:
+        """Write the dask blocks of data in the netCDF4 variable, by batches of write_batch_bytes.
+
+        The blocks of a batch are computed together (possibly by distributed workers, which can't be given the open
+        netCDF4 variable), so their shared tasks are computed once, and written by this process.
+        """
+        batches: list[list[tuple[int, ...]]] = [[]]
+        batch_bytes = 0
+        for block_index in np.ndindex(*data.numblocks):
+            if batches[-1] and batch_bytes >= self.write_batch_bytes:
+                batches.append([])
+                batch_bytes = 0
+            batches[-1].append(block_index)
+            block_shape = [dim_chunks[index] for dim_chunks, index in zip(data.chunks, block_index)]
+            batch_bytes += data.dtype.itemsize * int(np.prod(block_shape))
+
+        offsets = [np.cumsum((0, *dim_chunks)) for dim_chunks in data.chunks]
+        for batch in batches:
+            blocks = dask.compute(*[data.blocks[block_index] for block_index in batch])
+            with NETCDF4_LOCK:
+                for block_index, block in zip(batch, blocks):
+                    region = tuple(
+                        slice(dim_offsets[index], dim_offsets[index + 1])
+                        for dim_offsets, index in zip(offsets, block_index)
+                    )
+                    variable[region] = block
+
     # docstr-coverage: inherited
     def close(self) -> None:
         if self._root is None:
             raise StoreNotOpenError("Store must be open before access to it")
         super().close()
-        self._root.close()
+        with NETCDF4_LOCK:
+            self._root.close()
         self._root = None
 
     # docstr-coverage: inherited
@@ -316,8 +758,13 @@ class EONetCDFStoreNCpy(EOProductStore):
         self.zlib = bool(kwargs.pop("zlib", True))
         self.complevel = int(kwargs.pop("complevel", 4))
         self.shuffle = bool(kwargs.pop("shuffle", True))
+        write_batch_bytes = kwargs.pop("write_batch_bytes", self.DEFAULT_WRITE_BATCH_BYTES)
+        self.write_batch_bytes = (
+            parse_bytes(write_batch_bytes) if isinstance(write_batch_bytes, str) else int(write_batch_bytes)
+        )
 
-        self._root = Dataset(self.url, mode, **kwargs)
+        with NETCDF4_LOCK:
+            self._root = Dataset(self.url, mode, **kwargs)
 
     def write_attrs(self, group_path: str, attrs: MutableMapping[str, Any] = {}, data_type: Any = int) -> None:
         """
@@ -1,18 +1,32 @@
 import ast
+import fnmatch
+import hashlib
+import itertools
+import json
+import logging
 import os
 import pathlib
+import re
+import shutil
 import tempfile
+import threading
+import time
 import warnings
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from functools import reduce
 from typing import (
     TYPE_CHECKING,
     Any,
     Callable,
+    Iterable,
     Iterator,
+    Mapping,
     MutableMapping,
     Optional,
     Sequence,
     Tuple,
+    Union,
 )
 
 import fsspec
@@ -21,6 +35,7 @@ import numpy as np
 from eopf.exceptions import StoreNotOpenError
 
 from ..utils import (
+    FSMatchIndex,
     fs_match_path,
     join_eo_path_optional,
     partition_eo_path,
@@ -30,12 +45,18 @@ from ..utils import (
 )
 from .abstract import EOProductStore, StorageStatus
 from .mapping_factory import EOMappingFactory
+from .memmap_accessors import MemMapAccessor
+from .netcdf import EONetCDFStore, combine_references
 from .store_factory import EOStoreFactory
+from .zarr import EOZarrStore
 
 if TYPE_CHECKING:  # pragma: no cover
     from eopf.product.core.eo_object import EOObject
 
 
+logger = logging.getLogger("eopf")
+
+
 class SafeHierarchy(EOProductStore):
     """A very simple Store implementation allowing to iterate over a group direct child."""
 
@@ -152,6 +173,16 @@ def _transformation_pack_bits(eo_obj: "EOObject", parameter: Any) -> "EOObject":
     return EOVariable(data=data, dims=tuple(dims), attrs=attrs)
 
 
+def _join_accessor_path(config_accessor_path: Any, accessor_path: Optional[str]) -> Any:
+    """Join the local path of a mapping with the path requested under its target path.
+
+    Local paths that are not paths, like the slices of the L0 packet accessors, are returned as is.
+    """
+    if isinstance(config_accessor_path, slice):
+        return config_accessor_path
+    return join_eo_path_optional(config_accessor_path, accessor_path)
+
+
 class EOSafeStore(EOProductStore):
     """Store representation to access to a Safe file on the given URL
 
@@ -159,6 +190,18 @@ class EOSafeStore(EOProductStore):
     ----------
     url: str
         path url or the target store
+    store_factory: EOStoreFactory, optional
+        factory of the accessors
+    mapping_factory: EOMappingFactory, optional
+        factory of the product mappings
+    parameters_transformations: list[tuple[str, Callable]], optional
+        transformations applied to the read objects, by mapping parameter
+    extraction_cache: str, optional
+        folder where the members of a zipped product are kept once extracted, to be reused by the next opens.
+        By default they are extracted in a temporary folder removed with the store.
+    open_index: str, optional
+        folder where the discovery work done by opening a product in read mode (mapping resolution, listing,
+        existence of the optional mappings) is kept, to be reused by the next opens of the same unmodified product.
 
     Attributes
     ----------
@@ -185,6 +228,8 @@ class EOSafeStore(EOProductStore):
         store_factory: Optional[EOStoreFactory] = None,
         mapping_factory: Optional[EOMappingFactory] = None,
         parameters_transformations: Optional[list[tuple[str, Callable[["EOObject", Any], "EOObject"]]]] = None,
+        extraction_cache: Optional[str] = None,
+        open_index: Optional[str] = None,
     ) -> None:
         if store_factory is None:
             store_factory = EOStoreFactory(default_stores=True)
@@ -196,7 +241,7 @@ class EOSafeStore(EOProductStore):
             self._parameters_transformations = parameters_transformations
         # FIXME Need to think of a way to manage urlak ospath on windows. Especially with the path in the json.
         super().__init__(url)
-        self._accessor_manager = SafeMappingManager(url, store_factory, mapping_factory)
+        self._accessor_manager = SafeMappingManager(url, store_factory, mapping_factory, extraction_cache, open_index)
         self._fs_map_access: Optional[fsspec.FSMap] = None
 
     def __delitem__(self, key: str) -> None:
@@ -205,42 +250,17 @@ class EOSafeStore(EOProductStore):
         for safe_path, accessor_path in self._accessor_manager.split_target_path(key):
             mapping_match_list = self._accessor_manager.get_accessors_from_mapping(safe_path)
             for accessor, config_accessor_path, _ in mapping_match_list:
-                config_accessor_path = join_eo_path_optional(config_accessor_path, accessor_path)
+                config_accessor_path = _join_accessor_path(config_accessor_path, accessor_path)
                 # We should catch Key Error, and throw if the object isn't found in any of the accessors
                 del accessor[config_accessor_path]
 
     def __getitem__(self, key: str) -> "EOObject":
-        from ..core import EOGroup
-
         if self.status is StorageStatus.CLOSE:
             raise StoreNotOpenError("Store must be open before access to it")
-        eo_obj_list: list[EOObject] = list()
-        if key in ["", "/"]:
-            from eopf.product import EOProduct
-
-            eo_obj_list.append(EOGroup(attrs={EOProduct._TYPE_ATTR_STR: self.product_type}))
-        last_error = None
-        for safe_path, accessor_path in self._accessor_manager.split_target_path(key):
-            mapping_match_list = self._accessor_manager.get_accessors_from_mapping(safe_path)
-            for accessor, config_accessor_path, config in mapping_match_list:
-                config_accessor_path = join_eo_path_optional(config_accessor_path, accessor_path)
-                # We should catch Key Error, and throw if the object isn't found in any of the accessors
-                try:
-                    accessed_object = accessor[config_accessor_path]
-                    processed_object = self._apply_mapping_properties(accessed_object, config, key)
-                    eo_obj_list.append(processed_object)
-                except KeyError as error:
-                    last_error = error
-                    pass
-        if not eo_obj_list:
-            if last_error is None:
-                raise KeyError(f"Invalid path :  {key}")
-            else:
-                raise last_error
-        try:
-            return self._eo_object_merge(*eo_obj_list)
-        except NotImplementedError as e:
-            raise NotImplementedError("failed accessing key " + key + ": " + str(e)) from e
+        results: list[Union[EOObject, KeyError]] = list()
+        for accessor, config_accessor_path, config in self._resolve_reads(key):
+            results.append(self._read_mapping(accessor, config_accessor_path, config, key))
+        return self._merge_reads(key, results)
 
     def __len__(self) -> int:
         if self.status is StorageStatus.CLOSE:
@@ -256,7 +276,7 @@ class EOSafeStore(EOProductStore):
         for safe_path, accessor_path in self._accessor_manager.split_target_path(key):
             mapping_match_list = self._accessor_manager.get_accessors_from_mapping(safe_path)
             for accessor, config_accessor_path, _ in mapping_match_list:
-                config_accessor_path = join_eo_path_optional(config_accessor_path, accessor_path)
+                config_accessor_path = _join_accessor_path(config_accessor_path, accessor_path)
                 # We should catch Key Error, and throw if the object isn't set in any of the accessors
                 accessor[config_accessor_path] = value  # I hope we don't need to reverse apply_properties.
 
@@ -265,6 +285,74 @@ class EOSafeStore(EOProductStore):
         super().close()
         self._accessor_manager.close_all()
 
+    def get_many(
+        self,
+        paths: Iterable[str],
+        max_workers: Optional[int] = None,
+        prefetch: bool = False,
+    ) -> dict[str, "EOObject"]:
+        """Read several objects of the product at once
+
+        The mappings of all the paths are resolved in one pass and the reads are grouped by accessor,
+        the groups of the different accessors are read concurrently.
+
+        Parameters
+        ----------
+        paths: Iterable[str]
+            paths of the objects to read
+        max_workers: int, optional
+            maximum number of accessors read at the same time
+        prefetch: bool, optional
+            eagerly decode together the mappings of accessors supporting batch reads (see prefetch),
+            instead of returning lazy variables
+
+        Returns
+        -------
+        dict[str, EOObject]
+            read objects by path
+
+        Raises
+        ------
+        StoreNotOpenError
+            If the store is closed
+        KeyError
+            If a path is not in the product
+        """
+        if self.status is StorageStatus.CLOSE:
+            raise StoreNotOpenError("Store must be open before access to it")
+        keys = list(dict.fromkeys(paths))
+        # reads of each key, in the order __getitem__ merge them
+        key_reads = {key: self._resolve_reads(key) for key in keys}
+        batch_keys = [key for key, reads in key_reads.items() if any(hasattr(read[0], "prefetch") for read in reads)]
+        if prefetch and len(batch_keys) > 1:
+            self._accessor_manager.prefetch(batch_keys)
+
+        accessor_reads: dict[int, list[tuple[str, int, EOProductStore, str, dict[str, Any]]]] = dict()
+        for key, reads in key_reads.items():
+            for index, (accessor, config_accessor_path, config) in enumerate(reads):
+                accessor_reads.setdefault(id(accessor), list()).append(
+                    (key, index, accessor, config_accessor_path, config),
+                )
+
+        def read_accessor(
+            reads: list[tuple[str, int, EOProductStore, str, dict[str, Any]]],
+        ) -> list[tuple[str, int, Union["EOObject", KeyError]]]:
+            return [
+                (key, index, self._read_mapping(accessor, config_accessor_path, config, key))
+                for key, index, accessor, config_accessor_path, config in reads
+            ]
+
+        if len(accessor_reads) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                accessor_results = list(executor.map(read_accessor, accessor_reads.values()))
+        else:
+            accessor_results = [read_accessor(reads) for reads in accessor_reads.values()]
+
+        results: dict[str, dict[int, Union[EOObject, KeyError]]] = {key: dict() for key in keys}
+        for key, index, result in itertools.chain.from_iterable(accessor_results):
+            results[key][index] = result
+        return {key: self._merge_reads(key, [result for _, result in sorted(results[key].items())]) for key in keys}
+
     # docstr-coverage: inherited
     def is_group(self, path: str) -> bool:
         if self.status is StorageStatus.CLOSE:
@@ -272,7 +360,7 @@ class EOSafeStore(EOProductStore):
         for safe_path, accessor_path in self._accessor_manager.split_target_path(path):
             mapping_match_list = self._accessor_manager.get_accessors_from_mapping(safe_path)
             for accessor, config_accessor_path, _ in mapping_match_list:
-                config_accessor_path = join_eo_path_optional(config_accessor_path, accessor_path)
+                config_accessor_path = _join_accessor_path(config_accessor_path, accessor_path)
                 # Stores are not supposed to throw KeyError on is_group
                 if accessor.is_group(config_accessor_path):
                     return True
@@ -285,7 +373,7 @@ class EOSafeStore(EOProductStore):
         for safe_path, accessor_path in self._accessor_manager.split_target_path(path):
             mapping_match_list = self._accessor_manager.get_accessors_from_mapping(safe_path)
             for accessor, config_accessor_path, _ in mapping_match_list:
-                config_accessor_path = join_eo_path_optional(config_accessor_path, accessor_path)
+                config_accessor_path = _join_accessor_path(config_accessor_path, accessor_path)
                 # Stores are not supposed to throw KeyError on is_group
                 if accessor.is_variable(config_accessor_path):
                     return True
@@ -299,22 +387,132 @@ class EOSafeStore(EOProductStore):
         for safe_path, accessor_path in self._accessor_manager.split_target_path(path):
             mapping_match_list = self._accessor_manager.get_accessors_from_mapping(safe_path)
             for accessor, config_accessor_path, _ in mapping_match_list:
-                config_accessor_path = join_eo_path_optional(config_accessor_path, accessor_path)
+                config_accessor_path = _join_accessor_path(config_accessor_path, accessor_path)
                 # Should not throw exception if their store is Open.
                 key_set = key_set.union(accessor.iter(config_accessor_path))
         return iter(key_set)
 
+    def prefetch(self, paths: Optional[Iterable[str]] = None) -> None:
+        """Read together the mappings of each file for the accessors supporting batch reads.
+
+        For example, all the L0 packet fields of a file are decoded in a single pass over its packets,
+        instead of one pass by field. The following reads of these fields are served from memory.
+
+        Parameters
+        ----------
+        paths: Iterable[str], optional
+            only prefetch mappings under these paths (all the product by default)
+
+        Raises
+        ------
+        StoreNotOpenError
+            If the store is closed
+        """
+        if self.status is StorageStatus.CLOSE:
+            raise StoreNotOpenError("Store must be open before access to it")
+        self._accessor_manager.prefetch(paths)
+
+    def select_packets(self, packet_filter: Mapping[str, Any]) -> None:
+        """Restrict the L0 packets read from the product to the ones matching the given conditions.
+
+        Each condition is evaluated once on the packet file of its mapping, and all the following reads
+        of this file by this store only decode the selected packets, until it is closed.
+        Other stores opened on the same file still read all its packets.
+
+        Parameters
+        ----------
+        packet_filter: Mapping[str, Any]
+            condition on the value (see :obj:`eopf.product.store.memmap_accessors.packet_mask`)
+            by target path of a packet header field.
+            ex: ``{"/conditions/PID": 65, "/coordinates/vv/coarse_time": slice(t0, t1)}``
+
+        Raises
+        ------
+        StoreNotOpenError
+            If the store is closed
+        KeyError
+            If a target path is not a packet field
+        """
+        if self.status is StorageStatus.CLOSE:
+            raise StoreNotOpenError("Store must be open before access to it")
+        self._accessor_manager.select_packets(packet_filter)
+
+    def netcdf_references(self, path: Optional[str] = None, **storage_options: Any) -> dict[str, Any]:
+        """Kerchunk references of a single zarr holding all the netCDF files of the product, each in its group.
+
+        Other tools can read the netCDF data of the product from them without any conversion,
+        with a fsspec reference filesystem.
+
+        Parameters
+        ----------
+        path: str, optional
+            if given, url where the references are written as json
+        **storage_options: Any
+            fsspec options to write the references
+
+        Returns
+        -------
+        dict[str, Any]
+            the kerchunk references
+
+        Raises
+        ------
+        StoreNotOpenError
+            If the store is closed
+        NotImplementedError
+            If the product is zipped (its netCDF files are only extracted while the store is open)
+        """
+        if self.status is StorageStatus.CLOSE:
+            raise StoreNotOpenError("Store must be open before access to it")
+        if self._accessor_manager.is_compressed:
+            raise NotImplementedError("The netCDF references of a zipped product point to its extracted files")
+        references, _ = self._accessor_manager.netcdf_references()
+        if path is not None:
+            with fsspec.open(path, "w", **storage_options) as reference_file:
+                json.dump(references, reference_file)
+        return references
+
     @property
     def product_type(self) -> str:
         return self._accessor_manager.product_type
 
     # docstr-coverage: inherited
     def open(self, mode: str = "r", storage_options: dict[str, Any] = {}, **kwargs: Any) -> None:
+        """Open the store in the given mode
+
+        library specifics parameters :
+            - packet_filter : packet selection given to select_packets. ex : {"/conditions/PID": 65}
+            - open_workers : number of threads opening all the accessors of the product at once,
+              instead of opening each accessor on its first access. ex : 8
+            - combine_netcdf : read all the netCDF files of the product from a single zarr
+              made of their combined kerchunk references (see netcdf_references). ex : True
+            - reference_cache : KerchunkReferenceCache of the netCDF files used instead of the shared one
+
+        Parameters
+        ----------
+        mode: str, optional
+            mode to open the store
+        storage_options: dict[str, Any]
+            fsspec options to access the product
+        **kwargs: Any
+            extra kwargs given to the accessors
+        """
+        packet_filter = kwargs.pop("packet_filter", None)
+        open_workers = kwargs.pop("open_workers", None)
+        combine_netcdf = kwargs.pop("combine_netcdf", False)
         # Must not read the product mapping between  super.open and accessor.open
         # Otherwise Hierachy accessor are opened twice.
         super().open()
-        self._accessor_manager.open_all(mode, fsspec_kwargs=storage_options, **kwargs)
+        self._accessor_manager.open_all(
+            mode,
+            fsspec_kwargs=storage_options,
+            max_workers=open_workers,
+            combine_netcdf=combine_netcdf,
+            **kwargs,
+        )
         self._fs_map_access = fsspec.get_mapper(self.url, **storage_options)
+        if packet_filter:
+            self.select_packets(packet_filter)
 
         self._open_kwargs = kwargs
         if mode == "w":
@@ -332,10 +530,59 @@ class EOSafeStore(EOProductStore):
         for safe_path, accessor_path in self._accessor_manager.split_target_path(group_path):
             mapping_match_list = self._accessor_manager.get_accessors_from_mapping(safe_path)
             for accessor, config_accessor_path, _ in mapping_match_list:
-                config_accessor_path = join_eo_path_optional(config_accessor_path, accessor_path)
+                config_accessor_path = _join_accessor_path(config_accessor_path, accessor_path)
                 # We might want to catch Unimplemented/KeyError and throw one if none write_attrs suceed
                 accessor.write_attrs(config_accessor_path)
 
+    def _resolve_reads(self, key: str) -> list[tuple[EOProductStore, str, dict[str, Any]]]:
+        """Accessors, paths in the accessors and mapping configs to read to get the object at key."""
+        reads = list()
+        for safe_path, accessor_path in self._accessor_manager.split_target_path(key):
+            mapping_match_list = self._accessor_manager.get_accessors_from_mapping(safe_path)
+            for accessor, config_accessor_path, config in mapping_match_list:
+                reads.append((accessor, _join_accessor_path(config_accessor_path, accessor_path), config))
+        return reads
+
+    def _read_mapping(
+        self,
+        accessor: EOProductStore,
+        config_accessor_path: str,
+        config: dict[str, Any],
+        key: str,
+    ) -> Union["EOObject", KeyError]:
+        """Object read by a mapping with its properties applied, or the KeyError of the accessor."""
+        # We should catch Key Error, and throw if the object isn't found in any of the accessors
+        try:
+            accessed_object = accessor[config_accessor_path]
+        except KeyError as error:
+            return error
+        return self._apply_mapping_properties(accessed_object, config, key)
+
+    def _merge_reads(self, key: str, results: Sequence[Union["EOObject", KeyError]]) -> "EOObject":
+        """Merge the objects read by the mappings of key, raise the last KeyError if none was found."""
+        from ..core import EOGroup
+
+        eo_obj_list: list[EOObject] = list()
+        if key in ["", "/"]:
+            from eopf.product import EOProduct
+
+            eo_obj_list.append(EOGroup(attrs={EOProduct._TYPE_ATTR_STR: self.product_type}))
+        last_error = None
+        for result in results:
+            if isinstance(result, KeyError):
+                last_error = result
+            else:
+                eo_obj_list.append(result)
+        if not eo_obj_list:
+            if last_error is None:
+                raise KeyError(f"Invalid path :  {key}")
+            else:
+                raise last_error
+        try:
+            return self._eo_object_merge(*eo_obj_list)
+        except NotImplementedError as e:
+            raise NotImplementedError("failed accessing key " + key + ": " + str(e)) from e
+
     def _apply_mapping_properties(self, eo_obj: "EOObject", config: dict[str, Any], debug_key: str) -> "EOObject":
         """Modify the eo_object according to the json data_mapping config.
 
@@ -402,6 +649,69 @@ class EOSafeStore(EOProductStore):
         return pathlib.Path(file_path).suffix in [".SEN3", ".SAFE"]
 
 
+class _TargetPathTrie:
+    """Index of the target paths of the mappings, by path element.
+
+    Mapping target paths can be registered with or without a leading "/": a trie node keeps all the registered
+    spellings of its path, in registration order of the first spelling.
+    """
+
+    # path elements that posixpath based splitting handles differently from a plain split
+    _IRREGULAR_ELEMENTS = frozenset(("", ".", ".."))
+
+    def __init__(self) -> None:
+        self._root = _TargetPathNode()
+        # True if a target path can't be indexed by its elements
+        self.irregular = False
+
+    @classmethod
+    def elements(cls, target_path: str) -> Optional[list[str]]:
+        """Elements of the target path (without its leading "/"), None if they can't be indexed."""
+        path = target_path[1:] if target_path[:1] == "/" else target_path
+        if not path:
+            return []
+        elements = path.split("/")
+        if cls._IRREGULAR_ELEMENTS.intersection(elements):
+            return None
+        return elements
+
+    def add(self, target_path: str) -> None:
+        elements = self.elements(target_path)
+        if elements is None:
+            self.irregular = True
+            return
+        node = self._root
+        for element in elements:
+            node = node.children.setdefault(element, _TargetPathNode())
+        # spellings without the leading "/" come first, as in the legacy resolution
+        node.target_paths.append(target_path)
+        node.target_paths.sort(key=lambda path: path[:1] == "/")
+
+    def split(self, elements: list[str]) -> list[tuple[str, Optional[str]]]:
+        """Deepest registered target paths among the ancestors of elements, with the remaining local path."""
+        node = self._root
+        found, depth = node.target_paths, 0
+        for index, element in enumerate(elements):
+            child = node.children.get(element)
+            if child is None:
+                break
+            node = child
+            if node.target_paths:
+                found, depth = node.target_paths, index + 1
+        if not found:
+            raise KeyError("Path not found in the configuration")
+        local_path = "/".join(elements[depth:])
+        return [(target_path, local_path) for target_path in found]
+
+
+class _TargetPathNode:
+    __slots__ = ("children", "target_paths")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TargetPathNode] = dict()
+        self.target_paths: list[str] = list()
+
+
 class SafeMappingManager:
     """Class managing reading the Safe store configuration and creating as needed the associated accessors."""
 
@@ -414,32 +724,61 @@ class SafeMappingManager:
     CONFIG_SOURCE_FILE = "source_path"
     CONFIG_TARGET = "target_path"
     SAFE_HIERARCHY_FORMAT = "SafeHierarchy"
+    # version of the open index content, indexes of other versions are ignored
+    OPEN_INDEX_VERSION = 2
+    # locks of the members being extracted by local path, shared by the managers using the same extraction cache
+    _extraction_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+    _extraction_locks_lock = threading.Lock()
 
     def __init__(
         self,
         url: str,
         store_factory: EOStoreFactory,
         mapping_factory: EOMappingFactory,
+        extraction_cache: Optional[str] = None,
+        open_index: Optional[str] = None,
     ) -> None:
         # FIXME Need to think of a way to manage urlak ospath on windows. Especially with the path in the json.
         self._url = url
+        self._extraction_cache = extraction_cache
+        self._open_index = open_index
         self._store_factory = store_factory
         self._mapping_factory = mapping_factory
         # _accesor_map map the open accessor by file and accessor type and by config id
         # to avoid reopening them in case of reuse.
         # The value is the product store and it's config (to allow reopening)
         self._accessor_map: dict[str, dict[Any, tuple[Optional[EOProductStore], dict[str, Any]]]] = dict()
+        # accessors can be opened concurrently by open_all
+        self._accessor_lock = threading.RLock()
         # map item_format : source path to Store
         # _config_mapping contain the mapping config by target_path read from the json mapping.
         # It's a dictionary of list as we can have multiple mapping for the same target_path.
         self._config_mapping: dict[str, list[dict[str, Any]]] = dict()  # map source path to config read from Json
+        # index of the _config_mapping keys to resolve a target path in a single walk
+        self._target_path_trie = _TargetPathTrie()
+        # children of the hierarchy mappings, with the target path of the optional ones
+        self._hierarchy_children: dict[str, dict[str, Optional[str]]] = dict()
+        # existence of the optional mappings by target path, kept only with an open index
+        self._optional_exists: dict[str, bool] = dict()
+        # signature of the product and content of the open index, when it is used
+        self._open_index_key: Optional[str] = None
+        self._open_index_saved: Optional[tuple[int, int]] = None
+        # zarr of the combined references of the netCDF files, with the group of each file by url
+        self._combined_store: Optional[EOProductStore] = None
+        self._combined_groups: dict[str, str] = dict()
+        # packets selected by select_packets, by url of the packet file
+        self._packet_selections: dict[str, Any] = dict()
         self._mode = "CLOSED"
         self._open_kwargs: dict[str, Any] = dict()
 
         self._is_compressed = False
         self._temp_dir: Optional[tempfile.TemporaryDirectory[Any]] = None
+        # all the members of a zipped product are extracted once for the accessors not reading a single file
+        self._extracted_all = False
+        self._extract_all_lock = threading.Lock()
         self._top_level: Optional[str] = None
         self._fs_map_access: Optional[fsspec.FSMap] = None
+        self._file_index: Optional[FSMatchIndex] = None
         self._product_type = ""
 
     def __iter__(self) -> Iterator[tuple[EOProductStore, dict[str, Any]]]:
@@ -450,11 +789,43 @@ class SafeMappingManager:
 
     def close_all(self) -> None:
         """Close all managed accessors and switch default mode to closed."""
+        if self._open_index_key is not None:
+            # keep the optional mappings existence checked since opening
+            self._save_open_index()
         self._mode = "CLOSED"
         for accessor, _ in self:
             if accessor.status == StorageStatus.OPEN:
                 accessor.close()
+        if self._combined_store is not None:
+            self._combined_store.close()
+            self._combined_store = None
+            self._combined_groups = dict()
+        self._packet_selections = dict()
         self._is_compressed = False
+        self._extracted_all = False
+        self._file_index = None
+
+    @property
+    def is_compressed(self) -> bool:
+        """True if the product is zipped, its files are then extracted to be read"""
+        return self._is_compressed
+
+    @property
+    def file_index(self) -> Optional[FSMatchIndex]:
+        """Listing of the product used to resolve the source files of the mappings, while open in read mode"""
+        return self._file_index
+
+    def _source_file_patterns(self) -> set[str]:
+        """Source file regex of all the mappings, as resolved by _get_accessor."""
+        patterns = set()
+        for configs in self._config_mapping.values():
+            for conf in configs:
+                if conf[self.CONFIG_FORMAT] == self.SAFE_HIERARCHY_FORMAT:
+                    continue
+                pattern = regex_path_append(self._top_level, conf[self.CONFIG_SOURCE_FILE].split(":")[0])
+                if pattern is not None:
+                    patterns.add(pattern)
+        return patterns
 
     def __del__(self) -> None:
         if self._temp_dir:
@@ -469,60 +840,236 @@ class SafeMappingManager:
         """Get all accessor corresponding to the configs of conf_path.
         As multiple mapping car match a single conf_path, it can return multiple accessors.
         """
-
-        def _parse_local_path(local_path: str) -> Any:
-            if local_path and isinstance(local_path, str):
-                try:
-                    element = ast.parse(local_path).body
-
-                    if (
-                        element
-                        and isinstance(element[0], ast.Expr)
-                        and isinstance(value := element[0].value, ast.Tuple)  # noqa
-                    ):
-                        return slice(*ast.literal_eval(local_path))
-                except SyntaxError:
-                    return local_path
-            return local_path
-
-        configs = self._config_mapping[conf_path]
         results = list()
-        for conf in configs:
-            accessor_source_split = conf[self.CONFIG_SOURCE_FILE].split(":")
-            if len(accessor_source_split) > 2:
-                raise ValueError(f"Invalid {self.CONFIG_SOURCE_FILE} : {conf[self.CONFIG_SOURCE_FILE]}")
-            accessor_file_regex = accessor_source_split[0]
-            if len(accessor_source_split) == 2:
-                accessor_local_path = accessor_source_split[1]
-            else:
-                accessor_local_path = conf.get("local_path")
-
-            accessor = self._get_accessor(
-                accessor_file_regex,
-                conf[self.CONFIG_FORMAT],
-                conf[self.CONFIG_ACCESSOR_ID],
-                conf[self.CONFIG_ACCESSOR_CONFIG],
-                conf.get(self.CONFIG_OPTIONAL, False),
-            )
-            if accessor is not None:  # We also want to append accessor of len 0.
-                results.append((accessor, _parse_local_path(accessor_local_path), conf))
+        for conf in self._config_mapping[conf_path]:
+            result = self._get_accessor_from_config(conf)
+            if result is not None:  # We also want to append accessor of len 0.
+                results.append(result)
         return results
 
-    def open_all(self, mode: str = "r", fsspec_kwargs: dict[str, Any] = {}, **kwargs: Any) -> None:
+    def prefetch(self, target_paths: Optional[Iterable[str]] = None) -> None:
+        """Read together all the mappings served by the same file, for accessors supporting it.
+
+        Accessors supporting batch reads define a prefetch method taking the list of (local path, accessor config)
+        of all the mappings of their file.
+
+        Parameters
+        ----------
+        target_paths: Iterable[str], optional
+            only prefetch mappings under these target paths (all mappings by default)
+        """
+        prefixes = None if target_paths is None else [path.strip("/") for path in target_paths]
+        requests: dict[tuple[Any, str], tuple[Any, list[tuple[Any, dict[str, Any]]]]] = dict()
+        for target_path, configs in self._config_mapping.items():
+            stripped_path = target_path.strip("/")
+            if prefixes is not None and not any(
+                not prefix or stripped_path == prefix or stripped_path.startswith(f"{prefix}/") for prefix in prefixes
+            ):
+                continue
+            for conf in configs:
+                if not hasattr(self._store_factory.item_formats.get(conf[self.CONFIG_FORMAT]), "prefetch"):
+                    continue
+                result = self._get_accessor_from_config(conf)
+                if result is None:
+                    continue
+                accessor, local_path, _ = result
+                request_id = (type(accessor), accessor.url)
+                requests.setdefault(request_id, (accessor, list()))[1].append(
+                    (local_path, conf[self.CONFIG_ACCESSOR_CONFIG]),
+                )
+        for accessor, accessor_requests in requests.values():
+            accessor.prefetch(accessor_requests)
+
+    def select_packets(self, packet_filter: Mapping[str, Any]) -> None:
+        """Give the packet selection conditions to the accessors of their packet files.
+
+        Accessors supporting packet selection define a select_packets method taking the list of
+        (local path, accessor config, condition) of the conditions on their file. The resulting packet_selection
+        is then shared with the other accessors of the file, opened or to be opened by this manager.
+
+        Parameters
+        ----------
+        packet_filter: Mapping[str, Any]
+            condition by target path of a packet field
+
+        Raises
+        ------
+        KeyError
+            If a target path is not mapped by an accessor supporting packet selection
+        """
+        requests: dict[tuple[Any, str], tuple[Any, list[tuple[Any, dict[str, Any], Any]]]] = dict()
+        for target_path, condition in packet_filter.items():
+            configs = self._config_mapping.get(target_path, self._config_mapping.get(f"/{target_path.strip('/')}", []))
+            found = False
+            for conf in configs:
+                if not hasattr(self._store_factory.item_formats.get(conf[self.CONFIG_FORMAT]), "select_packets"):
+                    continue
+                result = self._get_accessor_from_config(conf)
+                if result is None:
+                    continue
+                accessor, local_path, _ = result
+                found = True
+                request_id = (type(accessor), accessor.url)
+                requests.setdefault(request_id, (accessor, list()))[1].append(
+                    (local_path, conf[self.CONFIG_ACCESSOR_CONFIG], condition),
+                )
+            if not found:
+                raise KeyError(f"{target_path} is not a packet field of the product")
+        for accessor, accessor_requests in requests.values():
+            accessor.select_packets(accessor_requests)
+            self._packet_selections[accessor.url] = accessor.packet_selection
+        for accessor, _ in self:
+            if isinstance(accessor, MemMapAccessor) and accessor.url in self._packet_selections:
+                accessor.packet_selection = self._packet_selections[accessor.url]
+
+    def open_all(
+        self,
+        mode: str = "r",
+        fsspec_kwargs: dict[str, Any] = {},
+        max_workers: Optional[int] = None,
+        combine_netcdf: bool = False,
+        **kwargs: Any,
+    ) -> None:
         """Open all managed accessors and switch default mode to opened.
         On first opening read the json config file.
+
+        Parameters
+        ----------
+        mode: str, optional
+            mode to open the accessors
+        fsspec_kwargs: dict[str, Any]
+            fsspec options to access the product
+        max_workers: int, optional
+            if given, the accessors of all the mappings are opened now, by this number of threads.
+            Otherwise accessors are opened one by one on their first access.
+        combine_netcdf: bool, optional
+            in read mode, serve the netCDF accessors from a single zarr of the combined references of their files
+        **kwargs: Any
+            extra kwargs given to the accessors
         """
         self._fs_map_access = fsspec.get_mapper(self._url, **fsspec_kwargs)
-        if not self._config_mapping:
+        # The product is listed once by opening in read mode, files can be created in other modes.
+        self._file_index = FSMatchIndex(self._fs_map_access) if mode == "r" else None
+        self._open_index_key = self._product_signature(fsspec_kwargs) if mode == "r" and self._open_index else None
+        if not self._config_mapping and not self._load_open_index():
             self._read_product_mapping()
+        if self._file_index is not None:
+            self._file_index.match_all(self._source_file_patterns())
 
         self._open_kwargs = kwargs
         self._mode = mode
+        if self._open_index_key is not None:
+            self._save_open_index()
+        if combine_netcdf and mode == "r" and self._combined_store is None:
+            self._open_combined_netcdf()
+        if max_workers:
+            self._open_concurrently(max_workers)
+            return
         for accessor, _accessor_config in self:
             # FIXME Should probably check if the accessor is open intead of seting it to None
             # FIXME when opeing fail, otherwise we can't reopen it later with another mode.
             if accessor.status != StorageStatus.OPEN:
-                accessor.open(mode, **_accessor_config, **kwargs)
+                accessor.open(mode, **_accessor_config, **self._accessor_open_kwargs(accessor))
+
+    def _open_concurrently(self, max_workers: int) -> None:
+        """Open the accessors of all the mappings with a bounded thread pool.
+
+        Accessors failing with an I/O or configuration error are only logged: the error is raised again
+        when their mapping is accessed. Other errors are raised once all the accessors are opened.
+        """
+        start = time.perf_counter()
+        tasks: dict[tuple[str, str, Any], dict[str, Any]] = dict()
+        for configs in self._config_mapping.values():
+            for conf in configs:
+                if conf[self.CONFIG_FORMAT] == self.SAFE_HIERARCHY_FORMAT:
+                    continue
+                try:
+                    accessor_file = self._resolve_accessor_file(
+                        conf[self.CONFIG_SOURCE_FILE].split(":")[0],
+                        conf[self.CONFIG_FORMAT],
+                    )
+                except (OSError, ValueError, re.error) as error:
+                    # reported again when the mapping is accessed
+                    logger.warning(f"Can not resolve the file of {conf[self.CONFIG_SOURCE_FILE]}: {error!r}")
+                    continue
+                tasks.setdefault((conf[self.CONFIG_FORMAT], accessor_file, conf[self.CONFIG_ACCESSOR_ID]), conf)
+
+        def open_accessor(accessor: EOProductStore, accessor_config: dict[str, Any]) -> None:
+            if accessor.status != StorageStatus.OPEN:
+                accessor.open(self._mode, **accessor_config, **self._accessor_open_kwargs(accessor))
+
+        def open_mapping(task: tuple[tuple[str, str, Any], dict[str, Any]]) -> None:
+            (item_format, accessor_file, _), conf = task
+            try:
+                self._get_accessor_from_config(conf)
+            except (OSError, ValueError, KeyError, TypeError) as error:
+                logger.warning(f"Can not open the {item_format} accessor of {accessor_file}: {error!r}")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for future in [executor.submit(open_accessor, *item) for item in list(self)]:
+                future.result()
+            list(executor.map(open_mapping, tasks.items()))
+        logger.info(f"Opened {len(tasks)} accessors of {self._url} in {time.perf_counter() - start:.3f}s")
+
+    def netcdf_references(self) -> tuple[dict[str, Any], dict[str, str]]:
+        """Combined kerchunk references of the netCDF files of the mappings, each in the group of its path.
+
+        Files kerchunk can't translate (read with netCDF4) and missing files are left out.
+
+        Returns
+        -------
+        tuple[dict[str, Any], dict[str, str]]
+            the references, and the group of each file by accessor url
+        """
+        storage_options = self._open_kwargs.get("storage_options", dict())
+        reference_cache = self._open_kwargs.get("reference_cache", EONetCDFStore.reference_cache)
+        netcdf_files: dict[str, str] = dict()
+        for configs in self._config_mapping.values():
+            for conf in configs:
+                store_class = self._store_factory.item_formats.get(conf[self.CONFIG_FORMAT])
+                if isinstance(store_class, type) and issubclass(store_class, EONetCDFStore):
+                    file_regex = conf[self.CONFIG_SOURCE_FILE].split(":")[0]
+                    file_path = self._resolve_accessor_file(file_regex, conf[self.CONFIG_FORMAT])
+                    netcdf_files[file_path] = conf[self.CONFIG_FORMAT]
+        references: dict[str, dict[str, Any]] = dict()
+        groups: dict[str, str] = dict()
+        for file_path, item_format in sorted(netcdf_files.items()):
+            try:
+                url = self._accessor_url(file_path, item_format)
+                file_references = reference_cache.get(url, storage_options)
+            except FileNotFoundError:
+                continue
+            if file_references is not None:
+                references[file_path] = file_references
+                groups[url] = file_path
+        return combine_references(references), groups
+
+    def _open_combined_netcdf(self) -> None:
+        """Open the zarr of the combined references of the netCDF files, used by their accessors."""
+        references, groups = self.netcdf_references()
+        if not groups:
+            return
+        storage_options = dict(self._open_kwargs.get("storage_options", dict()))
+        storage_options["fo"] = references
+        combined_store = EOZarrStore("reference://")
+        combined_store.open("r", consolidated=False, storage_options=storage_options)
+        self._combined_store = combined_store
+        self._combined_groups = groups
+
+    def _accessor_open_kwargs(self, accessor: EOProductStore) -> dict[str, Any]:
+        """Kwargs to open the accessor: the open kwargs, and its group in the combined netCDF zarr if it's in
+        (or the packets selected in its file)."""
+        if isinstance(accessor, MemMapAccessor) and accessor.url in self._packet_selections:
+            return dict(self._open_kwargs, packet_selection=self._packet_selections[accessor.url])
+        if self._combined_store is None or not isinstance(accessor, EONetCDFStore):
+            return self._open_kwargs
+        if accessor.url not in self._combined_groups:
+            return self._open_kwargs
+        return dict(
+            self._open_kwargs,
+            combined_store=self._combined_store,
+            combined_group=self._combined_groups[accessor.url],
+        )
 
     @property
     def product_type(self) -> str:
@@ -530,6 +1077,11 @@ class SafeMappingManager:
 
     def split_target_path(self, target_path: str) -> Sequence[tuple[str, Optional[str]]]:
         """Split target_path between a path where a mapping is registered, and a local path."""
+        if not self._target_path_trie.irregular:
+            elements = self._target_path_trie.elements(target_path)
+            if elements is not None:
+                return self._target_path_trie.split(elements)
+        # paths with empty, "." or ".." elements keep the posixpath based resolution
         if target_path and target_path[0] == "/":
             safe_target_path = target_path[1:]
         else:
@@ -565,20 +1117,18 @@ class SafeMappingManager:
 
         mapped_store: Optional[EOProductStore]
         accessor_id = f"{item_format}:{file_path}"
-        if accessor_id not in self._accessor_map:
-            self._accessor_map[accessor_id] = dict()
+        with self._accessor_lock:
+            self._accessor_map.setdefault(accessor_id, dict())
 
+        start = time.perf_counter()
         try:
             if item_format == "SafeHierarchy":
                 mapped_store = SafeHierarchy()
             else:
-                if self._is_compressed:
-                    accessor_file = self._uncompress_file(file_path)
-                else:
-                    if self._mode[0] in ["w", "W"]:
-                        file_path = file_path.replace(".*", "FILL.")
-                        file_path = file_path.replace("*", "STAR")
-                    accessor_file = self._fs_map_access.fs.sep.join([self._fs_map_access.root, file_path])
+                if not self._is_compressed and self._mode[0] in ["w", "W"]:
+                    file_path = file_path.replace(".*", "FILL.")
+                    file_path = file_path.replace("*", "STAR")
+                accessor_file = self._accessor_url(file_path, item_format)
                 if self._mode[0] not in ["r", "R", "c", "C"]:
                     # We are writing
                     parent_path, _ = upsplit_eo_path(file_path)
@@ -589,7 +1139,7 @@ class SafeMappingManager:
                     accessor_file,
                     item_format,
                 )
-            mapped_store.open(mode=self._mode, **accessor_config, **self._open_kwargs)
+            mapped_store.open(mode=self._mode, **accessor_config, **self._accessor_open_kwargs(mapped_store))
         except NotImplementedError:
             mapped_store = None
             warnings.warn("Unimplemented store mode")
@@ -597,7 +1147,9 @@ class SafeMappingManager:
             mapped_store = None
             if not accessor_optional:
                 raise fnf_error
-        self._accessor_map[accessor_id][accessor_config_id] = (mapped_store, accessor_config)
+        logger.debug(f"Opened {item_format} accessor on {file_path} in {time.perf_counter() - start:.3f}s")
+        with self._accessor_lock:
+            self._accessor_map[accessor_id][accessor_config_id] = (mapped_store, accessor_config)
         return mapped_store
 
     def _add_data_mapping(self, target_path: str, config: dict[str, Any], json_data: dict[str, Any]) -> None:
@@ -612,6 +1164,7 @@ class SafeMappingManager:
             self._config_mapping[target_path].append(config)
         else:
             self._config_mapping[target_path] = [config]
+            self._target_path_trie.add(target_path)
 
         if target_path in ["", "/"]:
             return
@@ -623,21 +1176,33 @@ class SafeMappingManager:
             parent_config[self.CONFIG_SOURCE_FILE] = source_path_parent
             parent_config[self.CONFIG_FORMAT] = self.SAFE_HIERARCHY_FORMAT
             self._add_data_mapping(source_path_parent, parent_config, json_data)
-        safe_hierachy = self._get_accessor(source_path_parent, self.SAFE_HIERARCHY_FORMAT, frozenset(), dict())
+        optional_target = target_path if config.get(self.CONFIG_OPTIONAL, False) else None
+        self._hierarchy_children.setdefault(source_path_parent, dict())[name] = optional_target
+        self._add_hierarchy_child(source_path_parent, name, optional_target)
+
+    def _add_hierarchy_child(self, parent_path: str, name: str, optional_target: Optional[str]) -> None:
+        """Register a child in the hierarchy accessor of its parent, lazily checked if it is optional."""
+        safe_hierachy = self._get_accessor(parent_path, self.SAFE_HIERARCHY_FORMAT, frozenset(), dict())
         if not isinstance(safe_hierachy, SafeHierarchy):
             raise TypeError("Unexpected accessor type.")
-        if config.get(self.CONFIG_OPTIONAL, False):
+        if optional_target is None:
+            safe_hierachy._add_child(name)
+            return
 
-            def optional_check_exist() -> bool:
-                mapping_match_list = self.get_accessors_from_mapping(target_path)
-                for accessor, config_accessor_path, _ in mapping_match_list:
-                    if accessor.is_variable(config_accessor_path) or accessor.is_group(config_accessor_path):
-                        return True
-                return False
+        def optional_check_exist() -> bool:
+            if optional_target in self._optional_exists:
+                return self._optional_exists[optional_target]
+            exist = False
+            mapping_match_list = self.get_accessors_from_mapping(optional_target)
+            for accessor, config_accessor_path, _ in mapping_match_list:
+                if accessor.is_variable(config_accessor_path) or accessor.is_group(config_accessor_path):
+                    exist = True
+                    break
+            if self._open_index_key is not None:
+                self._optional_exists[optional_target] = exist
+            return exist
 
-            safe_hierachy._add_child(name, optional_check_exist)
-        else:
-            safe_hierachy._add_child(name)
+        safe_hierachy._add_child(name, optional_check_exist)
 
     def _contain_hierarchy_mapping(self, target_path: str) -> bool:
         """Check if a hierarchy mapping is defined for target_path."""
@@ -670,6 +1235,28 @@ class SafeMappingManager:
         config[self.CONFIG_ACCESSOR_ID] = frozenset(config_declarations.items())
         config[self.CONFIG_ACCESSOR_CONFIG] = accessor_config
 
+    def _get_accessor_from_config(self, conf: dict[str, Any]) -> Optional[Tuple[EOProductStore, Any, dict[str, Any]]]:
+        """Get the accessor of a mapping config, with the parsed local path to read in it."""
+        accessor_source_split = conf[self.CONFIG_SOURCE_FILE].split(":")
+        if len(accessor_source_split) > 2:
+            raise ValueError(f"Invalid {self.CONFIG_SOURCE_FILE} : {conf[self.CONFIG_SOURCE_FILE]}")
+        accessor_file_regex = accessor_source_split[0]
+        if len(accessor_source_split) == 2:
+            accessor_local_path = accessor_source_split[1]
+        else:
+            accessor_local_path = conf.get("local_path")
+
+        accessor = self._get_accessor(
+            accessor_file_regex,
+            conf[self.CONFIG_FORMAT],
+            conf[self.CONFIG_ACCESSOR_ID],
+            conf[self.CONFIG_ACCESSOR_CONFIG],
+            conf.get(self.CONFIG_OPTIONAL, False),
+        )
+        if accessor is None:
+            return None
+        return accessor, self._parse_local_path(accessor_local_path), conf
+
     def _get_accessor(
         self,
         file_path: str,
@@ -679,18 +1266,56 @@ class SafeMappingManager:
         accessor_optional: bool = False,
     ) -> Optional[EOProductStore]:
         """Get an accessor from the opened accessors dictionary. If it's not present a new one is added."""
-        if item_format == self.SAFE_HIERARCHY_FORMAT:
-            accessor_file = file_path  # hierarchy safe store don't use regex.
-        else:
-            accessor_file_regex = regex_path_append(self._top_level, file_path)
-            if accessor_file_regex is None:
-                raise ValueError("Invalid regex path.")
-            accessor_file = fs_match_path(accessor_file_regex, self._fs_map_access)
+        accessor_file = self._resolve_accessor_file(file_path, item_format)
         accessor_id = f"{item_format}:{accessor_file}"
         if accessor_id in self._accessor_map and accessor_config_id in self._accessor_map[accessor_id]:
             return self._accessor_map[accessor_id][accessor_config_id][0]
         return self._add_accessor(accessor_file, item_format, accessor_config_id, accessor_config, accessor_optional)
 
+    def _accessor_url(self, file_path: str, item_format: Optional[str] = None) -> str:
+        """Url given to the accessor of a file of the product (extracted first from a zipped product).
+
+        Only the file is extracted for the accessors reading a single file, the whole product for the others.
+        """
+        if self._fs_map_access is None:
+            raise StoreNotOpenError("Store must be open before access to it")
+        if self._is_compressed:
+            store_class = self._store_factory.item_formats.get(item_format) if item_format else None
+            if store_class is None or not store_class.single_file:
+                # the accessor can indirectly open other files of the product (ex: companion files)
+                self._uncompress_all()
+                return os.path.join(self._extraction_dir(), file_path)
+            return self._uncompress_file(file_path)
+        return self._fs_map_access.fs.sep.join([self._fs_map_access.root, file_path])
+
+    def _resolve_accessor_file(self, file_path: str, item_format: str) -> str:
+        """Path in the product of the file matching the regex file_path of a mapping."""
+        if item_format == self.SAFE_HIERARCHY_FORMAT:
+            return file_path  # hierarchy safe store don't use regex.
+        accessor_file_regex = regex_path_append(self._top_level, file_path)
+        if accessor_file_regex is None:
+            raise ValueError("Invalid regex path.")
+        if self._file_index is not None:
+            return self._file_index.match(accessor_file_regex)
+        return fs_match_path(accessor_file_regex, self._fs_map_access)
+
+    @staticmethod
+    def _parse_local_path(local_path: Any) -> Any:
+        """Convert local paths written as a python tuple to a slice."""
+        if local_path and isinstance(local_path, str):
+            try:
+                element = ast.parse(local_path).body
+
+                if (
+                    element
+                    and isinstance(element[0], ast.Expr)
+                    and isinstance(value := element[0].value, ast.Tuple)  # noqa
+                ):
+                    return slice(*ast.literal_eval(local_path))
+            except SyntaxError:
+                return local_path
+        return local_path
+
     def _read_product_mapping(self) -> None:
         """Read mapping from the mapping factory and fill _config_mapping from it."""
         if self._fs_map_access is None:
@@ -711,27 +1336,196 @@ class SafeMappingManager:
                 self._add_data_mapping(config[self.CONFIG_TARGET], config, json_data)
         self._product_type = json_data[self._mapping_factory.RECO][self._mapping_factory.TYPE_RECO]
 
+    def _product_signature(self, fsspec_kwargs: dict[str, Any]) -> Optional[str]:
+        """Key of the open index of the product: digest of its url, of the size and modification time
+        of each of its files, and of the registered mappings.
+
+        None if the modification time of a file of the product is not available.
+        """
+        fs, path = fsspec.core.url_to_fs(self._url, **fsspec_kwargs)
+        try:
+            files = fs.find(path, detail=True)
+        except (FileNotFoundError, NotImplementedError):
+            return None
+        listing = list()
+        for name, info in sorted(files.items()):
+            # find gives no details when the product is a single file (a zip)
+            info = info or fs.info(name)
+            modified = next(
+                (info[key] for key in ("mtime", "LastModified", "last_modified", "updated", "modified") if key in info),
+                None,
+            )
+            if modified is None:
+                return None
+            listing.append((name, info.get("size"), str(modified)))
+        if not listing:
+            return None
+        signature = (self.OPEN_INDEX_VERSION, self._url, listing, self._mapping_factory.signature)
+        return hashlib.sha256(json.dumps(signature).encode()).hexdigest()
+
+    def _open_index_path(self) -> str:
+        """Path of the open index of the product."""
+        if self._open_index is None:
+            raise ValueError("No open index folder.")
+        return os.path.join(self._open_index, hashlib.sha256(self._url.encode()).hexdigest() + ".json")
+
+    def _load_open_index(self) -> bool:
+        """Restore the mappings, hierarchy and resolved files of the product from its open index.
+
+        Returns
+        -------
+        bool
+            True if a valid index was loaded, False if the product must be discovered.
+        """
+        if self._open_index_key is None:
+            return False
+        try:
+            with open(self._open_index_path()) as index_file:
+                index = json.load(index_file)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            warnings.warn(f"Ignoring invalid open index of {self._url}: {e}")
+            return False
+        if index.get("key") != self._open_index_key:
+            return False
+
+        self._is_compressed = index["is_compressed"]
+        self._top_level = index["top_level"]
+        self._product_type = index["product_type"]
+        self._optional_exists = index["optional_exists"]
+        self._file_index = FSMatchIndex(self._fs_map_access, resolved=index["resolved"])
+        for target_path, configs in index["config_mapping"].items():
+            for conf in configs:
+                # json has no sets, accessor ids are written as lists of pairs
+                conf[self.CONFIG_ACCESSOR_ID] = frozenset(tuple(item) for item in conf[self.CONFIG_ACCESSOR_ID])
+            self._config_mapping[target_path] = configs
+            self._target_path_trie.add(target_path)
+        self._hierarchy_children = index["hierarchy_children"]
+        for parent_path, children in self._hierarchy_children.items():
+            for name, optional_target in children.items():
+                self._add_hierarchy_child(parent_path, name, optional_target)
+        self._open_index_saved = (len(self._file_index.resolved), len(self._optional_exists))
+        return True
+
+    def _save_open_index(self) -> None:
+        """Write the open index of the product, if its content changed since it was loaded or saved."""
+        if self._open_index_key is None or self._file_index is None:
+            return
+        resolved = self._file_index.resolved
+        if self._open_index_saved == (len(resolved), len(self._optional_exists)):
+            return
+        index = dict(
+            key=self._open_index_key,
+            is_compressed=self._is_compressed,
+            top_level=self._top_level,
+            product_type=self._product_type,
+            config_mapping={
+                target_path: [
+                    dict(conf, **{self.CONFIG_ACCESSOR_ID: sorted(conf[self.CONFIG_ACCESSOR_ID])}) for conf in configs
+                ]
+                for target_path, configs in self._config_mapping.items()
+            },
+            hierarchy_children=self._hierarchy_children,
+            resolved=resolved,
+            optional_exists=self._optional_exists,
+        )
+        index_path = self._open_index_path()
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(index_path), suffix=".tmp", delete=False) as tmp:
+                json.dump(index, tmp)
+            os.replace(tmp.name, index_path)
+        except Exception as e:
+            warnings.warn(f"Can not write the open index of {self._url}: {e}")
+            return
+        self._open_index_saved = (len(resolved), len(self._optional_exists))
+
     def _uncompress_file(self, file_path: str) -> str:
-        """Uncompress a file form a zip safe into a temporary folder, and return the uncompressed local path.
+        """Extract a member (or all the members of a folder) of a zip safe, and return its local path.
+
+        Only the members of the requested mappings are extracted, in a temporary folder or in the extraction cache.
 
         Parameters
         ----------
-        file_path
+        file_path: str
+            path of the member in the zip
 
         Returns
         -------
-
+        str
+            local path of the extracted member
         """
         if self._fs_map_access is None:
             raise StoreNotOpenError("Store must be open before access to it")
-        if self._temp_dir is None:
-            # We need to unzip everything as some accessor indirectly open files.
-            self._temp_dir = tempfile.TemporaryDirectory()
-            for path_zip, file_zip in self._fs_map_access.items():
-                file_unzip = os.path.join(self._temp_dir.name, path_zip)
-                # create parent directory (needed if the file is in a subfolder of the zip)
-                os.makedirs(os.path.split(file_unzip)[0], exist_ok=True)
-                with open(file_unzip, mode="wb") as file_:
-                    file_.write(file_zip)
-        accessor_file = os.path.join(self._temp_dir.name, file_path)
-        return accessor_file
+        extraction_dir = self._extraction_dir()
+        if file_path in self._fs_map_access:
+            members = [file_path]
+        else:
+            files = list(self._file_index.files if self._file_index is not None else self._fs_map_access)
+            members = [member for member in files if member.startswith(f"{file_path.rstrip('/')}/")]
+            if not members:
+                # some accessors resolve glob patterns (ex: L0 packet files), extract the members they can find
+                members = fnmatch.filter(files, file_path)
+        for member in members:
+            self._extract_member(member, extraction_dir)
+        return os.path.join(extraction_dir, file_path)
+
+    def _uncompress_all(self) -> None:
+        """Extract all the members of the zip safe, once by opening."""
+        if self._fs_map_access is None:
+            raise StoreNotOpenError("Store must be open before access to it")
+        with self._extract_all_lock:
+            if self._extracted_all:
+                return
+            extraction_dir = self._extraction_dir()
+            for member in list(self._file_index.files if self._file_index is not None else self._fs_map_access):
+                self._extract_member(member, extraction_dir)
+            self._extracted_all = True
+
+    def _extraction_dir(self) -> str:
+        """Folder where the members of the zip safe are extracted."""
+        if self._extraction_cache:
+            product_key = hashlib.sha256(self._url.encode()).hexdigest()
+            return os.path.join(self._extraction_cache, product_key)
+        with self._accessor_lock:
+            if self._temp_dir is None:
+                self._temp_dir = tempfile.TemporaryDirectory()
+        return self._temp_dir.name
+
+    def _extract_member(self, member: str, extraction_dir: str) -> None:
+        """Extract a member of the zip safe, unless a previous extraction of the same member content exists."""
+        if self._fs_map_access is None:
+            raise StoreNotOpenError("Store must be open before access to it")
+        file_unzip = os.path.join(extraction_dir, member)
+        fs_path = f"{self._fs_map_access.root}/{member}" if self._fs_map_access.root else member
+        info = self._fs_map_access.fs.info(fs_path)
+        # zip members have a CRC, the size is the only information of the other archives
+        signature = f"{info.get('size')}:{info.get('CRC', '')}"
+        signature_file = os.path.join(extraction_dir, ".extracted", f"{member}.signature")
+        # accessors opened concurrently can share a member: it is extracted by the first one, the others wait for it
+        with self._extraction_lock(file_unzip):
+            if os.path.isfile(file_unzip) and os.path.isfile(signature_file):
+                with open(signature_file) as signature_:
+                    if signature_.read() == signature:
+                        return
+            # create parent directory (needed if the file is in a subfolder of the zip)
+            os.makedirs(os.path.dirname(file_unzip), exist_ok=True)
+            os.makedirs(os.path.dirname(signature_file), exist_ok=True)
+            # write then rename, the extraction cache can be shared by several processes
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(file_unzip), delete=False) as file_:
+                with self._fs_map_access.fs.open(fs_path, mode="rb") as file_zip:
+                    shutil.copyfileobj(file_zip, file_)
+            os.replace(file_.name, file_unzip)
+            with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(signature_file), delete=False) as signature_tmp:
+                signature_tmp.write(signature)
+            os.replace(signature_tmp.name, signature_file)
+
+    @classmethod
+    def _extraction_lock(cls, file_unzip: str) -> threading.Lock:
+        """Lock of the extraction of a member to file_unzip, kept while a thread uses it."""
+        with cls._extraction_locks_lock:
+            lock = cls._extraction_locks.get(file_unzip)
+            if lock is None:
+                lock = cls._extraction_locks[file_unzip] = threading.Lock()
+            return lock
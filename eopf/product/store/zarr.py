@@ -1,21 +1,174 @@
+import json
+import logging
 import pathlib
-from typing import TYPE_CHECKING, Any, Iterator, MutableMapping, Optional
+import time
+import uuid
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Union,
+)
 
 import dask
+import numpy as np
 import zarr
 from dask import array as da
+from dask.array.core import normalize_chunks
+from dask.array.slicing import new_blockdim, normalize_index
+from dask.base import tokenize
 from dask.delayed import Delayed
-from numcodecs import Blosc
+from dask.utils import format_bytes, parse_bytes
+from numcodecs import Blosc, VLenArray
+from xarray.backends.zarr import DIMENSION_KEY
 from zarr.hierarchy import Group
-from zarr.storage import FSStore, contains_array, contains_group
+from zarr.storage import (
+    ConsolidatedMetadataStore,
+    FSStore,
+    contains_array,
+    contains_group,
+)
+from zarr.util import normalize_storage_path
 
 from eopf.exceptions import StoreNotOpenError
 from eopf.product.utils import conv
 
 from .abstract import EOProductStore
+from .chunking import EOChunkPlanner
 
 if TYPE_CHECKING:  # pragma: no cover
     from eopf.product.core.eo_object import EOObject
+    from eopf.product.core.eo_variable import EOVariable
+
+Region = Union[tuple[slice, ...], Mapping[str, slice]]
+
+logger = logging.getLogger("eopf")
+
+
+class _ZarrNode(NamedTuple):
+    """Consolidated metadata of a group or an array of a zarr hierarchy."""
+
+    kind: str  # "group" or "array"
+    attrs: dict[str, Any]
+    children: list[str]
+    shape: Optional[tuple[int, ...]] = None
+    dtype: Optional[str] = None
+    chunks: Optional[tuple[int, ...]] = None
+
+
+def _index_consolidated(meta_store: MutableMapping[str, Any]) -> dict[str, _ZarrNode]:
+    """Tree of the nodes of a consolidated metadata store, by normalized path ("" is the root group)."""
+
+    def decode(value: Any) -> Any:
+        return json.loads(value) if isinstance(value, (bytes, str)) else value
+
+    index: dict[str, _ZarrNode] = dict()
+    for key, value in meta_store.items():
+        path, _, name = key.rpartition("/")
+        if name == ".zgroup":
+            index[path] = _ZarrNode("group", dict(), [])
+        elif name == ".zarray":
+            meta = decode(value)
+            index[path] = _ZarrNode("array", dict(), [], tuple(meta["shape"]), meta["dtype"], tuple(meta["chunks"]))
+    for key, value in meta_store.items():
+        path, _, name = key.rpartition("/")
+        if name == ".zattrs" and path in index:
+            index[path].attrs.update(decode(value))
+    for path in sorted(index):
+        if path:
+            parent, _, name = path.rpartition("/")
+            if parent in index:
+                index[parent].children.append(name)
+    return index
+
+
+# attributes of the CF packing of a variable
+CF_ENCODING_ATTRS = ("scale_factor", "add_offset", "_FillValue")
+
+
+def _cf_encoding(attrs: Mapping[str, Any]) -> dict[str, Any]:
+    """CF packing attributes of a variable, with the float fill values zarr stores as strings ("NaN") decoded."""
+    encoding = {name: attrs.get(name) for name in CF_ENCODING_ATTRS}
+    if isinstance(encoding["_FillValue"], str):
+        encoding["_FillValue"] = float(encoding["_FillValue"])
+    return encoding
+
+
+def _is_nan(value: Any) -> bool:
+    return isinstance(value, (float, np.floating)) and bool(np.isnan(value))
+
+
+def _same_cf_value(first: Any, second: Any) -> bool:
+    return bool(first == second) or (_is_nan(first) and _is_nan(second))
+
+
+def _cf_decoded_dtype(packed_dtype: np.dtype[Any]) -> np.dtype[Any]:
+    """float32 when it represents exactly all the packed values (integers up to 16 bits), float64 otherwise."""
+    if packed_dtype.kind in "iu" and packed_dtype.itemsize <= 2:
+        return np.dtype("float32")
+    return np.result_type(packed_dtype, np.float32) if packed_dtype.kind == "f" else np.dtype("float64")
+
+
+def _decode_cf_block(
+    block: np.ndarray[Any, Any],
+    scale_factor: Any,
+    add_offset: Any,
+    fill_value: Any,
+    dtype: np.dtype[Any],
+) -> np.ndarray[Any, Any]:
+    values = block.astype(dtype)
+    if fill_value is not None and not _is_nan(fill_value):
+        values[block == fill_value] = np.nan
+    if scale_factor is not None:
+        values *= dtype.type(scale_factor)
+    if add_offset is not None:
+        values += dtype.type(add_offset)
+    return values
+
+
+def _encode_cf_block(
+    block: np.ndarray[Any, Any],
+    scale_factor: Any,
+    add_offset: Any,
+    fill_value: Any,
+    dtype: np.dtype[Any],
+) -> np.ndarray[Any, Any]:
+    values = np.asarray(block)
+    if add_offset is not None:
+        values = values - add_offset
+    if scale_factor is not None:
+        values = values / scale_factor
+    if dtype.kind in "iu" and values.dtype.kind == "f":
+        values = np.round(values)
+    if fill_value is not None and not _is_nan(fill_value) and values.dtype.kind == "f":
+        values = np.where(np.isnan(values), fill_value, values)
+    return values.astype(dtype)
+
+
+class _PendingWrite(NamedTuple):
+    key: str
+    delayed: Delayed
+    nbytes: int
+
+
+class ZarrWriteProgress(NamedTuple):
+    """Progress of the variables writes of an EOZarrStore, reported after each wave of writes."""
+
+    written_variables: int
+    written_bytes: int
+    pending_variables: int
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        """written bytes by second"""
+        return self.written_bytes / self.elapsed if self.elapsed else 0.0
 
 
 class EOZarrStore(EOProductStore):
@@ -80,13 +233,19 @@ class EOZarrStore(EOProductStore):
 
     _root: Optional[Group] = None
     _fs: Optional[FSStore] = None
+    # structure of the product opened in reading mode with consolidated metadata
+    _index: Optional[dict[str, _ZarrNode]] = None
     sep = "/"
     DEFAULT_COMPRESSOR = Blosc(cname="zstd", clevel=3, shuffle=Blosc.BITSHUFFLE)
+    # object variables are ragged byte arrays (ex: L0 packet user data)
+    DEFAULT_OBJECT_CODEC = VLenArray("uint8")
+    # estimated bytes of the variables written together by a dask compute
+    DEFAULT_WRITE_WAVE_BYTES = 2**30
 
     # docstr-coverage: inherited
     def __init__(self, url: str) -> None:
         super().__init__(url)
-        self._delayed_list: list[Delayed] = []
+        self._pending_writes: deque[_PendingWrite] = deque()
         self._zarr_kwargs: dict[str, Any] = dict()
         self._dask_kwargs: dict[str, Any] = dict()
 
@@ -96,6 +255,19 @@ class EOZarrStore(EOProductStore):
 
         library specifics parameters :
             - compressor : numcodecs compressor. ex : Blosc(cname="zstd", clevel=3, shuffle=Blosc.BITSHUFFLE)
+            - mask_and_scale : decode the variables with scale_factor, add_offset or _FillValue attributes
+              (default True), the decoding is applied lazily by chunk.
+            - mask_integer_fill : also decode the integer variables having only a _FillValue to floats, with NaN
+              for the fill value (default False, they are read as is, ex: flags).
+            - decode_dtype : float dtype of the decoded variables, by default float32 for packed integers
+              up to 16 bits and float64 otherwise.
+            - chunk_planner : EOChunkPlanner choosing the chunks of the written variables, recorded in the
+              chunk_plan attribute of the product (by default None: the variables are written with the chunks
+              of their data).
+            - write_wave_bytes : the variables are written by waves of this estimated size in bytes (1GiB by default)
+              at close, or when the store is flushed.
+            - write_on_set : write each variable as soon as it is set, instead of at close (default False).
+            - write_progress : callable receiving a ZarrWriteProgress after each wave of writes.
 
         Parameters
         ----------
@@ -108,6 +280,18 @@ class EOZarrStore(EOProductStore):
         """
         super().open()
         self._mode = mode
+        self._mask_and_scale = kwargs.pop("mask_and_scale", True)
+        self._mask_integer_fill = kwargs.pop("mask_integer_fill", False)
+        self._decode_dtype = kwargs.pop("decode_dtype", None)
+        self._chunk_planner: Optional[EOChunkPlanner] = kwargs.pop("chunk_planner", None)
+        self._chunk_plan: dict[str, list[int]] = dict()
+        write_wave_bytes = kwargs.pop("write_wave_bytes", self.DEFAULT_WRITE_WAVE_BYTES)
+        self._write_wave_bytes = (
+            parse_bytes(write_wave_bytes) if isinstance(write_wave_bytes, str) else write_wave_bytes
+        )
+        self._write_on_set: bool = kwargs.pop("write_on_set", False)
+        self._write_progress: Optional[Callable[[ZarrWriteProgress], Any]] = kwargs.pop("write_progress", None)
+        self._written = ZarrWriteProgress(0, 0, 0, 0.0)
         # dask can take specific kwargs (and probably zarr too).
         kwargs.setdefault("zarr_kwargs", dict())
         kwargs.setdefault("dask_kwargs", dict())
@@ -128,6 +312,11 @@ class EOZarrStore(EOProductStore):
         else:
             self._root: Group = zarr.open(store=self.url, mode=mode, **self._zarr_kwargs)
         self._fs = self._root.store
+        if isinstance(self._fs, ConsolidatedMetadataStore) and isinstance(self._root, Group) and not self._root.path:
+            # structural queries are answered from it, without any storage request
+            self._index = _index_consolidated(self._fs.meta_store)
+        # names the dask arrays of this opening (urls like reference:// are shared by different stores)
+        self._token = uuid.uuid4().hex
 
     # docstr-coverage: inherited
     def close(self) -> None:
@@ -136,9 +325,11 @@ class EOZarrStore(EOProductStore):
         if not isinstance(self._root, Group):
             raise StoreNotOpenError("Store must be open before close it")
 
-        if len(self._delayed_list) > 0:
-            dask.compute(self._delayed_list)
-        self._delayed_list = []
+        self.flush()
+        if self._chunk_planner is not None and self._chunk_plan:
+            planner = self._chunk_planner.for_product_type(self._root.attrs.get("product_type", ""))
+            self._root.attrs["chunk_plan"] = planner.to_dict() | dict(chunks=self._chunk_plan)
+        self._chunk_plan = dict()
 
         # only if we write
         if any(self._mode.startswith(mode) for mode in ("w", "a")) or "+" in self._mode:
@@ -146,17 +337,24 @@ class EOZarrStore(EOProductStore):
 
         self._root = None
         self._fs = None
+        self._index = None
 
     # docstr-coverage: inherited
     def is_group(self, path: str) -> bool:
         if self._fs is None:
             raise StoreNotOpenError("Store must be open before access to it")
+        if self._index is not None:
+            node = self._index.get(normalize_storage_path(path))
+            return node is not None and node.kind == "group"
         return contains_group(self._fs, path=path)
 
     # docstr-coverage: inherited
     def is_variable(self, path: str) -> bool:
         if self._fs is None:
             raise StoreNotOpenError("Store must be open before access to it")
+        if self._index is not None:
+            node = self._index.get(normalize_storage_path(path))
+            return node is not None and node.kind == "array"
         return contains_array(self._fs, path=path)
 
     # docstr-coverage: inherited
@@ -169,6 +367,9 @@ class EOZarrStore(EOProductStore):
     def iter(self, path: str) -> Iterator[str]:
         if self._root is None:
             raise StoreNotOpenError("Store must be open before access to it")
+        if self._index is not None:
+            node = self._index.get(normalize_storage_path(path))
+            return iter(node.children if node is not None and node.kind == "group" else [])
         return iter(self._root.get(path, []))
 
     def __getitem__(self, key: str) -> "EOObject":
@@ -177,22 +378,44 @@ class EOZarrStore(EOProductStore):
 
         from eopf.product.core import EOGroup, EOVariable
 
+        node = self._index.get(normalize_storage_path(key)) if self._index is not None else None
+        if node is not None and node.kind == "group":
+            return EOGroup(attrs=dict(node.attrs))
         obj = self._root[key]
-        if self.is_group(key):
+        if isinstance(obj, Group):
             return EOGroup(attrs=obj.attrs)
+        attrs = dict(node.attrs) if node is not None else obj.attrs
         # Use dask instead of zarr to read the object data to :
         # - avoid memory leak/let dask manage lazily close the data file
         # - read in parallel
-        var_data = da.from_zarr(self.url, component=key, storage_options=self._dask_kwargs["storage_options"])
-
-        # apply scale and offset
-        if "scale_factor" in obj.attrs:
-            var_data *= obj.attrs["scale_factor"]
-
-        if "add_offset" in obj.attrs:
-            var_data += obj.attrs["add_offset"]
-
-        return EOVariable(data=var_data, attrs=obj.attrs)
+        # The array is read from the open group, without reading its metadata again.
+        var_data = da.from_zarr(obj, name=f"from-zarr-{tokenize(self._token, key)}")
+        encoding = _cf_encoding(attrs)
+        is_packed = encoding["scale_factor"] is not None or encoding["add_offset"] is not None
+        fill_value = encoding["_FillValue"]
+        # integers with only a fill value (ex: flags) keep their dtype, unless their masking is requested
+        is_masked = (
+            fill_value is not None
+            and not _is_nan(fill_value)
+            and (var_data.dtype.kind == "f" or (var_data.dtype.kind in "iu" and self._mask_integer_fill))
+        )
+        if not self._mask_and_scale or var_data.dtype == object or not (is_packed or is_masked):
+            return EOVariable(data=var_data, attrs=attrs)
+
+        # decode the packed values chunk by chunk, only when they are computed
+        dtype = np.dtype(self._decode_dtype or _cf_decoded_dtype(var_data.dtype))
+        decoded = var_data.map_blocks(
+            _decode_cf_block,
+            *encoding.values(),
+            dtype,
+            dtype=dtype,
+            name=f"cf-decode-{tokenize(self._token, key, dtype)}",
+            meta=np.empty((0,) * var_data.ndim, dtype=dtype),
+        )
+        variable = EOVariable(data=decoded, attrs=attrs)
+        # to write the packed data again, without decoding them, if the variable is forwarded as is
+        variable.encoding.update(encoding, dtype=var_data.dtype, packed_data=var_data, decoded_name=decoded.name)
+        return variable
 
     def __setitem__(self, key: str, value: "EOObject") -> None:
         from eopf.product.core import EOGroup, EOVariable
@@ -202,26 +425,220 @@ class EOZarrStore(EOProductStore):
         if isinstance(value, EOGroup):
             self._root.create_group(key, overwrite=True)
         elif isinstance(value, EOVariable):
-            data = value.data
-
-            # apply scale and offset
-            if "add_offset" in value.attrs:
-                data -= value.attrs["add_offset"]
-            if "scale_factor" in value.attrs:
-                data /= value.attrs["scale_factor"]
-
-            dask_array = da.asarray(data, dtype=value.data.dtype)  # .data is generally already a dask array.
+            dask_array = self._encode(value)
+            if self._chunk_planner is not None:
+                # the product type is written in the root attributes before the variables
+                planner = self._chunk_planner.for_product_type(self._root.attrs.get("product_type", ""))
+                dask_array = planner.rechunk(dask_array, value.dims)
+                if dask_array.size > 0 and dask_array.dtype != object:
+                    self._chunk_plan[normalize_storage_path(key)] = [dim_chunks[0] for dim_chunks in dask_array.chunks]
+            dask_kwargs = self._dask_kwargs
+            create_kwargs: dict[str, Any] = dict()
+            if dask_array.dtype == object:
+                dask_kwargs = dict(object_codec=self.DEFAULT_OBJECT_CODEC) | dask_kwargs
+                create_kwargs = dict(dtype=object, object_codec=dask_kwargs["object_codec"])
             if dask_array.size > 0:
                 # We must use to_zarr for writing on a distributed cluster,
                 # but to_zarr fail to write array with a 0 dim (divide by zero Exception)
-                delayed = dask_array.to_zarr(self.url, component=key, **self._dask_kwargs)
+                delayed = dask_array.to_zarr(self.url, component=key, **dask_kwargs)
                 if delayed is not None:
-                    self._delayed_list.append(delayed)
+                    self._pending_writes.append(_PendingWrite(key, delayed, int(dask_array.nbytes)))
             else:
-                self._root.create(key, shape=dask_array.shape)
+                self._root.create(key, shape=dask_array.shape, **create_kwargs)
         else:
             raise TypeError("Only EOGroup and EOVariable can be set")
         self.write_attrs(key, value.attrs)
+        if self._write_on_set:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the variables set since the last flush.
+
+        The writes are computed by waves of write_wave_bytes estimated bytes, to bound the size of the dask graphs
+        and the memory used, and the progress is reported after each wave.
+        """
+        if self._root is None:
+            raise StoreNotOpenError("Store must be open before access to it")
+        wave: list[_PendingWrite] = []
+        while self._pending_writes:
+            wave.append(self._pending_writes.popleft())
+            if not self._pending_writes or sum(write.nbytes for write in wave) >= self._write_wave_bytes:
+                self._write_wave(wave)
+                wave = []
+
+    def _write_wave(self, wave: list[_PendingWrite]) -> None:
+        start = time.perf_counter()
+        dask.compute([write.delayed for write in wave])
+        elapsed = time.perf_counter() - start
+        nbytes = sum(write.nbytes for write in wave)
+        self._written = ZarrWriteProgress(
+            self._written.written_variables + len(wave),
+            self._written.written_bytes + nbytes,
+            len(self._pending_writes),
+            self._written.elapsed + elapsed,
+        )
+        logger.info(
+            f"Wrote {len(wave)} variables ({format_bytes(nbytes)}) of {self.url} in {elapsed:.2f}s, "
+            f"{self._written.written_variables} written and {len(self._pending_writes)} pending, "
+            f"{format_bytes(int(self._written.throughput))}/s",
+        )
+        if self._write_progress is not None:
+            self._write_progress(self._written)
+
+    def create_variable(
+        self,
+        key: str,
+        shape: tuple[int, ...],
+        dtype: Any,
+        chunks: Optional[tuple[int, ...]] = None,
+        dims: tuple[str, ...] = tuple(),
+        attrs: Optional[MutableMapping[str, Any]] = None,
+        fill_value: Any = None,
+    ) -> None:
+        """Declare a variable, to be written later by regions or appends.
+
+        Parameters
+        ----------
+        key: str
+            path of the variable
+        shape: tuple[int, ...]
+            shape of the variable, the appended dimension can be 0 (its chunks are then planned as unbounded)
+        dtype: Any
+            dtype of the stored data (the packed dtype if attrs have CF scale_factor or add_offset)
+        chunks: tuple[int, ...], optional
+            chunk shape, by default chosen by the chunk planner of the store, or by zarr if it has none
+        dims: tuple[str, ...], optional
+            dimensions names
+        attrs: MutableMapping[str, Any], optional
+            attributes of the variable
+        fill_value: Any, optional
+            value of the parts of the variable not written
+
+        See Also
+        --------
+        EOZarrStore.write_region
+        EOZarrStore.append
+        """
+        if self._root is None:
+            raise StoreNotOpenError("Store must be open before access to it")
+        dtype = np.dtype(dtype)
+        if chunks is None and self._chunk_planner is not None:
+            planner = self._chunk_planner.for_product_type(self._root.attrs.get("product_type", ""))
+            # the empty dimensions (ex: appended ones) are unbounded, their chunks are only limited by the target size
+            unbounded = max(1, planner.target_bytes // dtype.itemsize)
+            chunks = planner.plan(tuple(size or unbounded for size in shape), dtype, dims)
+        create_kwargs: dict[str, Any] = dict(compressor=self._dask_kwargs.get("compressor", self.DEFAULT_COMPRESSOR))
+        if dtype == object:
+            create_kwargs["object_codec"] = self._dask_kwargs.get("object_codec", self.DEFAULT_OBJECT_CODEC)
+        self._root.create(
+            key,
+            shape=shape,
+            dtype=dtype,
+            chunks=chunks or True,
+            fill_value=fill_value,
+            overwrite=True,
+            **create_kwargs,
+        )
+        attrs = dict(attrs or {})
+        if dims:
+            attrs[DIMENSION_KEY] = list(dims)
+        self.write_attrs(key, attrs)
+
+    def write_region(self, key: str, data: Any, region: Region) -> None:
+        """Write data in a region of a declared variable, without holding the rest of the variable.
+
+        Dask data are rechunked on the chunks of the variable before being written,
+        each chunk being written by a single task. Data are encoded with the CF attributes of the variable.
+
+        Parameters
+        ----------
+        key: str
+            path of the variable
+        data: Any
+            EOVariable, dask or numpy array, with the shape of the region
+        region: tuple[slice, ...] or Mapping[str, slice]
+            region of the variable, by dimension index or by dimension name (missing ones are entirely written)
+        """
+        from eopf.product.core import EOVariable
+
+        if self._root is None:
+            raise StoreNotOpenError("Store must be open before access to it")
+        array = self._root[key]
+        if isinstance(data, EOVariable):
+            data = data.data
+        if isinstance(region, Mapping):
+            dims = array.attrs.get(DIMENSION_KEY, [])
+            if unknown_dims := set(region) - set(dims):
+                raise KeyError(f"Unknown dimensions {unknown_dims} of {key}")
+            region = tuple(region.get(dim, slice(None)) for dim in dims)
+        region = tuple(region) + (slice(None),) * (array.ndim - len(region))
+
+        scale_factor, add_offset, fill_value = _cf_encoding(array.attrs).values()
+        if any(value is not None for value in (scale_factor, add_offset, fill_value)) and array.dtype != object:
+            encoding = (scale_factor, add_offset, fill_value, array.dtype)
+            if isinstance(data, da.Array):
+                data = da.map_blocks(_encode_cf_block, data, *encoding, dtype=array.dtype)
+            else:
+                data = _encode_cf_block(np.asarray(data), *encoding)
+        if not isinstance(data, da.Array):
+            array[region] = data
+            return
+        # aligned on the chunks of the array, so that no chunk is written by two tasks
+        index = normalize_index(region, array.shape)
+        array_chunks = normalize_chunks(array.chunks, array.shape)
+        chunks = tuple(tuple(new_blockdim(s, c, r)) for s, c, r in zip(array.shape, array_chunks, index))
+        data.rechunk(chunks).store(array, lock=False, regions=[region], compute=True)
+
+    def append(self, key: str, data: Any, dim: Union[int, str] = 0) -> None:
+        """Append data to a declared variable along a dimension.
+
+        Parameters
+        ----------
+        key: str
+            path of the variable
+        data: Any
+            EOVariable, dask or numpy array, with the shape of the variable on the other dimensions
+        dim: int or str, optional
+            index or name of the appended dimension
+        """
+        if self._root is None:
+            raise StoreNotOpenError("Store must be open before access to it")
+        array = self._root[key]
+        axis = array.attrs.get(DIMENSION_KEY, []).index(dim) if isinstance(dim, str) else dim
+        length = array.shape[axis]
+        appended = data.shape[axis]
+        array.resize(*(size + appended if index == axis else size for index, size in enumerate(array.shape)))
+        region = tuple(
+            slice(length, length + appended) if index == axis else slice(None) for index in range(array.ndim)
+        )
+        self.write_region(key, data, region)
+
+    def _encode(self, variable: "EOVariable") -> da.Array:
+        """Data of the variable packed as described by its scale_factor, add_offset and _FillValue attributes.
+
+        The encoding is applied by chunk, and skipped for variables decoded by a zarr store and not modified since.
+        """
+        data = da.asarray(variable.data, dtype=variable.data.dtype)  # .data is generally already a dask array.
+        encoding = _cf_encoding(variable.attrs)
+        if data.dtype == object or not any(value is not None for value in encoding.values()):
+            return data
+        if variable.encoding.get("decoded_name") == data.name and all(
+            _same_cf_value(variable.encoding.get(name), value) for name, value in encoding.items()
+        ):
+            return variable.encoding["packed_data"]
+        dtype = variable.encoding.get("dtype")
+        if dtype is None:
+            # only packed data become floats, other data keep their dtype with their _FillValue
+            is_packed = encoding["scale_factor"] is not None or encoding["add_offset"] is not None
+            dtype = "float64" if is_packed and data.dtype.kind != "f" else data.dtype
+        dtype = np.dtype(dtype)
+        return data.map_blocks(
+            _encode_cf_block,
+            *encoding.values(),
+            dtype,
+            dtype=dtype,
+            meta=np.empty((0,) * data.ndim, dtype=dtype),
+        )
 
     def __delitem__(self, key: str) -> None:
         if self._root is None:
@@ -231,11 +648,15 @@ class EOZarrStore(EOProductStore):
     def __len__(self) -> int:
         if self._root is None:
             raise StoreNotOpenError("Store must be open before access to it")
+        if self._index is not None:
+            return len(self._index[""].children)
         return len(self._root)
 
     def __iter__(self) -> Iterator[str]:
         if self._root is None:
             raise StoreNotOpenError("Store must be open before access to it")
+        if self._index is not None:
+            return iter(self._index[""].children)
         return iter(self._root)
 
     # docstr-coverage: inherited
@@ -4,8 +4,9 @@ import datetime
 import platform
 import posixpath
 import re
+import threading
 from pathlib import PurePosixPath
-from typing import Any, Callable, Optional, Sequence, Union
+from typing import Any, Callable, Iterable, Mapping, Optional, Sequence, Union
 
 import dask.array as da
 import dateutil.parser as date_parser
@@ -268,6 +269,109 @@ def fs_match_path(pattern: str, filesystem: fsspec.FSMap) -> str:
     return pattern
 
 
+class FSMatchIndex:
+    """Resolve path patterns like fs_match_path, listing the filesystem only once.
+
+    The listing and the resolved patterns are cached, so the index must be dropped when
+    the filesystem content changes. The index can be shared by several threads.
+
+    Parameters
+    ----------
+    filesystem: fsspec.FSMap
+        filesystem representation
+    resolved: Mapping[str, str], optional
+        patterns already resolved on this filesystem (see `resolved`), matched without listing it
+
+    Attributes
+    ----------
+    hits: int
+        number of patterns resolved from the cache
+    misses: int
+        number of patterns matched against the listing
+    listings: int
+        number of listings of the filesystem
+    """
+
+    def __init__(self, filesystem: fsspec.FSMap, resolved: Optional[Mapping[str, str]] = None) -> None:
+        self._filesystem = filesystem
+        self._files: Optional[list[str]] = None
+        self._resolved: dict[str, str] = dict(resolved or {})
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.listings = 0
+
+    @property
+    def files(self) -> list[str]:
+        """Paths of the filesystem, listed on first access"""
+        with self._lock:
+            if self._files is None:
+                self._files = list(self._filesystem)
+                self.listings += 1
+            return self._files
+
+    @property
+    def resolved(self) -> dict[str, str]:
+        """Matching path (or the pattern itself) by resolved pattern"""
+        with self._lock:
+            return dict(self._resolved)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Cache counters, for diagnostics"""
+        with self._lock:
+            return dict(hits=self.hits, misses=self.misses, listings=self.listings, files=len(self._files or []))
+
+    def match(self, pattern: str) -> str:
+        """Same as fs_match_path on the cached listing.
+
+        Parameters
+        ----------
+        pattern: str
+            regex pattern to match
+
+        Returns
+        -------
+        str
+            matching path if find, else `pattern`
+        """
+        with self._lock:
+            if pattern in self._resolved:
+                self.hits += 1
+                return self._resolved[pattern]
+        return self.match_all([pattern])[pattern]
+
+    def match_all(self, patterns: Iterable[str]) -> dict[str, str]:
+        """Resolve several patterns in a single pass over the listing.
+
+        Parameters
+        ----------
+        patterns: Iterable[str]
+            regex patterns to match
+
+        Returns
+        -------
+        dict[str, str]
+            first matching path (or the pattern itself) by pattern
+        """
+        patterns = list(patterns)
+        with self._lock:
+            results = {pattern: self._resolved[pattern] for pattern in patterns if pattern in self._resolved}
+            self.hits += len(results)
+            pending = {pattern: re.compile(pattern) for pattern in patterns if pattern not in self._resolved}
+            self.misses += len(pending)
+            for file_path in self.files if pending else []:
+                for pattern, filepath_regex in list(pending.items()):
+                    if filepath_regex.fullmatch(file_path):
+                        results[pattern] = file_path
+                        del pending[pattern]
+                if not pending:
+                    break
+            results.update((pattern, pattern) for pattern in pending)
+            self._resolved.update(results)
+            return results
+
+
 def is_absolute_eo_path(eo_path: str) -> bool:
     """Check if the given path is absolute or not
 
@@ -394,6 +394,30 @@ def test_load_product(product):
         product.load()
 
 
+@pytest.mark.unit
+def test_load_product_get_many(product):
+    variables = {"var_a": EOVariable(data=[1, 2]), "var_b": EOVariable(data=[3])}
+
+    def iter_store(path: str) -> Iterator[str]:
+        return iter(variables if path.strip("/") == "measurements" else [])
+
+    def get_many(paths):
+        return {path: variables[upsplit_eo_path(path)[1]] for path in paths}
+
+    with (
+        patch.object(EmptyTestStore, "__getitem__", return_value=(EOGroup())),
+        patch.object(EmptyTestStore, "iter", side_effect=iter_store),
+        patch.object(EmptyTestStore, "get_many", side_effect=get_many) as mock_get_many,
+        product.open(mode="r"),
+    ):
+        product.load()
+        # the variables of a group are read together
+        assert mock_get_many.call_count == 1
+        assert sorted(upsplit_eo_path(path)[1] for path in mock_get_many.call_args[0][0]) == ["var_a", "var_b"]
+        assert product["measurements/var_a"]._data.values.tolist() == [1, 2]
+        assert {"var_a", "var_b"} <= {eo_obj.name for eo_obj in product.measurements.walk()}
+
+
 @pytest.mark.unit
 def test_product_must_have_mandatory_group():
     product = EOProduct("product_name")
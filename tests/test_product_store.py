@@ -1,11 +1,15 @@
 import os
 import os.path
 import shutil
+import warnings
 from typing import Any, Optional
 from unittest.mock import patch
 
+import dask
+import dask.array as da
 import fsspec
 import hypothesis.strategies as st
+import netCDF4
 import numpy as np
 import pytest
 import xarray
@@ -19,6 +23,7 @@ from eopf.exceptions.warnings import AlreadyOpen
 from eopf.product.conveniences import init_product, open_store
 from eopf.product.core import EOGroup, EOProduct, EOVariable
 from eopf.product.store import (
+    EOChunkPlanner,
     EONetCDFStore,
     EOProductStore,
     EOSafeStore,
@@ -28,6 +33,8 @@ from eopf.product.store import (
 from eopf.product.store.cog import EOCogStore
 from eopf.product.store.grib import EOGribAccessor
 from eopf.product.store.manifest import ManifestStore
+from eopf.product.store.memmap_accessors import RaggedBytes
+from eopf.product.store.netcdf import EONetCDFStoreNCpy, KerchunkReferenceCache
 from eopf.product.store.rasterio import EORasterIOAccessor
 from eopf.product.store.wrappers import (
     FromAttributesToFlagValueAccessor,
@@ -204,6 +211,371 @@ def test_load_product_from_zarr(dask_client_all, zarr_file: str):
         product.store["an_utem"] = "A_Value"
 
 
+@pytest.mark.unit
+def test_zarr_ragged_bytes(tmp_path):
+    ragged = RaggedBytes(np.arange(40, dtype="uint8"), np.array([0, 5, 12, 30]), np.array([3, 0, 18, 10]))
+    url = str(tmp_path / "ragged.zarr")
+
+    with open_store(EOZarrStore(url), mode="w") as store:
+        store["user_data"] = EOVariable(data=ragged)
+    with open_store(EOZarrStore(url)) as store:
+        data = store["user_data"].data.compute(scheduler="synchronous")
+
+    assert data.dtype == object
+    for index, values in enumerate(data):
+        np.testing.assert_array_equal(values, ragged[index])
+
+
+@pytest.mark.unit
+def test_zarr_read_from_open_group(tmp_path):
+    url = str(tmp_path / "product.zarr")
+    with open_store(EOZarrStore(url), mode="w") as store:
+        store["group"] = EOGroup()
+        for index in range(3):
+            store[f"group/variable_{index}"] = EOVariable(data=np.full((4, 5), index, dtype="int16"))
+
+    with open_store(EOZarrStore(url)) as store:
+        with patch("zarr.open_consolidated") as mock_open, patch("zarr.open") as mock_open_array:
+            variables = [store[f"group/variable_{index}"] for index in range(3)]
+        mock_open.assert_not_called()
+        mock_open_array.assert_not_called()
+        assert len({variable.data.name for variable in variables}) == 3
+        for index, variable in enumerate(variables):
+            np.testing.assert_array_equal(variable.data.compute(scheduler="synchronous"), index)
+
+
+@pytest.mark.unit
+def test_zarr_cf_decoding(tmp_path):
+    packed = np.array([[0, 1, 2], [3, -1, 5]], dtype="int16")
+    attrs = {"scale_factor": 0.5, "add_offset": 10.0, "_FillValue": -1}
+    root = zarr.open_group(str(tmp_path / "packed.zarr"), mode="w")
+    root.create_dataset("counts", data=packed, chunks=(1, 3)).attrs.update(attrs)
+    zarr.consolidate_metadata(root.store)
+    expected = packed * 0.5 + 10.0
+    expected[1, 1] = np.nan
+
+    with open_store(EOZarrStore(str(tmp_path / "packed.zarr"))) as store:
+        counts = store["counts"]
+        assert counts.data.dtype == "float32"
+        np.testing.assert_array_equal(counts.data.compute(scheduler="synchronous"), expected.astype("float32"))
+    with open_store(EOZarrStore(str(tmp_path / "packed.zarr")), decode_dtype="float64") as store:
+        np.testing.assert_array_equal(store["counts"].data.compute(scheduler="synchronous"), expected)
+    with open_store(EOZarrStore(str(tmp_path / "packed.zarr")), mask_and_scale=False) as store:
+        np.testing.assert_array_equal(store["counts"].data.compute(scheduler="synchronous"), packed)
+
+    # forwarded variables are written packed, without decoding them
+    with (
+        patch("eopf.product.store.zarr._decode_cf_block") as mock_decode,
+        open_store(EOZarrStore(str(tmp_path / "packed.zarr"))) as store,
+        open_store(EOZarrStore(str(tmp_path / "forwarded.zarr")), mode="w") as output,
+    ):
+        output["counts"] = store["counts"]
+    mock_decode.assert_not_called()
+    # modified variables are encoded again, by chunk
+    with (
+        open_store(EOZarrStore(str(tmp_path / "packed.zarr"))) as store,
+        open_store(EOZarrStore(str(tmp_path / "forwarded.zarr")), mode="r+") as output,
+    ):
+        counts = store["counts"]
+        shifted = EOVariable(data=counts + 1, attrs=attrs | {"add_offset": 11.0})
+        shifted.encoding.update(dtype=counts.encoding["dtype"])
+        output["shifted"] = shifted
+        # without packing attributes, the data keep their dtype
+        output["flags"] = EOVariable(data=packed, attrs={"_FillValue": -1})
+
+    written = zarr.open_group(str(tmp_path / "forwarded.zarr"), mode="r")
+    assert written["flags"].dtype == "int16"
+    np.testing.assert_array_equal(written["flags"][:], packed)
+    assert written["counts"].dtype == "int16"
+    np.testing.assert_array_equal(written["counts"][:], packed)
+    assert attrs.items() <= dict(written["counts"].attrs).items()
+    assert written["shifted"].dtype == "int16"
+    np.testing.assert_array_equal(written["shifted"][:], packed)
+
+
+@pytest.mark.unit
+def test_zarr_cf_fill_values(tmp_path):
+    url = str(tmp_path / "filled.zarr")
+    flags = np.array([1, 2, 255, 4, 8], dtype="uint8")
+    values = np.array([[1.0, np.nan], [-999.0, 4.0]], dtype="float32")
+    root = zarr.open_group(url, mode="w")
+    root.create_dataset("flags", data=flags).attrs.update({"_FillValue": 255})
+    # the NaN fill values are stored as strings in the json attributes
+    root.create_dataset("nan_filled", data=values, fill_value=np.nan).attrs.update({"_FillValue": "NaN"})
+    root.create_dataset("filled", data=values).attrs.update({"_FillValue": -999.0})
+    zarr.consolidate_metadata(root.store)
+    masked = np.where(values == -999.0, np.nan, values)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        with open_store(EOZarrStore(url)) as store:
+            # integers with only a fill value are read as is
+            assert store["flags"].data.dtype == "uint8"
+            np.testing.assert_array_equal(store["flags"].data.compute(), flags)
+            nan_filled = store["nan_filled"]
+            assert nan_filled.data.dtype == "float32"
+            np.testing.assert_array_equal(nan_filled.data.compute(), values)
+            np.testing.assert_array_equal(store["filled"].data.compute(), masked)
+
+            with open_store(EOZarrStore(str(tmp_path / "copy.zarr")), mode="w") as output:
+                output["flags"] = store["flags"]
+                output["nan_filled"] = nan_filled
+                output["filled"] = store["filled"]
+        with open_store(EOZarrStore(url), mask_integer_fill=True) as store:
+            np.testing.assert_array_equal(store["flags"].data.compute(), [1, 2, np.nan, 4, 8])
+
+    written = zarr.open_group(str(tmp_path / "copy.zarr"), mode="r")
+    assert written["flags"].dtype == "uint8"
+    np.testing.assert_array_equal(written["flags"][:], flags)
+    assert written["nan_filled"].dtype == "float32"
+    np.testing.assert_array_equal(written["nan_filled"][:], values)
+    np.testing.assert_array_equal(written["filled"][:], values)
+
+
+class _CountingMemoryStore(zarr.MemoryStore):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests = 0
+
+    def __getitem__(self, item):
+        self.requests += 1
+        return super().__getitem__(item)
+
+    def __contains__(self, item):
+        self.requests += 1
+        return super().__contains__(item)
+
+
+@pytest.mark.unit
+def test_zarr_structure_from_consolidated_metadata():
+    zarr_store = _CountingMemoryStore()
+    with open_store(EOZarrStore(zarr_store), mode="w") as store:
+        store["measurements"] = EOGroup(attrs={"description": "measurements"})
+        store["measurements/radiance"] = EOVariable(data=np.zeros((4, 6), dtype="float32"), attrs={"units": "W"})
+        store["measurements/empty"] = EOGroup()
+        store["quality"] = EOGroup()
+
+    with open_store(EOZarrStore(zarr_store)) as store:
+        zarr_store.requests = 0
+        assert list(store) == ["measurements", "quality"]
+        assert list(store.iter("measurements")) == ["empty", "radiance"]
+        assert list(store.iter("measurements/radiance")) == []
+        assert list(store.iter("missing")) == []
+        assert store.is_group("/measurements/empty")
+        assert not store.is_group("measurements/radiance")
+        assert store.is_variable("measurements/radiance")
+        assert not store.is_variable("missing")
+        assert store["measurements"].attrs["description"] == "measurements"
+        assert store._index["measurements/radiance"].shape == (4, 6)
+        assert store._index["measurements/radiance"].dtype == "<f4"
+        assert zarr_store.requests == 0
+        assert store["measurements/radiance"].attrs["units"] == "W"
+
+
+@pytest.mark.unit
+def test_chunk_planner():
+    planner = EOChunkPlanner(
+        "1MiB",
+        dims={"bands": 1},
+        product_types={"S3OLCEFR": dict(access="rows", target_bytes=4 * 2**20)},
+    )
+    assert planner.plan((4096, 4096), "float32") == (512, 512)
+    assert planner.plan((21, 4096, 4096), "float32", ("bands", "rows", "columns")) == (1, 512, 512)
+    assert planner.plan((100, 100), "uint8") == (100, 100)
+    assert planner.plan((0, 100), "uint8") is None
+    assert planner.plan((10,), object) is None
+    rows_planner = planner.for_product_type("S3OLCEFR")
+    assert rows_planner.plan((21, 4096, 4096), "float32", ("bands", "rows", "columns")) == (1, 256, 4096)
+    assert planner.for_product_type("S2MSIL1C") is planner
+
+    data = da.zeros((4096, 4096), chunks=(4096, 64), dtype="float32")
+    assert planner.rechunk(data).chunks == da.zeros((4096, 4096), chunks=512).chunks
+    rechunked = planner.rechunk(data)
+    assert planner.rechunk(rechunked) is rechunked
+    with pytest.raises(ValueError):
+        EOChunkPlanner(access="columns")
+
+
+@pytest.mark.unit
+def test_zarr_write_waves(tmp_path):
+    url = str(tmp_path / "waves.zarr")
+    progress = []
+    with open_store(EOZarrStore(url), mode="w", write_wave_bytes=250, write_progress=progress.append) as store:
+        for index in range(5):
+            store[f"variable_{index}"] = EOVariable(data=da.full(10, index, dtype="float64"))
+        assert progress == []
+    # 80 bytes variables, by waves of 4 variables (320 bytes) then 1
+    assert [report.written_variables for report in progress] == [4, 5]
+    assert [report.pending_variables for report in progress] == [1, 0]
+    assert progress[-1].written_bytes == 400
+    assert progress[-1].throughput > 0
+    root = zarr.open_group(url, mode="r")
+    for index in range(5):
+        np.testing.assert_array_equal(root[f"variable_{index}"][:], index)
+
+    progress.clear()
+    with open_store(EOZarrStore(url), mode="w", write_on_set=True, write_progress=progress.append) as store:
+        store["variable"] = EOVariable(data=da.ones(10))
+        assert [report.written_variables for report in progress] == [1]
+        np.testing.assert_array_equal(zarr.open_array(f"{url}/variable", mode="r")[:], 1)
+
+
+@pytest.mark.unit
+def test_zarr_region_and_append_writes(tmp_path):
+    url = str(tmp_path / "incremental.zarr")
+    expected = np.arange(48, dtype="float32").reshape(6, 8)
+    with open_store(EOZarrStore(url), mode="w") as store:
+        store.create_variable("tiles", (6, 8), "float32", chunks=(3, 4), dims=("rows", "columns"))
+        store.write_region("tiles", expected[:2], (slice(0, 2),))
+        store.write_region(
+            "tiles", da.from_array(expected[2:, :5], chunks=2), {"rows": slice(2, 6), "columns": slice(0, 5)}
+        )
+        store.write_region("tiles", EOVariable(data=expected[2:, 5:]), (slice(2, 6), slice(5, 8)))
+        with pytest.raises(KeyError):
+            store.write_region("tiles", expected, {"bands": slice(0, 1)})
+
+        attrs = {"scale_factor": 0.5, "_FillValue": -1}
+        store.create_variable("series", (0, 4), "int16", dims=("time", "x"), attrs=attrs, fill_value=-1)
+        store.append("series", np.array([[0.5, 1.0, np.nan, 2.0]]), dim="time")
+        store.append("series", da.full((2, 4), 3.0, chunks=1))
+
+    root = zarr.open_group(url, mode="r")
+    np.testing.assert_array_equal(root["tiles"][:], expected)
+    assert root["tiles"].chunks == (3, 4)
+    assert root["series"].shape == (3, 4)
+    np.testing.assert_array_equal(root["series"][:], [[1, 2, -1, 4], [6, 6, 6, 6], [6, 6, 6, 6]])
+    with open_store(EOZarrStore(url)) as store:
+        series = store["series"]
+        assert series.dims == ("time", "x")
+        np.testing.assert_array_equal(series.data.compute()[0], [0.5, 1.0, np.nan, 2.0])
+
+
+@pytest.mark.unit
+def test_zarr_chunk_plan(tmp_path):
+    url = str(tmp_path / "planned.zarr")
+    planner = EOChunkPlanner(64 * 1024, product_types={"S3OLCEFR": dict(access="rows")})
+    with open_store(EOZarrStore(url), mode="w", chunk_planner=planner) as store:
+        store.write_attrs("", {"product_type": "S3OLCEFR"})
+        store["radiance"] = EOVariable(data=da.ones((200, 300), chunks=(1, 300)), dims=("rows", "columns"))
+        store["flags"] = EOVariable(data=np.zeros(10, dtype="uint8"))
+        store.create_variable("records", (0, 1000), "float64", dims=("time", "x"))
+        for _ in range(3):
+            store.append("records", np.ones((1, 1000)))
+    # without planner, the chunks of the data are kept
+    with open_store(EOZarrStore(str(tmp_path / "unplanned.zarr")), mode="w") as store:
+        store["radiance"] = EOVariable(data=da.ones((200, 300), chunks=(1, 300)))
+
+    root = zarr.open_group(url, mode="r")
+    planned = planner.for_product_type("S3OLCEFR").plan((200, 300), "float64")
+    assert planned[1] == 300 and 1 < planned[0] < 200
+    assert root["radiance"].chunks == planned
+    # the appended dimension is chunked by the target size, not by the size of the first append
+    assert root["records"].shape == (3, 1000)
+    assert root["records"].chunks == (8, 1000)
+    assert root.attrs["chunk_plan"] == {
+        "target_bytes": 64 * 1024,
+        "access": "rows",
+        "dims": {},
+        "chunks": {"radiance": list(planned), "flags": [10]},
+    }
+    unplanned = zarr.open_group(str(tmp_path / "unplanned.zarr"), mode="r")
+    assert unplanned["radiance"].chunks == (1, 300)
+    assert "chunk_plan" not in unplanned.attrs
+
+
+@pytest.mark.unit
+def test_netcdf_reference_cache(tmp_path):
+    url = str(tmp_path / "references.nc")
+    xarray.Dataset({"values": (("rows", "columns"), np.arange(2000.0).reshape(40, 50))}).to_netcdf(url)
+    cache = KerchunkReferenceCache(directory=str(tmp_path / "references"))
+
+    for _ in range(2):
+        with open_store(EONetCDFStore(url), reference_cache=cache) as store:
+            assert isinstance(store.sub_store, EOZarrStore)
+            np.testing.assert_array_equal(store["values"]._data.values, np.arange(2000.0).reshape(40, 50))
+    assert cache.stats == dict(hits=1, disk_hits=0, misses=1, entries=1)
+
+    # the references are reused by other caches from the directory
+    other_cache = KerchunkReferenceCache(directory=cache.directory)
+    with open_store(EONetCDFStore(url), reference_cache=other_cache) as store:
+        assert sorted(store.iter("")) == ["values"]
+    assert (other_cache.disk_hits, other_cache.misses) == (1, 0)
+
+    # until the file is modified
+    os.utime(url, ns=(0, 0))
+    with open_store(EONetCDFStore(url), reference_cache=other_cache):
+        pass
+    assert other_cache.misses == 1
+
+
+@pytest.mark.unit
+def test_netcdf4py_lazy_read(tmp_path):
+    url = str(tmp_path / "lazy.nc")
+    values = np.arange(6000, dtype="int32").reshape(60, 100)
+    dataset = xarray.Dataset(
+        {
+            "counts": (("rows", "columns"), values, {"_FillValue": 5}),
+            "raw": (("rows", "columns"), values),
+        },
+    )
+    dataset.to_netcdf(url, encoding={"counts": {"chunksizes": (20, 25)}})
+
+    store = EONetCDFStoreNCpy(url)
+    with open_store(store):
+        counts = store["counts"]
+        raw = store["raw"]
+    # variables are read lazily, after the store is closed, by chunks aligned on the HDF5 ones
+    assert isinstance(counts.data, da.Array)
+    assert all(chunk % 20 == 0 for chunk in counts.data.chunks[0][:-1])
+    assert all(chunk % 25 == 0 for chunk in counts.data.chunks[1][:-1])
+    assert raw.data.dtype == "int32"
+    np.testing.assert_array_equal(raw._data.values, values)
+    # masked values are NaN
+    assert counts.data.dtype == "float64"
+    expected = values.astype("float64")
+    expected[0, 5] = np.nan
+    np.testing.assert_array_equal(counts._data[:2].values, expected[:2])
+
+    # the same file gives the same dask names
+    with open_store(EONetCDFStoreNCpy(url)) as store:
+        assert store["raw"].data.name == raw.data.name
+    # a file rewritten at the same url does not
+    xarray.Dataset({"raw": (("rows", "columns"), -values)}).to_netcdf(str(tmp_path / "rewritten.nc"))
+    os.utime(tmp_path / "rewritten.nc", ns=(0, 0))
+    os.replace(tmp_path / "rewritten.nc", url)
+    with open_store(EONetCDFStoreNCpy(url)) as store:
+        rewritten = store["raw"]
+    assert rewritten.data.name != raw.data.name
+    np.testing.assert_array_equal(da.compute(raw.data + rewritten.data)[0], np.zeros_like(values))
+
+
+@pytest.mark.unit
+def test_netcdf4py_streamed_write(dask_client_all, tmp_path):
+    url = str(tmp_path / "streamed.nc")
+    values = np.arange(6000.0).reshape(60, 100)
+    data = da.from_array(values, chunks=(20, 50)) * 2.0
+
+    # netCDF-C >= 4.9 reserves the _ARRAY_DIMENSIONS attribute, attributes are not under test here
+    with (
+        patch.object(EONetCDFStoreNCpy, "write_attrs"),
+        patch.object(dask, "compute", wraps=dask.compute) as mock_compute,
+        open_store(EONetCDFStoreNCpy(url), mode="w", write_batch_bytes="16kB") as store,
+    ):
+        store["values"] = EOVariable(data=data, dims=("rows", "columns"))
+        store["scalar"] = EOVariable(data=da.from_array(np.float64(3.0)))
+        store["small"] = EOVariable(data=np.arange(3), dims=("small",))
+    # the 6 blocks of 8kB of values are computed by batches of 16kB, then the single block of small
+    assert [len(call.args) for call in mock_compute.call_args_list] == [2, 2, 2, 1]
+
+    with netCDF4.Dataset(url) as dataset:
+        # the dask blocks are written in HDF5 chunks of the same shape
+        assert dataset["values"].chunking() == [20, 50]
+    with open_store(EONetCDFStoreNCpy(url)) as store:
+        np.testing.assert_array_equal(store["values"]._data.values, values * 2.0)
+        assert store["scalar"]._data.values == 3.0
+        np.testing.assert_array_equal(store["small"]._data.values, np.arange(3))
+
+
 @pytest.mark.unit
 @pytest.mark.parametrize(
     "store, readable, writable, listable, erasable",
@@ -567,15 +939,17 @@ def test_rasters(dask_client_all, store_cls: type[EORasterIOAccessor], format_fi
     ],
 )
 def test_zarr_open_on_different_fs(client, product: EOProduct, fakefilename: str, open_kwargs: dict[str, Any]):
+    mapper = fsspec.FSMap(fakefilename, LocalFileSystem())
     with patch("dask.array.core.get_mapper") as mock_dask:
         with patch("fsspec.get_mapper") as mock_zarr:
-            mock_dask.return_value = fsspec.FSMap(fakefilename, LocalFileSystem())
-            mock_zarr.return_value = fsspec.FSMap(fakefilename, LocalFileSystem())
+            mock_zarr.return_value = mapper
             with product.open(storage_options=open_kwargs):
+                assert product.store._fs.store.map is mapper
                 product.load()
             assert mock_zarr.call_count == 1
             mock_zarr.assert_called_with(product.store.url, **open_kwargs)
-            assert mock_dask.call_count == 10
+            # the variables are read from the open group, through its mapper
+            mock_dask.assert_not_called()
 
 
 @pytest.mark.real_s3
@@ -1,19 +1,40 @@
+import contextlib
 import json
 import os
+import shutil
+import time
+import zipfile
 from pathlib import Path
+from typing import Any, Iterator
+from unittest import mock
 
+import dask.array
+import fsspec
 import numpy as np
 import pytest
+import xarray
+import zarr
 from pytest_lazyfixture import lazy_fixture
 
+from eopf.exceptions import StoreNotOpenError
 from eopf.product.conveniences import open_store
-from eopf.product.core import EOProduct, EOVariable
+from eopf.product.core import EOGroup, EOProduct, EOVariable
 from eopf.product.core.eo_object import EOObject
-from eopf.product.store import EOCogStore, EONetCDFStore, EOProductStore, EOZarrStore
+from eopf.product.store import (
+    EOCogStore,
+    EONetCDFStore,
+    EOProductStore,
+    EOZarrStore,
+    StorageStatus,
+)
+from eopf.product.store.abstract import EOReadOnlyStore
 from eopf.product.store.conveniences import convert
 from eopf.product.store.mapping_factory import EOMappingFactory
-from eopf.product.store.safe import EOSafeStore
-from eopf.product.utils import conv
+from eopf.product.store.memmap_accessors import MemMapAccessor, PoolMemMap, packet_mask
+from eopf.product.store.netcdf import KerchunkReferenceCache, combine_references
+from eopf.product.store.safe import EOSafeStore, SafeHierarchy, _TargetPathTrie
+from eopf.product.store.store_factory import EOStoreFactory
+from eopf.product.utils import FSMatchIndex, conv, fs_match_path
 from tests.utils import assert_eovariable_equal
 
 
@@ -382,3 +403,571 @@ def test_short_name_conflict(mapping_filename):
                 assert mapping["target_path"] == short_names_dict[short_name]
             else:
                 short_names_dict[short_name] = mapping["target_path"]
+
+
+L0_PACKET_FIELDS = {
+    "/conditions/packet_version": ("(0,3,3)", "s_uint8"),
+    "/conditions/apid": ("(5,16,11)", "uint16"),
+    "/conditions/packet_length": ("(32,48,16)", "uint16"),
+    "/conditions/coarse_time": ("(48,80,32)", "uint32"),
+    "/measurements/header": ("(48,80,32)", "bytearray"),
+    "/measurements/user_data": ("(80,None,-1)", "var_bytearray"),
+}
+
+
+@pytest.fixture
+def L0_SAFE(tmp_path: Path):
+    product_path = tmp_path / "S1A_IW_RAW__0SDV_TEST.SAFE"
+    product_path.mkdir()
+    rng = np.random.default_rng(0)
+    packets = []
+    for length in rng.integers(12, 40, 50):
+        packet = rng.integers(0, 256, length, dtype="uint8")
+        packet[0] = 12
+        packet[4:6] = divmod(length - 7, 256)
+        packets.append(packet)
+    np.concatenate(packets).tofile(product_path / "s1a-iw-raw-s-vv-test.dat")
+
+    mapping = {
+        "recognition": {"filename_pattern": "S1.*_RAW_.*SAFE", "product_type": "S1_L0"},
+        "l0_mapping": {"types": {key: key for key in ("s_uint8", "uint16", "uint32", "bytearray", "var_bytearray")}},
+        "data_mapping": [
+            {
+                "source_path": f"s1*-vv-*.dat:{local_path}",
+                "target_path": target_path,
+                "item_format": "L0packetlist",
+                "accessor_config": {"target_type": f"l0_mapping/types/{target_type}"},
+            }
+            for target_path, (local_path, target_type) in L0_PACKET_FIELDS.items()
+        ],
+    }
+    mapping_path = tmp_path / "S1_L0_test_mapping.json"
+    mapping_path.write_text(json.dumps(mapping))
+    mapping_factory = EOMappingFactory(default_mappings=False)
+    mapping_factory.register_mapping(str(mapping_path))
+    yield str(product_path), mapping_factory
+    for pool in PoolMemMap._items.values():
+        pool.close()
+
+
+@pytest.mark.unit
+def test_l0_user_data_default_mapping(L0_SAFE, tmp_path: Path):
+    product_path, mapping_factory = L0_SAFE
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory)) as safe_store:
+        expected = safe_store["/measurements/user_data"]._data.values
+
+    # the user data parameters of the shipped mapping, on the packets of the test file
+    default_mapping_path = Path(__file__).parent.parent / "eopf/product/store/mapping/S1_L0_mapping.json"
+    default_mapping = json.loads(default_mapping_path.read_text())
+    (user_data,) = [
+        data_mapping
+        for data_mapping in default_mapping["data_mapping"]
+        if data_mapping["target_path"] == "/measurements/vv/user_data"
+    ]
+    user_data["source_path"] = f"s1*-vv-*.dat:{L0_PACKET_FIELDS['/measurements/user_data'][0]}"
+    mapping = {
+        "recognition": {"filename_pattern": "S1.*_RAW_.*SAFE", "product_type": "S1_L0"},
+        "l0_mapping": default_mapping["l0_mapping"],
+        "data_mapping": [user_data],
+    }
+    mapping_path = tmp_path / "S1_L0_default_test_mapping.json"
+    mapping_path.write_text(json.dumps(mapping))
+    mapping_factory = EOMappingFactory(default_mappings=False)
+    mapping_factory.register_mapping(str(mapping_path))
+
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory)) as safe_store:
+        variable = safe_store["/measurements/vv/user_data"]
+        assert variable.dims == tuple(user_data["parameters"]["dimensions"])
+        assert variable.shape == expected.shape
+        for value, expected_value in zip(variable._data.values, expected):
+            np.testing.assert_array_equal(value, expected_value)
+
+
+@pytest.mark.unit
+def test_l0_prefetch(L0_SAFE):
+    product_path, mapping_factory = L0_SAFE
+    expected = dict()
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory)) as safe_store:
+        for key in L0_PACKET_FIELDS:
+            expected[key] = safe_store[key]._data.values
+
+    safe_store = EOSafeStore(product_path, mapping_factory=mapping_factory)
+    with open_store(safe_store):
+        safe_store.prefetch(["/conditions", "/measurements/header"])
+        accessors = [accessor for accessor, _ in safe_store._accessor_manager if isinstance(accessor, MemMapAccessor)]
+        pool = accessors[0]._poolmemmap
+        assert len(pool._fields) == 5
+        for key in L0_PACKET_FIELDS:
+            variable = safe_store[key]
+            assert variable._data.dtype == expected[key].dtype
+            # var_bytearray fields are ragged: one array per packet
+            for value, expected_value in zip(variable._data.values, expected[key]):
+                np.testing.assert_array_equal(value, expected_value)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "packet_filter",
+    [
+        {"/conditions/apid": lambda apid: apid % 2 == 0},
+        {"/conditions/packet_length": slice(10, 30), "/conditions/coarse_time": slice(None, 1 << 31)},
+        # scalar fields are evaluated on every packet, the version of all the test packets is 0
+        {"conditions/packet_version": [1, 2]},
+    ],
+)
+def test_l0_packet_filter(L0_SAFE, packet_filter):
+    product_path, mapping_factory = L0_SAFE
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory)) as safe_store:
+        values = {key: safe_store[key]._data.values for key in L0_PACKET_FIELDS}
+
+    mask = np.ones(values["/conditions/apid"].shape, dtype=bool)
+    for key, condition in packet_filter.items():
+        key_values = values[f"/{key.strip('/')}"]
+        mask &= packet_mask(np.broadcast_to(key_values, mask.shape), condition)
+
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory), packet_filter=packet_filter) as store:
+        for key in ("/conditions/apid", "/conditions/coarse_time", "/measurements/header"):
+            np.testing.assert_array_equal(store[key]._data.values, values[key][mask])
+        user_data = store["/measurements/user_data"]._data.values
+        assert len(user_data) == mask.sum()
+        for value, expected_value in zip(user_data, values["/measurements/user_data"][mask]):
+            np.testing.assert_array_equal(value, expected_value)
+
+
+@pytest.mark.unit
+def test_l0_packet_filter_by_store(L0_SAFE):
+    product_path, mapping_factory = L0_SAFE
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory)) as safe_store:
+        apid = safe_store["/conditions/apid"]._data.values
+        coarse_time = safe_store["/conditions/coarse_time"]._data.values
+
+    even = EOSafeStore(product_path, mapping_factory=mapping_factory)
+    odd = EOSafeStore(product_path, mapping_factory=mapping_factory)
+    with open_store(even), open_store(odd), open_store(
+        EOSafeStore(product_path, mapping_factory=mapping_factory)
+    ) as unfiltered:
+        # an accessor opened before the selection
+        even["/conditions/coarse_time"]
+        even.select_packets({"/conditions/apid": lambda value: value % 2 == 0})
+        odd.select_packets({"/conditions/apid": lambda value: value % 2 == 1})
+        np.testing.assert_array_equal(even["/conditions/apid"]._data.values, apid[apid % 2 == 0])
+        np.testing.assert_array_equal(even["/conditions/coarse_time"]._data.values, coarse_time[apid % 2 == 0])
+        np.testing.assert_array_equal(odd["/conditions/apid"]._data.values, apid[apid % 2 == 1])
+        np.testing.assert_array_equal(unfiltered["/conditions/apid"]._data.values, apid)
+    with open_store(even):
+        # the selection does not survive the close
+        np.testing.assert_array_equal(even["/conditions/apid"]._data.values, apid)
+
+
+@pytest.mark.unit
+def test_l0_packet_filter_errors(L0_SAFE):
+    product_path, mapping_factory = L0_SAFE
+    safe_store = EOSafeStore(product_path, mapping_factory=mapping_factory)
+    with pytest.raises(StoreNotOpenError):
+        safe_store.select_packets({"/conditions/apid": 1})
+    with open_store(safe_store):
+        with pytest.raises(KeyError):
+            safe_store.select_packets({"/conditions/unknown": 1})
+        with pytest.raises(ValueError):
+            safe_store.select_packets({"/measurements/header": 1})
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "target_path, expected",
+    [
+        ("/conditions/geometry/sza", [("/conditions/geometry/sza", "")]),
+        ("conditions/geometry/sza", [("/conditions/geometry/sza", "")]),
+        ("/conditions/geometry/sza/attrs", [("/conditions/geometry/sza", "attrs")]),
+        ("/conditions/geometry", [("conditions/geometry", ""), ("/conditions/geometry", "")]),
+        ("/conditions/meteo/a/b", [("/conditions", "meteo/a/b")]),
+        ("/measurements/image", [("", "measurements/image"), ("/", "measurements/image")]),
+        ("/", [("", ""), ("/", "")]),
+    ],
+)
+def test_target_path_trie(target_path, expected):
+    trie = _TargetPathTrie()
+    for path in ("", "/", "/conditions", "/conditions/geometry", "conditions/geometry", "/conditions/geometry/sza"):
+        trie.add(path)
+    assert not trie.irregular
+    assert trie.split(trie.elements(target_path)) == expected
+    assert trie.elements("a//b") is None
+
+
+@pytest.mark.unit
+def test_target_path_trie_not_found():
+    trie = _TargetPathTrie()
+    trie.add("/conditions")
+    with pytest.raises(KeyError):
+        trie.split(trie.elements("/measurements"))
+    trie.add("/conditions/../measurements")
+    assert trie.irregular
+
+
+@pytest.mark.unit
+def test_fs_match_index(tmp_path: Path):
+    for name in ("a.nc", "b.nc", "sub/c.xml"):
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text("")
+    index = FSMatchIndex(fsspec.get_mapper(str(tmp_path)))
+    assert index.match_all([r".*\.nc", r"sub/.*", "missing"]) == {
+        r".*\.nc": fs_match_path(r".*\.nc", fsspec.get_mapper(str(tmp_path))),
+        r"sub/.*": "sub/c.xml",
+        "missing": "missing",
+    }
+    assert index.match("b.nc") == "b.nc"
+    assert index.match(r"sub/.*") == "sub/c.xml"
+    assert index.stats == dict(hits=1, misses=4, listings=1, files=3)
+    # patterns can be given by a generator
+    generated = FSMatchIndex(fsspec.get_mapper(str(tmp_path)))
+    assert generated.match_all(pattern for pattern in ["b.nc", "missing"]) == {"b.nc": "b.nc", "missing": "missing"}
+
+
+@pytest.mark.unit
+def test_l0_file_index(L0_SAFE):
+    product_path, mapping_factory = L0_SAFE
+    safe_store = EOSafeStore(product_path, mapping_factory=mapping_factory)
+    with open_store(safe_store):
+        file_index = safe_store._accessor_manager.file_index
+        for key in L0_PACKET_FIELDS:
+            safe_store[key]
+        assert file_index.listings == 1
+        assert file_index.misses == 1
+        assert file_index.hits >= len(L0_PACKET_FIELDS)
+    assert safe_store._accessor_manager.file_index is None
+
+
+@pytest.mark.unit
+def test_l0_get_many(L0_SAFE):
+    product_path, mapping_factory = L0_SAFE
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory)) as safe_store:
+        expected = {key: safe_store[key] for key in ["", "/conditions", *L0_PACKET_FIELDS]}
+
+    safe_store = EOSafeStore(product_path, mapping_factory=mapping_factory)
+    with open_store(safe_store):
+        items = safe_store.get_many(expected)
+        assert list(items) == list(expected)
+        assert isinstance(items["/conditions"], EOGroup)
+        assert items[""].attrs == expected[""].attrs
+        # the packet fields stay lazy
+        accessors = [accessor for accessor, _ in safe_store._accessor_manager if isinstance(accessor, MemMapAccessor)]
+        assert not accessors[0]._poolmemmap._fields
+        assert isinstance(items["/conditions/apid"]._data.data, dask.array.Array)
+        # unless they are prefetched, then they are decoded together
+        items = safe_store.get_many(expected, prefetch=True)
+        assert len(accessors[0]._poolmemmap._fields) == len(L0_PACKET_FIELDS)
+        for key in L0_PACKET_FIELDS:
+            assert items[key].dims == expected[key].dims
+            for value, expected_value in zip(items[key]._data.values, expected[key]._data.values):
+                np.testing.assert_array_equal(value, expected_value)
+        with pytest.raises(KeyError):
+            safe_store.get_many(["/conditions/apid", "/conditions/missing"])
+
+
+@pytest.mark.unit
+def test_l0_concurrent_open(L0_SAFE, caplog):
+    product_path, mapping_factory = L0_SAFE
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory)) as safe_store:
+        expected = {key: safe_store[key]._data.values for key in L0_PACKET_FIELDS}
+        # fields of the same type share their accessor
+        accessor_count = sum(not isinstance(accessor, SafeHierarchy) for accessor, _ in safe_store._accessor_manager)
+
+    safe_store = EOSafeStore(product_path, mapping_factory=mapping_factory)
+    with caplog.at_level("DEBUG", logger="eopf"), open_store(safe_store, open_workers=4):
+        # the accessors of all the mappings are opened by open
+        accessors = [
+            accessor for accessor, _ in safe_store._accessor_manager if not isinstance(accessor, SafeHierarchy)
+        ]
+        assert len(accessors) == accessor_count
+        assert all(accessor.status == StorageStatus.OPEN for accessor in accessors)
+        for key in L0_PACKET_FIELDS:
+            for value, expected_value in zip(safe_store[key]._data.values, expected[key]):
+                np.testing.assert_array_equal(value, expected_value)
+    assert sum("L0packetlist accessor" in message for message in caplog.messages) == accessor_count
+    assert any(message.startswith(f"Opened {accessor_count} accessors") for message in caplog.messages)
+
+
+@pytest.mark.unit
+def test_l0_concurrent_open_isolation(L0_SAFE, caplog):
+    product_path, mapping_factory = L0_SAFE
+    safe_store = EOSafeStore(product_path, mapping_factory=mapping_factory)
+    with mock.patch.object(MemMapAccessor, "open", side_effect=OSError("broken")):
+        # failures are only logged by the concurrent opening
+        with caplog.at_level("WARNING", logger="eopf"):
+            safe_store.open(open_workers=2)
+        assert any("broken" in message and "-vv-" in message for message in caplog.messages)
+        # and raised again when the mapping is accessed
+        with pytest.raises(OSError):
+            safe_store["/conditions/apid"]
+    safe_store.close()
+
+    # unexpected errors are raised once all the accessors are opened
+    safe_store = EOSafeStore(product_path, mapping_factory=mapping_factory)
+    with mock.patch.object(MemMapAccessor, "open", side_effect=RuntimeError("bug")) as open_mock:
+        with pytest.raises(RuntimeError):
+            safe_store.open(open_workers=2)
+    assert open_mock.call_count > 1
+    safe_store.close()
+
+
+@pytest.mark.unit
+def test_l0_open_index(L0_SAFE, tmp_path: Path):
+    product_path, mapping_factory = L0_SAFE
+    mapping_path = tmp_path / "S1_L0_test_mapping.json"
+    mapping = json.loads(mapping_path.read_text())
+    optional_mapping = dict(mapping["data_mapping"][0], source_path="missing*.dat:(0,3,3)", is_optional=True)
+    mapping["data_mapping"].append(dict(optional_mapping, target_path="/measurements/missing"))
+    mapping_path.write_text(json.dumps(mapping))
+    open_index = str(tmp_path / "open_index")
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory, open_index=open_index)) as safe_store:
+        expected_tree = {key: sorted(safe_store.iter(key)) for key in ["", "/conditions", "/measurements"]}
+        expected = safe_store["/conditions/apid"]._data.values
+    assert len(os.listdir(open_index)) == 1
+
+    # the product is opened again without reading its mapping nor listing it
+    safe_store = EOSafeStore(product_path, mapping_factory=mapping_factory, open_index=open_index)
+    with mock.patch.object(mapping_factory, "get_mapping", side_effect=AssertionError), open_store(safe_store):
+        assert safe_store.product_type == "S1_L0"
+        assert {key: sorted(safe_store.iter(key)) for key in expected_tree} == expected_tree
+        np.testing.assert_array_equal(safe_store["/conditions/apid"]._data.values, expected)
+        assert safe_store._accessor_manager.file_index.listings == 0
+        # and the missing optional mappings are known
+        assert safe_store._accessor_manager._optional_exists == {"/measurements/missing": False}
+
+    # the index is dropped when a file of the product is modified, even if the folder is not
+    folder_stat = os.stat(product_path)
+    os.utime(Path(product_path) / "s1a-iw-raw-s-vv-test.dat", ns=(0, 0))
+    os.utime(product_path, ns=(folder_stat.st_atime_ns, folder_stat.st_mtime_ns))
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory, open_index=open_index)) as safe_store:
+        assert safe_store._accessor_manager.file_index.listings == 1
+    # or when a file is added
+    (Path(product_path) / "new_file.txt").write_text("")
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory, open_index=open_index)) as safe_store:
+        assert safe_store._accessor_manager.file_index.listings == 1
+    with open(os.path.join(open_index, os.listdir(open_index)[0])) as index_file:
+        assert json.load(index_file)["product_type"] == "S1_L0"
+
+
+@pytest.fixture
+def NETCDF_SAFE(tmp_path: Path):
+    product_path = tmp_path / "S3A_OL_1_EFR____TEST.SEN3"
+    (product_path / "geo").mkdir(parents=True)
+    values = np.arange(2000.0).reshape(40, 50)
+    xarray.Dataset({"radiance": (("rows", "columns"), values)}).to_netcdf(product_path / "Oa01_radiance.nc")
+    xarray.Dataset({"latitude": (("rows", "columns"), -values)}).to_netcdf(product_path / "geo" / "coordinates.nc")
+    mapping = {
+        "recognition": {"filename_pattern": "S3.*_OL_1_EFR_.*SEN3", "product_type": "S3_OL_TEST"},
+        "data_mapping": [
+            {"source_path": "Oa01_radiance.nc:radiance", "target_path": "/measurements/radiance"},
+            {"source_path": "geo/coordinates.nc:latitude", "target_path": "/coordinates/latitude"},
+            {"source_path": "missing.nc:latitude", "target_path": "/coordinates/missing", "is_optional": True},
+        ],
+    }
+    for data_mapping in mapping["data_mapping"]:
+        data_mapping["item_format"] = "netcdf"
+    mapping_path = tmp_path / "S3_OL_test_mapping.json"
+    mapping_path.write_text(json.dumps(mapping))
+    mapping_factory = EOMappingFactory(default_mappings=False)
+    mapping_factory.register_mapping(str(mapping_path))
+    return str(product_path), mapping_factory, values
+
+
+@pytest.mark.unit
+def test_netcdf_combined_references(NETCDF_SAFE, tmp_path: Path):
+    product_path, mapping_factory, values = NETCDF_SAFE
+    safe_store = EOSafeStore(product_path, mapping_factory=mapping_factory)
+    with open_store(safe_store, combine_netcdf=True):
+        np.testing.assert_array_equal(safe_store["/measurements/radiance"]._data.values, values)
+        np.testing.assert_array_equal(safe_store["/coordinates/latitude"]._data.values, -values)
+        assert sorted(safe_store.iter("/coordinates")) == ["latitude"]
+        # all the netCDF accessors read from the same zarr
+        sub_stores = [
+            accessor.sub_store for accessor, _ in safe_store._accessor_manager if hasattr(accessor, "sub_store")
+        ]
+        assert len(sub_stores) == 2
+        assert all(sub_store._store is safe_store._accessor_manager._combined_store for sub_store in sub_stores)
+
+        references_path = str(tmp_path / "references.json")
+        references = safe_store.netcdf_references(references_path)
+    assert safe_store._accessor_manager._combined_store is None
+    assert "geo/coordinates.nc/latitude/.zarray" in references["refs"]
+
+    # the exported references can be read without eopf
+    mapper = fsspec.get_mapper("reference://", fo=references_path)
+    group = zarr.open_group(mapper, mode="r")
+    np.testing.assert_array_equal(group["Oa01_radiance.nc/radiance"][:], values)
+    np.testing.assert_array_equal(group["geo/coordinates.nc/latitude"][:], -values)
+
+
+@pytest.mark.unit
+def test_netcdf_combined_reference_cache(NETCDF_SAFE):
+    product_path, mapping_factory, values = NETCDF_SAFE
+    cache = KerchunkReferenceCache()
+    shared_stats = EONetCDFStore.reference_cache.stats
+    safe_store = EOSafeStore(product_path, mapping_factory=mapping_factory)
+    with open_store(safe_store, combine_netcdf=True, reference_cache=cache):
+        np.testing.assert_array_equal(safe_store["/measurements/radiance"]._data.values, values)
+        safe_store.netcdf_references()
+    # the references come from the given cache, not the shared one
+    assert cache.stats["misses"] == 2
+    assert cache.stats["hits"] >= 1
+    assert EONetCDFStore.reference_cache.stats == shared_stats
+
+
+@pytest.mark.unit
+def test_combine_references_templates(tmp_path: Path):
+    # the references of each file use the same template name for their own url
+    references = {}
+    for name, value in (("first", 1), ("second/nested", 2)):
+        file_path = tmp_path / f"{value}.bin"
+        file_path.write_bytes(np.full(4, value, dtype="<i4").tobytes())
+        references[name] = {
+            "version": 1,
+            "templates": {"u": str(file_path)},
+            "refs": {
+                ".zgroup": json.dumps({"zarr_format": 2}),
+                "data/.zarray": json.dumps(
+                    {
+                        "chunks": [4],
+                        "compressor": None,
+                        "dtype": "<i4",
+                        "fill_value": None,
+                        "filters": None,
+                        "order": "C",
+                        "shape": [4],
+                        "zarr_format": 2,
+                    }
+                ),
+                "data/0": ["{{u}}", 0, 16],
+            },
+        }
+    combined = combine_references(references)
+    assert combined["refs"]["second/.zgroup"]
+
+    group = zarr.open_group(fsspec.get_mapper("reference://", fo=combined), mode="r")
+    np.testing.assert_array_equal(group["first/data"][:], np.full(4, 1))
+    np.testing.assert_array_equal(group["second/nested/data"][:], np.full(4, 2))
+
+
+@pytest.mark.unit
+def test_netcdf_combined_references_zip(NETCDF_SAFE, tmp_path: Path):
+    product_path, mapping_factory, values = NETCDF_SAFE
+    zip_path = tmp_path / "S3A_OL_1_EFR____TEST.SEN3.zip"
+    with zipfile.ZipFile(zip_path, "w") as zip_file:
+        for file_path in Path(product_path).rglob("*.nc"):
+            zip_file.write(file_path, str(file_path.relative_to(Path(product_path).parent)))
+
+    safe_store = EOSafeStore(f"zip::file://{zip_path}", mapping_factory=mapping_factory)
+    with open_store(safe_store, combine_netcdf=True):
+        np.testing.assert_array_equal(safe_store["/measurements/radiance"]._data.values, values)
+        # the references of the extracted files can not be exported
+        with pytest.raises(NotImplementedError):
+            safe_store.netcdf_references(str(tmp_path / "references.json"))
+    assert not (tmp_path / "references.json").exists()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("persistent", [False, True])
+def test_l0_zip_partial_extraction(L0_SAFE, tmp_path: Path, persistent: bool):
+    product_path, mapping_factory = L0_SAFE
+    with open_store(EOSafeStore(product_path, mapping_factory=mapping_factory)) as safe_store:
+        expected = safe_store["/conditions/apid"]._data.values
+
+    zip_path = tmp_path / "S1A_IW_RAW__0SDV_TEST.SAFE.zip"
+    top_level = os.path.basename(product_path)
+    with zipfile.ZipFile(zip_path, "w") as zip_file:
+        zip_file.write(os.path.join(product_path, "s1a-iw-raw-s-vv-test.dat"), f"{top_level}/s1a-iw-raw-s-vv-test.dat")
+        zip_file.writestr(f"{top_level}/measurement/unused.bin", b"0" * 1024)
+    extraction_cache = str(tmp_path / "extraction") if persistent else None
+
+    for reopen in (False, True):
+        # the extraction cache is reused when the product is opened again
+        copy_mock = mock.patch("shutil.copyfileobj", side_effect=AssertionError) if persistent and reopen else None
+        safe_store = EOSafeStore(
+            f"zip::file://{zip_path}",
+            mapping_factory=mapping_factory,
+            extraction_cache=extraction_cache,
+        )
+        with copy_mock or contextlib.nullcontext(), open_store(safe_store):
+            np.testing.assert_array_equal(safe_store["/conditions/apid"]._data.values, expected)
+            extraction_dir = safe_store._accessor_manager._extraction_dir()
+            assert os.path.isfile(os.path.join(extraction_dir, top_level, "s1a-iw-raw-s-vv-test.dat"))
+            assert not os.path.exists(os.path.join(extraction_dir, top_level, "measurement"))
+
+
+@pytest.mark.unit
+def test_l0_zip_concurrent_extraction(L0_SAFE, tmp_path: Path):
+    product_path, mapping_factory = L0_SAFE
+    zip_path = tmp_path / "S1A_IW_RAW__0SDV_TEST.SAFE.zip"
+    top_level = os.path.basename(product_path)
+    with zipfile.ZipFile(zip_path, "w") as zip_file:
+        zip_file.write(os.path.join(product_path, "s1a-iw-raw-s-vv-test.dat"), f"{top_level}/s1a-iw-raw-s-vv-test.dat")
+
+    copyfileobj = shutil.copyfileobj
+
+    def slow_copy(*args, **kwargs):
+        time.sleep(0.05)
+        return copyfileobj(*args, **kwargs)
+
+    safe_store = EOSafeStore(
+        f"zip::file://{zip_path}",
+        mapping_factory=mapping_factory,
+        extraction_cache=str(tmp_path / "extraction"),
+    )
+    # the accessors of the different fields open the same member concurrently, it is extracted once
+    with mock.patch("shutil.copyfileobj", side_effect=slow_copy) as copy_mock, open_store(safe_store, open_workers=4):
+        assert copy_mock.call_count == 1
+        assert safe_store["/conditions/apid"]._data.shape == (50,)
+
+
+class _CompanionFileStore(EOReadOnlyStore):
+    """Accessor reading the companion file next to its own file, like the accessors opening files indirectly."""
+
+    def open(self, mode: str = "r", **kwargs: Any) -> None:
+        super().open(mode, **kwargs)
+        with open(self.url, "rb") as data_file, open(os.path.join(os.path.dirname(self.url), "companion.txt")) as aux:
+            self._values = np.frombuffer(data_file.read(), dtype="uint8") * int(aux.read())
+
+    def __getitem__(self, key: str) -> EOObject:
+        return EOVariable(data=self._values)
+
+    def __len__(self) -> int:
+        return 1
+
+    def is_group(self, path: str) -> bool:
+        return not path
+
+    def is_variable(self, path: str) -> bool:
+        return bool(path)
+
+    def iter(self, path: str) -> Iterator[str]:
+        return iter(["values"])
+
+
+@pytest.mark.unit
+def test_zip_companion_files(tmp_path: Path):
+    product_path = tmp_path / "S3A_OL_1_EFR____TEST.SEN3"
+    (product_path / "measurement").mkdir(parents=True)
+    (product_path / "measurement" / "data.bin").write_bytes(bytes([1, 2, 3]))
+    (product_path / "measurement" / "companion.txt").write_text("10")
+    zip_path = tmp_path / "S3A_OL_1_EFR____TEST.SEN3.zip"
+    with zipfile.ZipFile(zip_path, "w") as zip_file:
+        for file_path in product_path.rglob("*.*"):
+            zip_file.write(file_path, str(file_path.relative_to(tmp_path)))
+    mapping = {
+        "recognition": {"filename_pattern": "S3.*_OL_1_EFR_.*SEN3", "product_type": "S3_OL_TEST"},
+        "data_mapping": [
+            {"source_path": "measurement/data.bin:values", "target_path": "/measurements/values", "item_format": "aux"},
+        ],
+    }
+    mapping_path = tmp_path / "S3_OL_test_mapping.json"
+    mapping_path.write_text(json.dumps(mapping))
+    mapping_factory = EOMappingFactory(default_mappings=False)
+    mapping_factory.register_mapping(str(mapping_path))
+    store_factory = EOStoreFactory(default_stores=False)
+    store_factory.register_store(_CompanionFileStore, "aux")
+
+    safe_store = EOSafeStore(f"zip::file://{zip_path}", store_factory=store_factory, mapping_factory=mapping_factory)
+    with open_store(safe_store):
+        # the accessor does not read a single file, so the whole product is extracted for it
+        np.testing.assert_array_equal(safe_store["/measurements/values"]._data.values, [10, 20, 30])
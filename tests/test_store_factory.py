@@ -1,4 +1,5 @@
 import json
+from unittest import mock
 
 import pytest
 from pytest_lazyfixture import lazy_fixture
@@ -45,3 +46,71 @@ def test_mapping_factory(filename, mapping_path):
 
     with pytest.raises(KeyError):
         factory.get_mapping("false_false")
+
+
+def _write_mapping(path, filename_pattern, product_type, data_mapping=None):
+    mapping = {
+        "recognition": {"filename_pattern": filename_pattern, "product_type": product_type},
+        "data_mapping": data_mapping or [],
+    }
+    path.write_text(json.dumps(mapping))
+    return str(path)
+
+
+@pytest.mark.unit
+def test_mapping_factory_registry(tmp_path):
+    first = _write_mapping(tmp_path / "first.json", "S3._OL_1_.*SEN3", "S3_OL_1_EFR")
+    second = _write_mapping(tmp_path / "second.json", "S3.*SEN3", "S3_OTHER")
+    grouped = _write_mapping(tmp_path / "grouped.json", r"(S2)._\1.*", "S2_GROUP")
+    factory = EOMappingFactory(default_mappings=False)
+    for mapping_path in (first, second, grouped):
+        factory.register_mapping(mapping_path)
+
+    # registration order gives the priority
+    assert factory.get_mapping("S3A_OL_1_EFR_TEST.SEN3")["recognition"]["product_type"] == "S3_OL_1_EFR"
+    assert factory.get_mapping("S3A_SL_1_RBT_TEST.SEN3")["recognition"]["product_type"] == "S3_OTHER"
+    assert factory.get_mapping(product_type="S3_OTHER")["recognition"]["product_type"] == "S3_OTHER"
+    # patterns with groups are matched one by one
+    assert factory.get_mapping("S2A_S2_TEST")["recognition"]["product_type"] == "S2_GROUP"
+    with pytest.raises(KeyError):
+        factory.get_mapping("S2A_S3_TEST")
+
+    # each call returns a new mapping
+    mapping = factory.get_mapping("S3A_OL_1_EFR_TEST.SEN3")
+    mapping["data_mapping"].append({})
+    assert factory.get_mapping("S3A_OL_1_EFR_TEST.SEN3")["data_mapping"] == []
+
+    # files are parsed once, then again only when they change
+    with mock.patch("eopf.product.store.mapping_factory.json.load") as json_load:
+        EOMappingFactory(default_mappings=False)
+        factory.get_mapping("S3A_OL_1_EFR_TEST.SEN3")
+        json_load.assert_not_called()
+    _write_mapping(tmp_path / "first.json", "S3._OL_1_.*SEN3", "S3_OL_1_EFR_NEW", [{"target_path": "/"}])
+    # the files are not checked again before the refresh interval
+    with mock.patch("eopf.product.store.mapping_factory.os.stat") as stat:
+        assert factory.get_mapping("S3A_OL_1_EFR_TEST.SEN3")["recognition"]["product_type"] == "S3_OL_1_EFR"
+        stat.assert_not_called()
+    factory.refresh()
+    assert factory.get_mapping("S3A_OL_1_EFR_TEST.SEN3")["recognition"]["product_type"] == "S3_OL_1_EFR_NEW"
+    with mock.patch.object(factory, "REFRESH_INTERVAL", 0.0):
+        _write_mapping(tmp_path / "first.json", "S3._OL_1_.*SEN3", "S3_OL_1_EFR_LAST")
+        assert factory.get_mapping("S3A_OL_1_EFR_TEST.SEN3")["recognition"]["product_type"] == "S3_OL_1_EFR_LAST"
+
+
+@pytest.mark.unit
+def test_mapping_factory_cache_file(tmp_path):
+    mapping_path = _write_mapping(tmp_path / "mapping.json", "S3._OL_1_.*SEN3", "S3_OL_1_EFR")
+    cache_file = str(tmp_path / "cache" / "mappings.json")
+    factory = EOMappingFactory(default_mappings=False, cache_file=cache_file)
+    factory.register_mapping(mapping_path)
+    factory.save_cache()
+    with open(cache_file) as cache:
+        assert list(json.load(cache)) == [mapping_path]
+
+    with mock.patch.object(EOMappingFactory, "_compiled", dict()):
+        with mock.patch("eopf.product.store.mapping_factory.json.load", wraps=json.load) as json_load:
+            cached_factory = EOMappingFactory(default_mappings=False, cache_file=cache_file)
+            cached_factory.register_mapping(mapping_path)
+            assert cached_factory.get_mapping("S3A_OL_1_EFR.SEN3")["recognition"]["product_type"] == "S3_OL_1_EFR"
+            # only the cache is read, not the mapping file
+            assert json_load.call_count == 1
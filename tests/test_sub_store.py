@@ -4,6 +4,7 @@ import pathlib
 from typing import Any
 from unittest import mock
 
+import dask.array
 import fsspec
 import numpy
 import pytest
@@ -13,6 +14,17 @@ from pytest_lazyfixture import lazy_fixture
 from eopf.product.conveniences import open_store
 from eopf.product.core import EOGroup, EOVariable
 from eopf.product.store.grib import EOGribAccessor
+from eopf.product.store.memmap_accessors import (
+    MemMapAccessor,
+    PoolMemMap,
+    RaggedBytes,
+    extract_bits,
+    extract_bytes,
+    extract_fields,
+    extract_var_bytes,
+    index_packets,
+    packet_index_path,
+)
 from eopf.product.store.wrappers import (
     FromAttributesToFlagValueAccessor,
     FromAttributesToVariableAccessor,
@@ -310,3 +322,257 @@ def test_extended_xml_manifest_accessor(path: str, mapping: str, tmp_path: pathl
             conditions_metadata["orbit_reference"]["ephemeris"]["start"]["TAI"],
             "%Y-%m-%dT%H:%M:%S.%f",
         )
+
+
+def _packet_buffer(lengths: list[int], seed: int = 0) -> numpy.ndarray:
+    rng = numpy.random.default_rng(seed)
+    packets = []
+    for length in lengths:
+        packet = rng.integers(0, 256, length, dtype="uint8")
+        packet[0] = 12
+        packet[4:6] = divmod(length - 7, 256)
+        packets.append(packet)
+    return numpy.concatenate(packets)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("lengths", [[7], [20, 20, 20], [9, 300, 12, 7, 18, 1000, 35]])
+def test_index_packets(lengths: list[int]):
+    offsets, packet_lengths = index_packets(_packet_buffer(lengths))
+    testing.assert_array_equal(packet_lengths, lengths)
+    testing.assert_array_equal(offsets, numpy.cumsum([0] + lengths[:-1]))
+
+
+@pytest.mark.unit
+def test_index_packets_invalid_sync():
+    buffer = _packet_buffer([20, 30, 40])
+    buffer[50] = 13
+    with pytest.raises(ValueError, match="13 != 12"):
+        index_packets(buffer)
+
+
+@pytest.mark.unit
+def test_memmap_accessor(tmp_path: pathlib.Path):
+    lengths = [16, 30, 12, 200]
+    buffer = _packet_buffer(lengths)
+    file_path = tmp_path / "s1a-test-packets.dat"
+    buffer.tofile(file_path)
+
+    accessor = MemMapAccessor(str(file_path))
+    with open_store(accessor, target_type="uint16"):
+        assert isinstance(accessor[slice(32, 48, 16)], EOVariable)
+        data = accessor.parsekey(32, 16, "uint16")
+    offsets = numpy.cumsum([0] + lengths[:-1])
+    testing.assert_array_equal(data, buffer[offsets + 4].astype("uint16") * 256 + buffer[offsets + 5])
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "key, target_type",
+    [(slice(32, 48, 16), "uint16"), (slice(5, 16, 11), "uint16"), (slice(48, 64, 16), "bytearray")],
+)
+def test_memmap_accessor_lazy(tmp_path: pathlib.Path, key: slice, target_type: str):
+    buffer = _packet_buffer([16, 30, 12, 200, 40, 24, 10])
+    file_path = tmp_path / "s1a-test-packets.dat"
+    buffer.tofile(file_path)
+
+    accessor = MemMapAccessor(str(file_path))
+    with dask.config.set({"array.chunk-size": "4B"}), open_store(accessor, target_type=target_type):
+        data = accessor[key].data
+        expected = accessor.parsekey(key.start, key.step, target_type)
+    assert isinstance(data, dask.array.Array)
+    assert data.numblocks[0] > 1
+    testing.assert_array_equal(data.compute(scheduler="synchronous"), expected)
+
+
+@pytest.mark.unit
+def test_memmap_accessor_var_bytearray(tmp_path: pathlib.Path):
+    lengths = [16, 30, 12, 200, 40]
+    buffer = _packet_buffer(lengths)
+    file_path = tmp_path / "s1a-test-packets.dat"
+    buffer.tofile(file_path)
+
+    accessor = MemMapAccessor(str(file_path))
+    with dask.config.set({"array.chunk-size": "64B"}), open_store(accessor, target_type="var_bytearray"):
+        data = accessor[slice(64, None, -1)].data
+        ragged = accessor.parsekey(64, -1, "var_bytearray")
+        assert isinstance(ragged, RaggedBytes)
+        assert ragged.nbytes == sum(lengths) - 8 * len(lengths)
+        assert data.dtype == object
+        assert data.numblocks[0] > 1
+        values = data.compute(scheduler="synchronous")
+
+    offsets = numpy.cumsum([0] + lengths[:-1])
+    for offset, length, value, item in zip(offsets, lengths, values, ragged):
+        testing.assert_array_equal(value, buffer[offset + 8 : offset + length])  # noqa
+        testing.assert_array_equal(item, value)
+    testing.assert_array_equal(ragged.to_padded(), extract_var_bytes(buffer, offsets + 8, numpy.array(lengths) - 8))
+
+
+@pytest.mark.unit
+def test_ragged_bytes():
+    ragged = RaggedBytes.from_arrays([[1, 2, 3], [], [4], [5, 6]])
+    assert ragged.shape == (4,)
+    assert ragged.nbytes == 6
+    testing.assert_array_equal(ragged.offsets, [0, 3, 3, 4, 6])
+    testing.assert_array_equal(ragged[3], [5, 6])
+    sub = ragged[1:3]
+    assert isinstance(sub, RaggedBytes)
+    testing.assert_array_equal(sub.compact().buffer, [4])
+    testing.assert_array_equal(ragged.to_padded(), [[1, 2, 3], [0, 0, 0], [4, 0, 0], [5, 6, 0]])
+    assert [list(item) for item in numpy.asarray(ragged)] == [[1, 2, 3], [], [4], [5, 6]]
+
+
+@pytest.mark.unit
+def test_pool_memmap_refcount(tmp_path: pathlib.Path):
+    file_path = tmp_path / "s1a-test-packets.dat"
+    _packet_buffer([16, 30, 12, 200]).tofile(file_path)
+    url = str(file_path)
+
+    first, second = MemMapAccessor(url), MemMapAccessor(url)
+    first.open(target_type="uint16")
+    second.open(target_type="uint8")
+    assert first._poolmemmap is second._poolmemmap
+    first.close()
+    assert second.parsekey(32, 16, "uint16").shape == (4,)
+    second.close()
+    # the default budget release the pool with its last user
+    assert url not in PoolMemMap._items
+
+    with mock.patch.object(PoolMemMap, "residency_budget", 1 << 20):
+        with open_store(first, target_type="uint16"):
+            first.select_packets([(slice(32, 48, 16), {"target_type": "uint16"}, slice(0, 20))])
+        assert PoolMemMap._items[url]._loaded
+        with mock.patch("eopf.product.store.memmap_accessors.index_packets", side_effect=AssertionError):
+            with open_store(first, target_type="uint16"):
+                # the selection does not survive the close
+                assert first.parsekey(32, 16, "uint16").shape == (4,)
+    PoolMemMap.evict()
+    assert url not in PoolMemMap._items
+
+
+@pytest.mark.unit
+def test_pool_memmap_acquire_evict(tmp_path: pathlib.Path):
+    file_path = tmp_path / "s1a-test-packets.dat"
+    _packet_buffer([16, 30, 12, 200]).tofile(file_path)
+    url = str(file_path)
+    accessor = MemMapAccessor(url)
+    loadbuffer = accessor.loadbuffer
+
+    def evicting_loader(pool: PoolMemMap) -> None:
+        # an other thread evicting the idle pools while this one is loaded
+        PoolMemMap.evict()
+        loadbuffer(pool)
+
+    with mock.patch.object(accessor, "loadbuffer", evicting_loader):
+        accessor.open(target_type="uint16")
+    assert PoolMemMap._items[url] is accessor._poolmemmap
+    assert accessor.parsekey(32, 16, "uint16").shape == (4,)
+    accessor.close()
+    assert url not in PoolMemMap._items
+
+    with pytest.raises(IOError):
+        PoolMemMap.acquire(url, mock.Mock(side_effect=IOError))
+    # a pool failing to load is not kept
+    assert url not in PoolMemMap._items
+
+
+@pytest.mark.unit
+def test_pool_memmap_threads(tmp_path: pathlib.Path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    file_path = tmp_path / "s1a-test-packets.dat"
+    _packet_buffer([16, 30, 12, 200] * 10).tofile(file_path)
+    accessors = [MemMapAccessor(str(file_path)) for _ in range(16)]
+
+    with mock.patch("eopf.product.store.memmap_accessors.index_packets", wraps=index_packets) as index_mock:
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda accessor: accessor.open(target_type="uint16"), accessors))
+        assert index_mock.call_count == 1
+    assert accessors[0]._poolmemmap._refcount == 16
+    with ThreadPoolExecutor(8) as executor:
+        shapes = list(executor.map(lambda accessor: accessor.parsekey(32, 16, "uint16").shape, accessors))
+        list(executor.map(lambda accessor: accessor.close(), accessors))
+    assert shapes == [(40,)] * 16
+    assert str(file_path) not in PoolMemMap._items
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("cache_dir", [False, True])
+def test_memmap_accessor_index_cache(tmp_path: pathlib.Path, cache_dir: bool):
+    lengths = [16, 30, 12, 200]
+    buffer = _packet_buffer(lengths)
+    file_path = tmp_path / "s1a-test-packets.dat"
+    buffer.tofile(file_path)
+    index_cache = str(tmp_path / "cache") if cache_dir else True
+    index_path = packet_index_path(str(file_path), index_cache)
+    assert index_path is not None
+
+    accessor = MemMapAccessor(str(file_path))
+    with open_store(accessor, target_type="uint16", index_cache=index_cache):
+        expected = accessor.parsekey(32, 16, "uint16")
+    assert os.path.isfile(index_path)
+    assert os.path.dirname(index_path) == (str(tmp_path / "cache") if cache_dir else str(tmp_path))
+
+    with mock.patch("eopf.product.store.memmap_accessors.index_packets", side_effect=AssertionError):
+        with open_store(accessor, target_type="uint16", index_cache=index_cache):
+            testing.assert_array_equal(accessor.parsekey(32, 16, "uint16"), expected)
+
+    # the index is rebuilt when the file changed
+    _packet_buffer(lengths[:2]).tofile(file_path)
+    with open_store(accessor, target_type="uint16", index_cache=index_cache):
+        assert accessor.parsekey(32, 16, "uint16").shape == (2,)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("offset_in_bits, length_in_bits", [(0, 3), (3, 1), (5, 11), (18, 14), (32, 16), (59, 48)])
+@pytest.mark.parametrize("output_type", ["bool", "uint8", "uint16", "uint32"])
+def test_extract_bits(offset_in_bits: int, length_in_bits: int, output_type: str):
+    lengths = [20, 30, 12, 200, 17]
+    buffer = _packet_buffer(lengths)
+    offsets = numpy.cumsum([0] + lengths[:-1])
+
+    start_byte = offset_in_bits // 8
+    end_byte = (offset_in_bits + length_in_bits - 1) // 8 + 1
+    shift = end_byte * 8 - (offset_in_bits + length_in_bits)
+    expected = numpy.zeros(len(lengths), dtype=output_type)
+    for k, offset in enumerate(offsets):
+        data = buffer[offset + start_byte : offset + end_byte] >> shift  # noqa
+        expected[k] = int.from_bytes(data, "big") & numpy.int64((1 << length_in_bits) - 1)
+
+    result = extract_bits(buffer, offsets, offset_in_bits, length_in_bits, output_type)
+    assert result.dtype == expected.dtype
+    testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("field", [(32, 16, "uint16"), (35, 40, "uint64"), (8, 64, "bytearray")])
+def test_extract_fields_out_of_buffer(field: tuple[int, int, Any]):
+    lengths = numpy.array([20, 30, 12])
+    buffer = _packet_buffer(list(lengths))
+    offsets = numpy.cumsum([0, *lengths[:-1]])
+    offset_in_bits, length_in_bits, output_type = field
+
+    if output_type == "bytearray":
+        start_byte = offset_in_bits // 8
+        expected = extract_bytes(buffer, offsets, start_byte, start_byte + length_in_bits // 8)
+    else:
+        expected = extract_bits(buffer, offsets, *field)
+    testing.assert_array_equal(extract_fields(buffer, offsets, lengths, [field])[field], expected)
+
+    # the field of the last packet runs past the end of the file: it raises as the per field decoding does
+    short_buffer = buffer[: offsets[-1] + 5]
+    with pytest.raises(IndexError):
+        extract_fields(short_buffer, offsets, lengths, [field])
+    with pytest.raises(IndexError):
+        if output_type == "bytearray":
+            extract_bytes(short_buffer, offsets, start_byte, start_byte + length_in_bits // 8)
+        else:
+            extract_bits(short_buffer, offsets, *field)
+
+
+@pytest.mark.unit
+def test_extract_var_bytes():
+    buffer = numpy.arange(50, dtype="uint8")
+    result = extract_var_bytes(buffer, numpy.array([2, 10, 30]), numpy.array([3, 0, 5]))
+    testing.assert_array_equal(result, [[2, 3, 4, 0, 0], [0, 0, 0, 0, 0], [30, 31, 32, 33, 34]])